@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'main',
     'accounts',
     'skills',
@@ -97,6 +98,34 @@ DATABASES = {
 }
 
 
+# Cache
+# A database cache in production so every gunicorn worker shares one copy
+# (and one recompute lock) of cached pages and counters.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'skillswap_cache',
+    }
+} if not DEBUG else {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Live events (skills.pubsub)
+# Relayed through PostgreSQL LISTEN/NOTIFY in production, so a write in any
+# worker reaches streams held by the ASGI workers.
+
+SKILLSWAP_PUBSUB_BACKEND = 'skills.pubsub.PostgresBroker' if not DEBUG else 'skills.pubsub.LocalBroker'
+
+# Notification outbox (skills.outbox)
+# Drained by a separate worker service only where it shares the web
+# service's PostgreSQL database and database cache; otherwise each request
+# delivers its own events in process once its transaction commits.
+
+SKILLSWAP_OUTBOX_WORKER = not DEBUG
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
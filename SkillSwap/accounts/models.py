@@ -20,4 +20,19 @@ class UserProfile(models.Model):
 
     def needed_skills(self):
         return self.user.needed_skills.all()
+
+    # The active offers and needs shown on profile cards. Listings prefetch
+    # them onto ``user`` for a whole page (see browse.views.CARD_PREFETCHES);
+    # these read that prefetch when it is there, still dropping inactive
+    # rows in case a caller prefetched them all, and query otherwise.
+    def _active(self, relation):
+        if relation in getattr(self.user, '_prefetched_objects_cache', {}):
+            return [row for row in getattr(self.user, relation).all() if row.is_active]
+        return getattr(self.user, relation).filter(is_active=True).select_related('skill')
+
+    def active_offered_skills(self):
+        return self._active('offered_skills')
+
+    def active_needed_skills(self):
+        return self._active('needed_skills')
     
\ No newline at end of file
@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from skills.models import Skill, Category, OfferedSkill, NeededSkill  
+from skills import counters, dashboard, match_index
+from browse import search
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from .models import UserProfile
@@ -130,6 +132,14 @@ def profile_form(request : HttpRequest):
             OfferedSkill.objects.bulk_create(offered_objs)
         if needed_objs:
             NeededSkill.objects.bulk_create(needed_objs)
+
+        # bulk_create skips the post_save signals that keep matches, skill
+        # counters, the cached dashboard and the search index current
+        match_index.sync_user(request.user)
+        search.index_users([request.user.id])
+        dashboard.invalidate(request.user.id)
+        counters.bump('offer_count', [o.skill_id for o in offered_objs])
+        counters.bump('need_count', [n.skill_id for n in needed_objs])
             
         messages.success(request, "updates are saved successfully", "alert-success")
         return redirect("accounts:user_profile")
@@ -0,0 +1,56 @@
+"""
+Per-skill facet counts for the browse filters: how many of the listed
+profiles actively offer and need each skill. The unfiltered listing reads the
+SkillCounter table alongside the skill list itself; a filtered one adds a
+single grouped aggregate. Either way the result is cached for
+FACET_TIMEOUT, or until skills or profiles change.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce
+
+from skills.models import Skill, OfferedSkill, NeededSkill
+from .pagination import filters_key
+
+
+FACET_TIMEOUT = 60
+
+
+def _unfiltered():
+    # The counters cover active offers and needs, at most one per user and skill
+    return list(Skill.objects.annotate(
+        offer_count=Coalesce('counter__offer_count', 0),
+        need_count=Coalesce('counter__need_count', 0),
+    ).order_by('skill'))
+
+
+def _counts(profiles):
+    """{(kind, skill_id): n} for ``profiles`` from one UNION of two grouped queries"""
+    users = profiles.order_by().values('user_id')
+    offers = OfferedSkill.objects.filter(user_id__in=users, is_active=True).values('skill_id').annotate(
+        kind=Value('offer'), n=Count('user', distinct=True),
+    )
+    needs = NeededSkill.objects.filter(user_id__in=users, is_active=True).values('skill_id').annotate(
+        kind=Value('need'), n=Count('user', distinct=True),
+    )
+    return {(kind, skill_id): n for skill_id, kind, n in offers.union(needs, all=True).values_list('skill_id', 'kind', 'n')}
+
+
+def skill_facets(profiles, filters):
+    """
+    Every skill, by name, with ``offer_count`` and ``need_count`` among
+    ``profiles``, the listing narrowed by ``filters`` (its query string
+    filters; all empty for the whole site).
+    """
+    if not any(filters.values()):
+        return cache.get_or_set(filters_key('facets', {}), _unfiltered, FACET_TIMEOUT)
+
+    def compute():
+        counts = _counts(profiles)
+        skills = list(Skill.objects.order_by('skill'))
+        for skill in skills:
+            skill.offer_count = counts.get(('offer', skill.id), 0)
+            skill.need_count = counts.get(('need', skill.id), 0)
+        return skills
+
+    return cache.get_or_set(filters_key('facets', filters), compute, FACET_TIMEOUT)
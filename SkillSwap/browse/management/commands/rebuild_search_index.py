@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from browse import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's browse search document and the backend search index"
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} users for search"))
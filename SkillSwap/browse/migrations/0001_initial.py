@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:25
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    # PostgreSQL searches the tsvector column and username trigrams; SQLite
+    # has neither and keeps a copy of the text in an FTS5 table instead
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX browse_search_vector_idx ON browse_profilesearch USING GIN (vector)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX browse_search_username_trgm_idx ON browse_profilesearch USING GIN (username gin_trgm_ops)'
+        )
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE browse_profilesearch_fts USING fts5(username, skills, bio, descriptions)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS browse_search_username_trgm_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS browse_search_vector_idx')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS browse_profilesearch_fts')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSearch',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('username', models.CharField(max_length=150)),
+                ('skills', models.TextField(blank=True, help_text='Names of the skills the user offers and needs')),
+                ('bio', models.TextField(blank=True)),
+                ('descriptions', models.TextField(blank=True, help_text="Descriptions of the user's active offers")),
+                ('vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def fill_search_index(apps, schema_editor):
+    # Signals keep the index current from here on; index the profiles that
+    # were already there. Runs the live rebuild, so it depends on the current
+    # skills schema rather than a historical one.
+    from browse import search
+    search.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('browse', '0001_initial'),
+        ('accounts', '0001_initial'),
+        ('skills', '0022_fill_match_candidates'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
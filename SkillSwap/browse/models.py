@@ -1,3 +1,21 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 
 # Create your models here.
+
+class ProfileSearch(models.Model):
+
+    # One search document per user, rebuilt by browse.search.index_users on
+    # every write that changes it. PostgreSQL searches ``vector`` (GIN) and
+    # trigrams of ``username``; SQLite mirrors the text into an FTS5 table.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    username = models.CharField(max_length=150)
+    skills = models.TextField(blank=True, help_text="Names of the skills the user offers and needs")
+    bio = models.TextField(blank=True)
+    descriptions = models.TextField(blank=True, help_text="Descriptions of the user's active offers")
+    vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search entry for {self.username}"
@@ -0,0 +1,111 @@
+"""
+Keyset paging for the browse listing.
+
+Pages seek past the last row shown on a stable integer sort key (the
+profile id, or a search match's rank) instead of counting and skipping rows
+with OFFSET, so page 500 costs what page 1 does.
+The total shown beside the pager is an estimate: the planner's row estimate
+on PostgreSQL, an exact count cached for COUNT_TIMEOUT elsewhere.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connection
+
+from main import page_cache
+
+
+PAGE_SIZE = 6
+COUNT_TIMEOUT = 300
+
+
+def filters_key(prefix, params):
+    """
+    A cache key for ``prefix`` under one set of listing filters, moved on
+    with the public page cache whenever skills or profiles change
+    """
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f'browse:{prefix}:{page_cache.version()}:{digest}'
+
+
+def parse_cursor(value):
+    """A cursor from the query string, or None for a missing or malformed one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, key, after=None, before=None, size=PAGE_SIZE):
+    """
+    One page of ``queryset`` in ascending order of the integer annotation or
+    field ``key``, following rows whose key is ``after`` or else preceding
+    the row whose key is ``before``. Fetches one extra row to tell whether
+    there is more in the direction of travel.
+
+    Returns ``(rows, previous_cursor, next_cursor)``; pass previous_cursor
+    as ``before`` and next_cursor as ``after``. Either is None at that end.
+    """
+    if before is not None:
+        rows = list(queryset.filter(**{f'{key}__lt': before}).order_by(f'-{key}')[:size + 1])
+        more = len(rows) > size
+        rows = rows[:size][::-1]
+        previous_cursor = getattr(rows[0], key) if more else None
+        next_cursor = getattr(rows[-1], key) if rows else None
+        return rows, previous_cursor, next_cursor
+
+    if after is not None:
+        queryset = queryset.filter(**{f'{key}__gt': after})
+    rows = list(queryset.order_by(key)[:size + 1])
+    more = len(rows) > size
+    rows = rows[:size]
+    previous_cursor = getattr(rows[0], key) if after is not None and rows else None
+    next_cursor = getattr(rows[-1], key) if more else None
+    return rows, previous_cursor, next_cursor
+
+
+def ranked_page(queryset, ranked_ids, after=None, before=None, size=PAGE_SIZE):
+    """
+    keyset_page() for search results, keyed on position in ``ranked_ids``
+    (user ids, best first) rather than on a column: one query narrows the
+    matches to those ``queryset`` keeps, the page is cut in Python, and a
+    second query loads it. Ordering in SQL would mean a CASE with a branch
+    per match, which costs more to build than the search itself.
+
+    Returns ``(rows, previous_cursor, next_cursor, total)``; the total is
+    exact, since every match was looked at anyway.
+    """
+    kept = set(queryset.prefetch_related(None).order_by().values_list('user_id', flat=True))
+    positions = [position for position, user_id in enumerate(ranked_ids) if user_id in kept]
+
+    if before is not None:
+        earlier = [position for position in positions if position < before]
+        window = earlier[-size:]
+        previous_cursor = window[0] if len(earlier) > size else None
+        next_cursor = window[-1] if window else None
+    else:
+        later = [position for position in positions if after is None or position > after]
+        window = later[:size]
+        previous_cursor = window[0] if after is not None and window else None
+        next_cursor = window[-1] if len(later) > size else None
+
+    rank = {ranked_ids[position]: position for position in window}
+    rows = sorted(queryset.filter(user_id__in=rank), key=lambda row: rank[row.user_id])
+    return rows, previous_cursor, next_cursor, len(positions)
+
+
+def estimated_count(queryset, params):
+    """
+    Roughly how many rows ``queryset`` has. ``params`` identifies the
+    listing (its filters) for the cached count.
+    """
+    queryset = queryset.order_by()
+    if connection.vendor == 'postgresql':
+        # Django unwraps EXPLAIN's one-element JSON array
+        plan = json.loads(queryset.explain(format='json'))
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan['Plan']['Plan Rows'])
+
+    return cache.get_or_set(filters_key('count', params), queryset.count, COUNT_TIMEOUT)
@@ -0,0 +1,142 @@
+"""
+People-and-skill search for browse.
+
+Each user has one ProfileSearch document: username, bio, the names of the
+skills they offer and need, and their offer descriptions. PostgreSQL ranks
+documents by a weighted tsvector (GIN-indexed) with prefix matching, plus
+trigram similarity on usernames for typos; SQLite keeps a copy of the text
+in an FTS5 table and ranks with bm25(). Both indexes are created by the
+browse migrations.
+"""
+import re
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+
+from main import page_cache
+from skills.models import OfferedSkill, NeededSkill
+from .models import ProfileSearch
+
+
+MIN_QUERY_LENGTH = 3
+MAX_RESULTS = 500
+
+FTS_TABLE = 'browse_profilesearch_fts'
+
+TEXT_FIELDS = ('username', 'skills', 'bio', 'descriptions')
+
+# Username matches count most, then skills, then free text
+VECTOR = (
+    SearchVector('username', weight='A', config='simple')
+    + SearchVector('skills', weight='B', config='simple')
+    + SearchVector('bio', 'descriptions', weight='C', config='simple')
+)
+FTS_WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+
+BATCH_SIZE = 1000
+
+
+def terms(query):
+    """Lower-cased word tokens of ``query``; the only part of it that reaches either index"""
+    return re.findall(r'\w+', query.lower())
+
+
+def documents(user_ids):
+    """ProfileSearch rows, unsaved, for ``user_ids`` in four queries"""
+    skills = defaultdict(list)
+    descriptions = defaultdict(list)
+    for user_id, skill, description in OfferedSkill.objects.filter(user_id__in=user_ids, is_active=True).values_list(
+        'user_id', 'skill__skill', 'description'
+    ):
+        skills[user_id].append(skill)
+        if description:
+            descriptions[user_id].append(description)
+    for user_id, skill in NeededSkill.objects.filter(user_id__in=user_ids, is_active=True).values_list(
+        'user_id', 'skill__skill'
+    ):
+        skills[user_id].append(skill)
+
+    return [
+        ProfileSearch(
+            user_id=user_id, username=username, bio=bio or '',
+            skills=' '.join(skills[user_id]), descriptions='\n'.join(descriptions[user_id]),
+        )
+        for user_id, username, bio in User.objects.filter(id__in=user_ids).values_list('id', 'username', 'userprofile__bio')
+    ]
+
+
+def store(rows):
+    """Write search rows, replacing the users' previous ones, into the table and the backend index"""
+    if not rows:
+        return
+    ProfileSearch.objects.bulk_create(
+        rows, batch_size=BATCH_SIZE,
+        update_conflicts=True, unique_fields=['user'], update_fields=[*TEXT_FIELDS, 'updated_at'],
+    )
+    user_ids = [row.user_id for row in rows]
+    if connection.vendor == 'postgresql':
+        ProfileSearch.objects.filter(user_id__in=user_ids).update(vector=VECTOR)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), BATCH_SIZE):
+                batch = rows[i:i + BATCH_SIZE]
+                unindex([row.user_id for row in batch])
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, username, skills, bio, descriptions) VALUES (%s, %s, %s, %s, %s)',
+                    [(row.user_id, *(getattr(row, f) for f in TEXT_FIELDS)) for row in batch],
+                )
+    # Cached search pages went stale with the signal that got us here, but
+    # could have been cached again from the old index since
+    page_cache.invalidate()
+
+
+def index_users(user_ids):
+    """Bring the search documents of ``user_ids`` up to date; deleted users need nothing"""
+    user_ids = list(set(user_ids))
+    for i in range(0, len(user_ids), BATCH_SIZE):
+        store(documents(user_ids[i:i + BATCH_SIZE]))
+
+
+def unindex(user_ids):
+    """Drop deleted search rows from the FTS5 table; PostgreSQL's index goes with the row"""
+    if connection.vendor == 'sqlite' and user_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(user_ids))})', list(user_ids)
+            )
+
+
+def rebuild():
+    """Re-index every user; returns how many"""
+    user_ids = list(User.objects.values_list('id', flat=True))
+    index_users(user_ids)
+    return len(user_ids)
+
+
+def search(query, limit=MAX_RESULTS):
+    """
+    Ids of the users matching every word of ``query`` (each as a prefix),
+    best first, at most ``limit`` of them. Queries shorter than
+    MIN_QUERY_LENGTH match nothing.
+    """
+    words = terms(query)
+    if len(query.strip()) < MIN_QUERY_LENGTH or not words:
+        return []
+
+    if connection.vendor == 'postgresql':
+        tsquery = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config='simple')
+        matches = ProfileSearch.objects.filter(
+            Q(vector=tsquery) | Q(username__trigram_similar=query)
+        ).annotate(rank=SearchRank(F('vector'), tsquery)).order_by('-rank', 'user_id')
+        return list(matches.values_list('user_id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {", ".join(map(str, FTS_WEIGHTS))}), rowid LIMIT %s',
+            [' '.join(f'"{word}"*' for word in words), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
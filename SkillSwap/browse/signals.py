@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserProfile
+from skills.models import Skill, OfferedSkill, NeededSkill
+from . import search
+from .models import ProfileSearch
+
+
+# Search documents are rebuilt after commit: a rolled back write never
+# reaches the index, and a user deleted in the same transaction is simply
+# not found by then.
+
+def reindex(*user_ids):
+    transaction.on_commit(lambda: search.index_users(user_ids))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login alone
+    if not raw and (update_fields is None or 'username' in update_fields):
+        reindex(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reindex(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=OfferedSkill)
+@receiver([post_save, post_delete], sender=NeededSkill)
+def user_skill_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reindex(instance.user_id)
+
+
+@receiver(post_init, sender=Skill)
+def skill_loaded(sender, instance, **kwargs):
+    instance._indexed_name = instance.skill if instance.pk else None
+
+
+@receiver(post_save, sender=Skill)
+def skill_renamed(sender, instance, created, raw=False, **kwargs):
+    if raw or created or instance.skill == instance._indexed_name:
+        return
+    instance._indexed_name = instance.skill
+    offering = OfferedSkill.objects.filter(skill=instance).values_list('user_id', flat=True)
+    needing = NeededSkill.objects.filter(skill=instance).values_list('user_id', flat=True)
+    reindex(*offering.union(needing))
+
+
+@receiver(post_delete, sender=ProfileSearch)
+def search_entry_deleted(sender, instance, **kwargs):
+    search.unindex([instance.user_id])
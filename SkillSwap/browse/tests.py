@@ -1,3 +1,299 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import UserProfile
+from skills.models import Skill, OfferedSkill, NeededSkill
+from . import search
 
 # Create your tests here.
+
+class ProfileSearchTestCase(TestCase):
+    """
+    Test suite for the indexed browse search and its sync on writes
+    """
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python = Skill.objects.create(skill='Python')
+            self.guitar = Skill.objects.create(skill='Guitar')
+            self.pythonista = User.objects.create(username='pythonista')
+            self.teacher = User.objects.create(username='teacher')
+            self.student = User.objects.create(username='student')
+            UserProfile.objects.create(user=self.pythonista)
+            UserProfile.objects.create(user=self.teacher)
+            UserProfile.objects.create(user=self.student, bio='Curious about python and music')
+            self.offer = OfferedSkill.objects.create(user=self.teacher, skill=self.python, description='Data analysis')
+            NeededSkill.objects.create(user=self.student, skill=self.guitar)
+
+    def test_ranks_name_then_skill_then_bio(self):
+        """
+        TEST: Every word must match as a prefix; username matches rank above
+        skill matches, which rank above bios and descriptions
+        """
+        self.assertEqual(search.search('python'), [self.pythonista.id, self.teacher.id, self.student.id])
+        self.assertEqual(search.search('pyth'), search.search('python'))
+        self.assertEqual(search.search('python music'), [self.student.id])
+        self.assertEqual(search.search('analysis'), [self.teacher.id])
+        self.assertEqual(search.search('py'), [])
+        self.assertEqual(search.search('"*:) OR'), [])
+
+    def test_index_follows_writes(self):
+        """
+        TEST: Renamed skills, deactivated offers, renamed and deleted users
+        are searchable as they now are, and a login does not reindex
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guitar.skill = 'Violin'
+            self.guitar.save()
+        self.assertEqual(search.search('violin'), [self.student.id])
+        self.assertEqual(search.search('guitar'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.is_active = False
+            self.offer.save()
+        self.assertNotIn(self.teacher.id, search.search('python'))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.teacher.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.username = 'mentor'
+            self.teacher.save()
+            self.pythonista.delete()
+        self.assertEqual(search.search('mentor'), [self.teacher.id])
+        self.assertEqual(search.search('python'), [self.student.id])
+
+    def test_rebuild_matches_incremental_index(self):
+        """
+        TEST: Rebuilding from scratch finds what the incremental index found
+        """
+        before = [search.search(q) for q in ('python', 'guitar', 'teach', 'curious')]
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual([search.search(q) for q in ('python', 'guitar', 'teach', 'curious')], before)
+
+    def test_browse_orders_by_rank(self):
+        """
+        TEST: The browse page lists search matches best first
+        """
+        response = self.client.get(reverse('browse:browse_view'), {'q': 'python'})
+        self.assertEqual(
+            [profile.user_id for profile in response.context['profiles']],
+            [self.pythonista.id, self.teacher.id, self.student.id],
+        )
+
+
+class BrowsePagingTestCase(TestCase):
+    """
+    Test suite for keyset paging of the browse listing
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.python = Skill.objects.create(skill='Python')
+        self.profiles = []
+        for i in range(14):
+            user = User.objects.create(username=f'member{i:02}')
+            self.profiles.append(UserProfile.objects.create(user=user))
+            if i % 2:
+                OfferedSkill.objects.create(user=user, skill=self.python)
+                NeededSkill.objects.create(user=user, skill=self.python)
+
+    def visit(self, params):
+        response = self.client.get(reverse('browse:browse_view') + ('?' + params if params else ''))
+        return response.context
+
+    def test_walks_forward_and_back(self):
+        """
+        TEST: Following Next visits every profile once in id order, and
+        Previous walks back over the same pages
+        """
+        pages, params = [], ''
+        while params is not None:
+            context = self.visit(params)
+            pages.append([p.id for p in context['profiles']])
+            params = context['next_query']
+        self.assertEqual([len(page) for page in pages], [6, 6, 2])
+        self.assertEqual(sum(pages, []), [p.id for p in self.profiles])
+        self.assertEqual(context['estimated_total'], 14)
+
+        back, params = [], context['previous_query']
+        while params is not None:
+            context = self.visit(params)
+            back.append([p.id for p in context['profiles']])
+            params = context['previous_query']
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_search_results_page_in_rank_order(self):
+        """
+        TEST: Search results page forward and back in rank order, with an
+        exact total, under skill filters too
+        """
+        search.rebuild()
+        params, seen = f'q=member&offered={self.python.id}', []
+        while params is not None:
+            context = self.visit(params)
+            seen.append([p.user_id for p in context['profiles']])
+            params = context['next_query']
+        self.assertEqual(sum(seen, []), [p.user_id for p in self.profiles[1::2]])
+        self.assertEqual(context['estimated_total'], 7)
+        self.assertEqual([p.user_id for p in self.visit(context['previous_query'])['profiles']], seen[0])
+
+    def test_filters_and_bad_cursors(self):
+        """
+        TEST: Skill filters page without duplicates, and a malformed cursor
+        falls back to the first page
+        """
+        context = self.visit(f'offered={self.python.id}&needed={self.python.id}')
+        self.assertEqual([p.id for p in context['profiles']], [p.id for p in self.profiles[1::2][:6]])
+        self.assertEqual(context['estimated_total'], 7)
+        self.assertIn(f'offered={self.python.id}', context['next_query'])
+
+        self.assertEqual(
+            [p.id for p in self.visit('after=nonsense')['profiles']],
+            [p.id for p in self.profiles[:6]],
+        )
+
+    def test_deep_pages_cost_the_same(self):
+        """
+        TEST: A page deep in the listing runs the same queries as the first once the
+        estimated total is cached
+        """
+        # Signed in, so pages render rather than come from the page cache
+        self.client.force_login(User.objects.create(username='visitor'))
+        first = self.visit('')
+        with CaptureQueriesContext(connection) as first_page:
+            self.visit('')
+        with CaptureQueriesContext(connection) as deep_page:
+            self.visit(first['next_query'].replace(
+                f'after={first["profiles"][-1].id}', f'after={self.profiles[7].id}'
+            ))
+        self.assertEqual(len(first_page), len(deep_page))
+        self.assertNotIn('OFFSET', ' '.join(q['sql'] for q in deep_page.captured_queries))
+
+
+class SkillFacetTestCase(TestCase):
+    """
+    Test suite for the per-skill counts beside the browse filters
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.python = Skill.objects.create(skill='Python')
+        self.guitar = Skill.objects.create(skill='Guitar')
+        for name, offers, needs in [('ana', [self.python], [self.guitar]), ('ben', [self.python, self.guitar], []), ('cy', [], [self.python])]:
+            user = User.objects.create(username=name)
+            UserProfile.objects.create(user=user)
+            for skill in offers:
+                OfferedSkill.objects.create(user=user, skill=skill)
+            for skill in needs:
+                NeededSkill.objects.create(user=user, skill=skill)
+        # Paused listings are not counted
+        OfferedSkill.objects.create(user=user, skill=self.guitar, is_active=False)
+
+    def facets(self, params=''):
+        skills = self.client.get(reverse('browse:browse_view') + '?' + params).context['skills']
+        return {s.skill: (s.offer_count, s.need_count) for s in skills}
+
+    def test_counts_follow_filters(self):
+        """
+        TEST: Facets count the whole site unfiltered and only the listed
+        profiles once filtered
+        """
+        self.assertEqual(self.facets(), {'Guitar': (1, 1), 'Python': (2, 1)})
+        self.assertEqual(self.facets(f'needed={self.guitar.id}'), {'Guitar': (0, 1), 'Python': (1, 0)})
+        self.assertEqual(self.facets(f'offered={self.guitar.id}'), {'Guitar': (1, 0), 'Python': (1, 0)})
+
+    def test_facets_add_at_most_one_query(self):
+        """
+        TEST: Unfiltered facets come with the skill list; filtered ones
+        cost one extra grouped query, and nothing once cached
+        """
+        url = reverse('browse:browse_view')
+        skill_list = 'ORDER BY "skills_skill"."skill"'
+        # Signed in, so pages render rather than come from the page cache
+        self.client.force_login(User.objects.create(username='visitor'))
+        with CaptureQueriesContext(connection) as unfiltered:
+            self.client.get(url)
+        sql = [q['sql'] for q in unfiltered.captured_queries]
+        self.assertEqual(sum(skill_list in q for q in sql), 1)
+        self.assertFalse(any('UNION' in q for q in sql))
+
+        with CaptureQueriesContext(connection) as filtered:
+            self.client.get(url, {'needed': self.guitar.id})
+        sql = [q['sql'] for q in filtered.captured_queries]
+        self.assertEqual(sum(skill_list in q for q in sql), 1)
+        self.assertEqual(sum('UNION' in q for q in sql), 1)
+
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(url, {'needed': self.guitar.id})
+        self.assertFalse(any(skill_list in q['sql'] or 'UNION' in q['sql'] for q in cached.captured_queries))
+
+
+class ProfileCardQueryTestCase(TestCase):
+    """
+    Test suite for the queries behind the browse profile cards
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.skills = [Skill.objects.create(skill=f'Skill {i}') for i in range(10)]
+
+    def make_profiles(self, skills_per_user):
+        for user in User.objects.all():
+            user.delete()
+        for i in range(6):
+            user = User.objects.create(username=f'card{i}')
+            UserProfile.objects.create(user=user)
+            for skill in self.skills[:skills_per_user]:
+                OfferedSkill.objects.create(user=user, skill=skill)
+            for skill in self.skills[-skills_per_user:]:
+                NeededSkill.objects.create(user=user, skill=skill)
+        OfferedSkill.objects.filter(user__username='card0', skill=self.skills[0]).update(is_active=False)
+
+    def render_page(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('browse:browse_view'))
+        self.assertEqual(len(response.context['profiles']), 6)
+        # One prefetch each for offers and needs, not one per card
+        for table in ('skills_offeredskill', 'skills_neededskill'):
+            self.assertEqual(sum(f'FROM "{table}"' in q['sql'] for q in queries.captured_queries), 1)
+        return response, len(queries)
+
+    def test_query_count_is_constant(self):
+        """
+        TEST: A 6-card page runs as many queries with one skill per user
+        as with five, and cards list only active skills
+        """
+        self.make_profiles(1)
+        response, few = self.render_page()
+        self.assertContains(response, '>Skill 0</span>', count=5)
+
+        self.make_profiles(5)
+        response, many = self.render_page()
+        self.assertEqual(few, many)
+        self.assertContains(response, '>Skill 4</span>', count=6)
+        self.assertContains(response, '>Skill 0</span>', count=5)
+
+    def test_active_accessors_with_and_without_prefetch(self):
+        """
+        TEST: The active accessors drop inactive skills whether or not, and
+        however, they were prefetched; the plain accessors keep every skill
+        """
+        self.make_profiles(2)
+        profile = UserProfile.objects.get(user__username='card0')
+        self.assertEqual([o.skill for o in profile.active_offered_skills()], [self.skills[1]])
+        self.assertEqual(len(profile.active_needed_skills()), 2)
+        self.assertEqual(profile.offered_skills().count(), 2)
+
+        profile = UserProfile.objects.prefetch_related('user__offered_skills__skill').get(user__username='card0')
+        with self.assertNumQueries(0):
+            self.assertEqual([o.skill for o in profile.active_offered_skills()], [self.skills[1]])
@@ -1,30 +1,43 @@
 from django.shortcuts import render
 from django.http import HttpRequest
-from django.db.models import Count, Q
-from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils.http import urlencode
 from accounts.models import UserProfile
-from skills.models import Skill, Category 
-from django.core.paginator import Paginator
+from main.page_cache import anonymous_page_cache
+from skills.models import OfferedSkill, NeededSkill
+from . import facets, pagination, search
 
 
 # Create your views here.
 
+# Each card's active offers and needs, with skill names, for a whole page
+# in two queries; UserProfile.active_offered_skills()/active_needed_skills() read them
+CARD_PREFETCHES = [
+    Prefetch("user__offered_skills", OfferedSkill.objects.filter(is_active=True).select_related("skill")),
+    Prefetch("user__needed_skills", NeededSkill.objects.filter(is_active=True).select_related("skill")),
+]
+
+@anonymous_page_cache("browse", {"q": str, "offered": int, "needed": int, "after": int, "before": int})
 def browse_view(request : HttpRequest):
     
     query = request.GET.get("q", "").strip()
     offered_id = request.GET.get("offered", "").strip()
     needed_id = request.GET.get("needed", "").strip()
     
-    qs = UserProfile.objects.select_related("user").prefetch_related("offered_skills__skill", "needed_skills__skill").all()
-        
-    if len(query) >= 3:
-        qs = qs.filter(user__username__icontains=query)
+    qs = UserProfile.objects.select_related("user").prefetch_related(*CARD_PREFETCHES)
+
+    ranked = None
+    if len(query) >= search.MIN_QUERY_LENGTH:
+        # Ranked matches on names, skills, bios and offer descriptions, best first
+        ranked = search.search(query)
+        qs = qs.filter(user_id__in=ranked)
 
     # فلتر: users who OFFER a given skill
+    # (EXISTS rather than a join, so rows need no DISTINCT and pages can seek)
     if offered_id:
         try:
             offered_id_int = int(offered_id)
-            qs = qs.filter(user__offered_skills__skill__id=offered_id_int)
+            qs = qs.filter(Exists(OfferedSkill.objects.filter(user=OuterRef("user"), skill_id=offered_id_int, is_active=True)))
         except ValueError:
             pass
 
@@ -32,27 +45,32 @@ def browse_view(request : HttpRequest):
     if needed_id:
         try:
             needed_id_int = int(needed_id)
-            qs = qs.filter(user__needed_skills__skill__id=needed_id_int)
+            qs = qs.filter(Exists(NeededSkill.objects.filter(user=OuterRef("user"), skill_id=needed_id_int, is_active=True)))
         except ValueError:
             pass
 
-    qs = qs.distinct()
-    
-    #pagination      
-    page_num = request.GET.get("page", 1)
-    paginator = Paginator(qs, 6)
-    profiles_page = paginator.get_page(page_num)
-    
-    skills = Skill.objects.order_by("skill").all()
+    #pagination: pages seek on the profile id, or for a search on the rank
+    after = pagination.parse_cursor(request.GET.get("after"))
+    before = pagination.parse_cursor(request.GET.get("before"))
+    filters = {"q": query, "offered": offered_id, "needed": needed_id}
+    if ranked is None:
+        profiles, previous_cursor, next_cursor = pagination.keyset_page(qs, "id", after, before)
+        total = pagination.estimated_count(qs, filters)
+    else:
+        profiles, previous_cursor, next_cursor, total = pagination.ranked_page(qs, ranked, after, before)
+
+    # How many of the listed profiles offer and need each skill
+    skills = facets.skill_facets(qs, filters)
 
     context = {
-        "profiles": profiles_page,
+        "profiles": profiles,
         "skills": skills,
         "query": query,
         "selected_offered": offered_id,
         "selected_needed": needed_id,
-        "paginator": paginator,
-        "page_obj": profiles_page,
+        "estimated_total": total,
+        "previous_query": urlencode({**filters, "before": previous_cursor}) if previous_cursor is not None else None,
+        "next_query": urlencode({**filters, "after": next_cursor}) if next_cursor is not None else None,
     }
         
         
@@ -0,0 +1,117 @@
+"""
+Whole-page cache for the public pages anonymous visitors see.
+
+Anonymous visitors all get the same page for the same filters, so the
+rendered HTML is cached under the normalized query parameters for
+PAGE_CACHE_TIMEOUT and served with an ETag and Last-Modified that let
+browsers and proxies revalidate with a 304. Writes to skills, offers,
+needs and profiles move a version key on (invalidate()), so every cached
+page is stale at once; the site-wide stats on the home page are allowed
+to trail by the timeout. Signed-in visitors, and anyone with a flash
+message waiting, always get a freshly rendered page.
+"""
+import functools
+import hashlib
+import time
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+PAGE_CACHE_TIMEOUT = 30
+PAGE_MAX_AGE = 10
+
+VERSION_KEY = 'main:page_cache_version'
+
+
+def invalidate():
+    """Make every cached page stale"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def version():
+    """The current cache version; other caches of public page data can key on it too"""
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        current = time.time_ns()
+        if not cache.add(VERSION_KEY, current, None):
+            current = cache.get(VERSION_KEY, current)
+    return current
+
+
+def normalize(request, params):
+    """
+    The parts of the query string a page depends on, as sorted pairs.
+    Whitespace in text is collapsed, ids that do not parse are dropped (the
+    views ignore them) and anything not in ``params`` is left out.
+    """
+    normalized = []
+    for name, kind in sorted(params.items()):
+        value = ' '.join(request.GET.get(name, '').split())
+        if kind is int:
+            try:
+                value = str(int(value))
+            except ValueError:
+                continue
+        if value:
+            normalized.append((name, value))
+    return normalized
+
+
+def _cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(messages.get_messages(request))
+    )
+
+
+def _finish(request, page):
+    content, content_type, etag, last_modified = page
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=PAGE_MAX_AGE)
+    # Signed-in visitors carry a session cookie and must not be served this
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def anonymous_page_cache(name, params=None, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Cache a view's anonymous GET responses under ``name`` and the query
+    parameters in ``params`` ({name: str or int}); other parameters are
+    ignored, so they must not change the page.
+    """
+    params = params or {}
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view(request, *args, **kwargs)
+
+            digest = hashlib.md5(repr(normalize(request, params)).encode()).hexdigest()
+            key = f'main:page:{name}:{version()}:{digest}'
+            page = cache.get(key)
+            if page is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming or response.cookies:
+                    return response
+                page = (
+                    response.content,
+                    response['Content-Type'],
+                    f'"{hashlib.md5(response.content).hexdigest()}"',
+                    int(time.time()),
+                )
+                cache.set(key, page, timeout)
+            return _finish(request, page)
+
+        return wrapped
+
+    return decorator
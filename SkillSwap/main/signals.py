@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserProfile
+from skills.models import Skill, OfferedSkill, NeededSkill
+from . import page_cache
+
+
+# Cached public pages go stale on any write to what browse and home show,
+# once it commits; a page rendered before then would otherwise be cached
+# again with the old data. Search index updates (browse.search.store)
+# invalidate as well, since they land after their own commit.
+
+def invalidate_pages():
+    transaction.on_commit(page_cache.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=OfferedSkill)
+@receiver([post_save, post_delete], sender=NeededSkill)
+@receiver([post_save, post_delete], sender=UserProfile)
+def public_item_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_pages()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login alone, which no public page shows
+    if not raw and (update_fields is None or 'username' in update_fields):
+        invalidate_pages()
@@ -1,3 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import UserProfile
+from skills.models import Skill
+from . import page_cache
 
 # Create your tests here.
+
+class AnonymousPageCacheTestCase(TestCase):
+    """
+    Test suite for the anonymous whole-page cache on home and browse
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.url = reverse('browse:browse_view')
+        self.python = Skill.objects.create(skill='Python')
+        UserProfile.objects.create(user=User.objects.create(username='pythonista'))
+
+    def test_repeat_visits_are_served_from_cache(self):
+        """
+        TEST: A second anonymous visit with equivalent parameters runs no
+        queries and carries validators and a short public max-age
+        """
+        first = self.client.get(self.url, {'q': 'python', 'offered': self.python.id})
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, {'q': '  python ', 'offered': self.python.id, 'utm_source': 'mail'})
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertIn('Last-Modified', again)
+        self.assertIn(f'max-age={page_cache.PAGE_MAX_AGE}', again['Cache-Control'])
+        self.assertIn('Cookie', again['Vary'])
+
+        self.client.get(reverse('main:home_view'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('main:home_view'))
+        self.assertNotEqual(self.client.get(self.url, {'q': 'python'}).content, first.content)
+
+    def test_revalidation_returns_not_modified(self):
+        """
+        TEST: A matching If-None-Match or a current If-Modified-Since gets
+        an empty 304
+        """
+        first = self.client.get(self.url)
+        by_etag = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        by_date = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        for response in (by_etag, by_date):
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_writes_invalidate_cached_pages(self):
+        """
+        TEST: A new skill or profile shows up on the next visit once its
+        transaction commits
+        """
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(skill='Guitar')
+        self.assertContains(self.client.get(self.url), 'Guitar')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.create(user=User.objects.create(username='guitarist'))
+        self.assertContains(self.client.get(self.url), 'guitarist')
+
+    def test_signed_in_visitors_bypass_the_cache(self):
+        """
+        TEST: Signed-in visitors get a freshly rendered page every time,
+        without the anonymous caching headers
+        """
+        self.client.get(self.url)
+        self.client.force_login(User.objects.get(username='pythonista'))
+        response = self.client.get(self.url)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'Logout')
@@ -0,0 +1,255 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+import numpy as np
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+
+from . import broker, clearing, scoring, stats
+
+
+def synthetic_skills(users, skills_per_user=2, seed=0):
+    """
+    Random offer and need rows shaped like broker.load_graph()'s queries.
+
+    Skill popularity follows a Zipf-like curve so a few skills are very
+    crowded, as in production, and 40% of needs have no rate cap.
+    """
+    rng = np.random.default_rng(seed)
+    skill_count = max(50, users // 200)
+    popularity = 1 / np.arange(1, skill_count + 1)
+    popularity /= popularity.sum()
+
+    def rows(kind):
+        owners = np.repeat(np.arange(1, users + 1), skills_per_user)
+        skills = rng.choice(skill_count, size=len(owners), p=popularity) + 1
+        rates = np.round(rng.uniform(15, 80, size=len(owners)), 2)
+        ids = np.arange(1, len(owners) + 1)
+        if kind == 'offer':
+            return list(zip(ids.tolist(), owners.tolist(), skills.tolist(), rates.tolist()))
+        caps = np.where(rng.random(len(owners)) < 0.4, np.nan, rates + 20)
+        urgency = rng.choice(['low', 'medium', 'high'], size=len(owners))
+        return [
+            (i, u, s, None if np.isnan(c) else c, g)
+            for i, u, s, c, g in zip(ids.tolist(), owners.tolist(), skills.tolist(), caps.tolist(), urgency.tolist())
+        ]
+
+    return rows('offer'), rows('need')
+
+
+def bench_broker(sizes):
+    """Graph build and 3/4-cycle search time against user count"""
+    for users in sizes:
+        offers, needs = synthetic_skills(users)
+
+        started = time.perf_counter()
+        graph = broker.build_graph(offers, needs)
+        built = time.perf_counter()
+        cycles = sum(1 for _ in broker.find_cycles(graph))
+        searched = time.perf_counter()
+
+        yield {
+            'users': users,
+            'edges': graph.edge_count,
+            'cycles': cycles,
+            'build_s': round(built - started, 3),
+            'search_s': round(searched - built, 3),
+        }
+
+
+def bench_broker_parallel(sizes):
+    """Partitioned cycle search on a process pool (one worker per CPU) against user count"""
+    workers = os.cpu_count() or 1
+    for users in sizes:
+        graph = broker.build_graph(*synthetic_skills(users))
+
+        started = time.perf_counter()
+        pruned, cycles, _ = broker.find_cycles_parallel(graph, workers=workers)
+        searched = time.perf_counter()
+
+        yield {
+            'users': users,
+            'workers': workers,
+            'edges': graph.edge_count,
+            'scc_edges': pruned.edge_count,
+            'cycles': len(cycles),
+            'search_s': round(searched - started, 3),
+        }
+
+
+def bench_clearing(sizes):
+    """Greedy + local-search cycle packing (capacity 2, 30s budget) against candidate count"""
+    rng = np.random.default_rng(0)
+    for count in sizes:
+        population = max(count // 2, 10)
+        lengths = rng.choice([3, 4], size=count)
+        candidates = [
+            (tuple(rng.choice(population, size=length, replace=False).tolist()), float(w))
+            for length, w in zip(lengths, rng.uniform(1, 4, size=count))
+        ]
+
+        started = time.perf_counter()
+        _, stats = clearing.pack_cycles(candidates, capacity=2, deadline=time.time() + 30)
+        elapsed = time.perf_counter() - started
+
+        yield {
+            'candidates': count,
+            'selected': stats['selected'],
+            'served': stats['users_served'],
+            'greedy_w': round(stats['greedy_weight']),
+            'final_w': round(stats['total_weight']),
+            'seconds': round(elapsed, 3),
+        }
+
+
+def bench_scoring(sizes):
+    """Vectorized scoring and top-20 selection against candidate count, with a full Python sort for reference"""
+    rng = np.random.default_rng(0)
+    for count in sizes:
+        rates = np.round(rng.uniform(15, 80, size=count), 2)
+        caps = np.where(rng.random(count) < 0.4, np.nan, rates + rng.uniform(0, 40, size=count))
+        labels = rng.choice(['low', 'medium', 'high'], size=count)
+        counter_rates = np.where(rng.random(count) < 0.1, np.nan, rng.uniform(15, 80, size=count))
+        counts = rng.integers(0, 20, size=count).astype(float)
+        sums = counts * rng.uniform(1, 5, size=count)
+
+        started = time.perf_counter()
+        scores = scoring.score_batch(rates, caps, labels, counter_rates, sums, counts)
+        scored = time.perf_counter()
+        best = scoring.top_k(scores, 20)
+        picked = time.perf_counter()
+        reference = sorted(range(count), key=lambda i: (-scores[i], i))[:20]
+        sorted_at = time.perf_counter()
+
+        assert best.tolist() == reference
+        yield {
+            'candidates': count,
+            'score_ms': round((scored - started) * 1000, 2),
+            'top_k_ms': round((picked - scored) * 1000, 2),
+            'full_sort_ms': round((sorted_at - picked) * 1000, 2),
+        }
+
+
+def bench_home(sizes, requests_per_client=20):
+    """Anonymous home page latency against concurrent clients, starting from a cold site-stats cache"""
+    for clients in sizes:
+        cache.delete(stats.SITE_STATS_KEY)
+
+        def visit(_):
+            client, timings = Client(), []
+            for _ in range(requests_per_client):
+                started = time.perf_counter()
+                client.get('/')
+                timings.append(time.perf_counter() - started)
+            connection.close()
+            return timings
+
+        with ThreadPoolExecutor(clients) as pool:
+            timings = np.array([t for batch in pool.map(visit, range(clients)) for t in batch]) * 1000
+
+        yield {
+            'clients': clients,
+            'requests': len(timings),
+            'p50_ms': round(float(np.percentile(timings, 50)), 2),
+            'p95_ms': round(float(np.percentile(timings, 95)), 2),
+            'max_ms': round(float(timings.max()), 2),
+        }
+
+
+PUBLIC_PAGES = ['/', '/browse/profiles/', '/browse/profiles/?q=python']
+
+
+def bench_pages(sizes, requests_per_client=50):
+    """Anonymous requests per second on the public pages against concurrent clients, rendered afresh and from the page cache"""
+    from main import page_cache
+
+    def load(clients, path, cold):
+        def visit(_):
+            client = Client()
+            for _ in range(requests_per_client):
+                if cold:
+                    page_cache.invalidate()
+                client.get(path)
+            connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            list(pool.map(visit, range(clients)))
+        return clients * requests_per_client / (time.perf_counter() - started)
+
+    for clients in sizes:
+        for path in PUBLIC_PAGES:
+            rendered = load(clients, path, cold=True)
+            cached = load(clients, path, cold=False)
+            yield {
+                'clients': clients,
+                'path': path,
+                'rendered_rps': round(rendered, 1),
+                'cached_rps': round(cached, 1),
+                'speedup': round(cached / rendered, 1),
+            }
+
+
+SEARCH_WORDS = [
+    'python', 'guitar', 'spanish', 'cooking', 'design', 'photography', 'yoga', 'excel',
+    'writing', 'piano', 'marketing', 'drawing', 'arabic', 'django', 'chess', 'knitting',
+]
+
+
+def bench_search(sizes, queries=200, seed=0):
+    """Browse search latency against indexed profile count, on synthetic profiles rolled back afterwards"""
+    from django.contrib.auth.models import User
+    from browse import search
+    from browse.models import ProfileSearch
+
+    rng = np.random.default_rng(seed)
+    words = np.array(SEARCH_WORDS)
+    for profiles in sizes:
+        with transaction.atomic():
+            first = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+            ids = range(first, first + profiles)
+            User.objects.bulk_create([User(id=i, username=f'bench{i}') for i in ids], batch_size=search.BATCH_SIZE)
+            loading = time.perf_counter()
+            search.store([
+                ProfileSearch(
+                    user_id=i, username=f'bench{i}',
+                    skills=' '.join(rng.choice(words, 3)),
+                    bio=' '.join(rng.choice(words, 6)),
+                    descriptions=' '.join(rng.choice(words, 4)),
+                )
+                for i in ids
+            ])
+            indexed = time.perf_counter()
+
+            timings, hits = [], 0
+            for _ in range(queries):
+                # Whole words, prefixes and two-word queries
+                picked = rng.choice(words, rng.integers(1, 3))
+                query = ' '.join(w[:rng.integers(3, len(w) + 1)] for w in picked)
+                started = time.perf_counter()
+                hits += len(search.search(query))
+                timings.append(time.perf_counter() - started)
+            transaction.set_rollback(True)
+
+        timings = np.array(timings) * 1000
+        yield {
+            'profiles': profiles,
+            'index_s': round(indexed - loading, 2),
+            'mean_hits': round(hits / queries, 1),
+            'p50_ms': round(float(np.percentile(timings, 50)), 2),
+            'p95_ms': round(float(np.percentile(timings, 95)), 2),
+        }
+
+
+BENCHMARKS = {
+    'broker': (bench_broker, [1_000, 10_000, 100_000]),
+    'broker_parallel': (bench_broker_parallel, [1_000, 10_000, 100_000]),
+    'clearing': (bench_clearing, [1_000, 10_000, 50_000]),
+    'scoring': (bench_scoring, [1_000, 10_000, 100_000]),
+    'home': (bench_home, [1, 8, 32]),
+    'pages': (bench_pages, [1, 8, 32]),
+    'search': (bench_search, [10_000, 100_000, 1_000_000]),
+}
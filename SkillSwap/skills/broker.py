@@ -0,0 +1,317 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+
+from .cycles import CycleFinder, canonical_rotation, init_worker, search, strongly_connected
+from .models import Skill, OfferedSkill, NeededSkill, BrokerProposal
+
+
+URGENCY_WEIGHTS = {'low': 0.6, 'medium': 0.8, 'high': 1.0}
+
+# Rates are handled in integer cents, packed under a skill rank so one
+# sorted array covers every skill: key = skill_rank * RATE_SPAN + cents.
+RATE_SPAN = 10 ** 8
+
+# Knuth's multiplicative hash, used to spread needs over eligible offers.
+SPREAD = 2654435761
+
+
+class BrokerGraph:
+    """
+    Directed "user X can serve user Y" graph in CSR form.
+
+    Nodes are compact indexes into ``user_ids``. The out-edges of node i
+    sit at positions ``indptr[i]:indptr[i + 1]`` of the per-edge arrays:
+    ``dst`` (the node served), ``offer_ids`` / ``need_ids`` (the rows that
+    justify the edge), ``rates`` (the giver's hourly rate) and ``urgency``
+    (weight of the need served).
+    """
+
+    def __init__(self, user_ids, indptr, dst, offer_ids, need_ids, skill_ids, rates, urgency):
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.dst = dst
+        self.offer_ids = offer_ids
+        self.need_ids = need_ids
+        self.skill_ids = skill_ids
+        self.rates = rates
+        self.urgency = urgency
+
+    @property
+    def node_count(self):
+        return len(self.user_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.dst)
+
+    @property
+    def src(self):
+        return np.repeat(np.arange(self.node_count), np.diff(self.indptr))
+
+    def subgraph(self, keep):
+        """Same nodes, only the edges where the boolean mask ``keep`` is set"""
+        return BrokerGraph(
+            user_ids=self.user_ids,
+            indptr=np.r_[0, np.cumsum(np.bincount(self.src[keep], minlength=self.node_count))],
+            dst=self.dst[keep],
+            offer_ids=self.offer_ids[keep],
+            need_ids=self.need_ids[keep],
+            skill_ids=self.skill_ids[keep],
+            rates=self.rates[keep],
+            urgency=self.urgency[keep],
+        )
+
+
+def _columns(rows, count):
+    if not rows:
+        return [np.array([]) for _ in range(count)]
+    return [np.array(column) for column in zip(*rows)]
+
+
+def build_graph(offers, needs, max_degree=8):
+    """
+    Build a BrokerGraph from offer rows ``(offer_id, user_id, skill_id, rate)``
+    and need rows ``(need_id, user_id, skill_id, max_rate or None, urgency)``.
+
+    An edge X -> Y exists when X offers a skill Y needs at or under Y's cap.
+    Each need links to at most ``max_degree`` eligible offers and each user
+    keeps at most ``max_degree`` out-edges, preferring urgent, cheap ones,
+    which bounds the cycle search on very popular skills.
+    """
+    offer_ids, offer_users, offer_skills, offer_rates = _columns(offers, 4)
+    need_ids, need_users, need_skills, need_caps, need_urgency = _columns(needs, 5)
+
+    empty = np.array([], dtype=np.int64)
+    if not len(offer_ids) or not len(need_ids):
+        return BrokerGraph(empty, np.zeros(1, dtype=np.int64), empty, empty, empty, empty,
+                           np.array([]), np.array([]))
+
+    offer_cents = np.round(offer_rates.astype(float) * 100).astype(np.int64)
+    skills = np.unique(offer_skills.astype(np.int64))
+    offer_keys = np.searchsorted(skills, offer_skills.astype(np.int64)) * RATE_SPAN + offer_cents
+    order = np.argsort(offer_keys, kind='stable')
+    offer_keys = offer_keys[order]
+
+    need_skills = need_skills.astype(np.int64)
+    rank = np.minimum(np.searchsorted(skills, need_skills), len(skills) - 1)
+    offered = skills[rank] == need_skills
+    caps = np.array([RATE_SPAN - 1 if cap is None else round(float(cap) * 100) for cap in need_caps],
+                    dtype=np.int64)
+    lo = np.searchsorted(offer_keys, rank * RATE_SPAN, side='left')
+    hi = np.searchsorted(offer_keys, rank * RATE_SPAN + np.minimum(caps, RATE_SPAN - 1), side='right')
+    eligible = np.where(offered, hi - lo, 0)
+
+    need_users = need_users.astype(np.int64)
+    slots = np.arange(max_degree)
+    start = (need_users * SPREAD) % np.maximum(eligible, 1)
+    picks = lo[:, None] + (start[:, None] + slots) % np.maximum(eligible, 1)[:, None]
+    valid = slots < eligible[:, None]
+
+    need_index = np.broadcast_to(np.arange(len(need_ids))[:, None], picks.shape)[valid]
+    offer_index = order[picks[valid]]
+    src_users = offer_users.astype(np.int64)[offer_index]
+    dst_users = need_users[need_index]
+    keep = src_users != dst_users
+    need_index, offer_index = need_index[keep], offer_index[keep]
+    src_users, dst_users = src_users[keep], dst_users[keep]
+
+    weights = np.array([URGENCY_WEIGHTS.get(u, 0.8) for u in need_urgency])[need_index]
+    cents = offer_cents[offer_index]
+
+    # One edge per (X, Y), then cap out-degree, both by urgency then price.
+    order = np.lexsort((cents, -weights, dst_users, src_users))
+    pair = np.r_[True, (src_users[order][1:] != src_users[order][:-1]) |
+                       (dst_users[order][1:] != dst_users[order][:-1])]
+    order = order[pair]
+    order = order[np.lexsort((cents[order], -weights[order], src_users[order]))]
+    sorted_src = src_users[order]
+    first = np.r_[0, np.flatnonzero(sorted_src[1:] != sorted_src[:-1]) + 1]
+    group_start = np.repeat(first, np.diff(np.r_[first, len(order)]))
+    order = order[np.arange(len(order)) - group_start < max_degree]
+
+    user_ids = np.unique(np.r_[src_users[order], dst_users[order]])
+    src = np.searchsorted(user_ids, src_users[order])
+    indptr = np.r_[0, np.cumsum(np.bincount(src, minlength=len(user_ids)))]
+
+    return BrokerGraph(
+        user_ids=user_ids,
+        indptr=indptr,
+        dst=np.searchsorted(user_ids, dst_users[order]),
+        offer_ids=offer_ids.astype(np.int64)[offer_index[order]],
+        need_ids=need_ids.astype(np.int64)[need_index[order]],
+        skill_ids=offer_skills.astype(np.int64)[offer_index[order]],
+        rates=cents[order] / 100,
+        urgency=weights[order],
+    )
+
+
+def load_graph(max_degree=8):
+    """Build the graph from every active OfferedSkill and NeededSkill"""
+    offers = OfferedSkill.objects.filter(is_active=True).values_list(
+        'id', 'user_id', 'skill_id', 'hourly_rate_equivalent'
+    )
+    needs = NeededSkill.objects.filter(is_active=True).values_list(
+        'id', 'user_id', 'skill_id', 'max_hourly_rate', 'urgency'
+    )
+    return build_graph(list(offers), list(needs), max_degree=max_degree)
+
+
+def find_cycles(graph, lengths=(3, 4), min_fairness=50):
+    """Yield every 3/4-cycle of ``graph`` in-process; see cycles.CycleFinder"""
+    finder = CycleFinder(graph.indptr, graph.dst, graph.rates)
+    return finder.cycles(range(graph.node_count), lengths, min_fairness)
+
+
+def find_cycles_parallel(graph, workers=1, time_budget=None, lengths=(3, 4), min_fairness=50, max_cycles=None):
+    """
+    Search ``graph`` for cycles across a pool of ``workers`` processes.
+
+    Edges between strongly connected components can never be on a cycle,
+    so they are dropped first and only nodes inside a non-trivial component
+    are used as start nodes. Those are split into blocks that workers
+    search against a shared copy of the CSR arrays, sent once per worker.
+    Results are merged with each cycle in canonical rotation so duplicates
+    collapse. Returns ``(graph, cycles, finished)`` where ``graph`` is the
+    pruned graph the edge indexes refer to and ``finished`` is False when
+    ``time_budget`` seconds ran out first.
+    """
+    deadline = time.time() + time_budget if time_budget else None
+
+    component = np.array(strongly_connected(graph.indptr, graph.dst), dtype=np.int64)
+    graph = graph.subgraph(component[graph.src] == component[graph.dst])
+    starts = np.flatnonzero(np.diff(graph.indptr))
+    blocks = [block.tolist() for block in np.array_split(starts, max(workers, 1) * 4) if len(block)]
+
+    results = []
+    if workers <= 1:
+        init_worker(graph.indptr, graph.dst, graph.rates)
+        results = [search(block, lengths, min_fairness, deadline) for block in blocks]
+    elif blocks:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(graph.indptr, graph.dst, graph.rates),
+        ) as pool:
+            futures = [pool.submit(search, block, lengths, min_fairness, deadline) for block in blocks]
+            done, pending = wait(futures, timeout=None if deadline is None else max(deadline - time.time(), 0) + 5)
+            for future in pending:
+                future.cancel()
+            results = [future.result() for future in done]
+            if pending:
+                results.append(([], False))
+
+    src = graph.src
+    merged = {}
+    for cycles, _ in results:
+        for cycle in cycles:
+            merged.setdefault(canonical_rotation(cycle, src), None)
+    cycles = sorted(merged)
+    if max_cycles:
+        cycles = cycles[:max_cycles]
+
+    return graph, cycles, all(finished for _, finished in results)
+
+
+def score_cycle(graph, cycle):
+    """
+    Return (fairness_score, efficiency_score) for a cycle, both 0-100.
+
+    Everyone gives one hour, so each participant gives their own rate and
+    receives their predecessor's; fairness is the worst give/receive balance.
+    Efficiency is the mean urgency of the needs served, discounted 10% for
+    each participant beyond three since longer chains are harder to run.
+    """
+    rates = [graph.rates[e] for e in cycle]
+    fairness = min(min(rates[i], rates[i - 1]) / max(rates[i], rates[i - 1]) for i in range(len(rates)))
+    urgency = sum(graph.urgency[e] for e in cycle) / len(cycle)
+    efficiency = urgency * (1 - 0.1 * (len(cycle) - 3))
+    return int(fairness * 100), int(round(efficiency * 100))
+
+
+def cycle_key(graph, cycle):
+    """Participant user ids, starting from the lowest, e.g. '3-17-9'"""
+    return '-'.join(str(graph.user_ids[graph.dst[e]]) for e in (cycle[-1],) + tuple(cycle[:-1]))
+
+
+def build_proposals(graph, cycles):
+    """Turn cycles into unsaved BrokerProposal rows"""
+    user_ids = {int(graph.user_ids[graph.dst[e]]) for cycle in cycles for e in cycle}
+    usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+    skill_names = dict(Skill.objects.values_list('id', 'skill'))
+
+    proposals = []
+    for cycle in cycles:
+        fairness, efficiency = score_cycle(graph, cycle)
+        participants = []
+        for i, e in enumerate(cycle):
+            received = cycle[i - 1]
+            giver = int(graph.user_ids[graph.dst[received]])
+            participants.append({
+                'user_id': giver,
+                'username': usernames.get(giver, ''),
+                'gives_offer_id': int(graph.offer_ids[e]),
+                'gives_skill': skill_names.get(int(graph.skill_ids[e]), ''),
+                'gives_to_user_id': int(graph.user_ids[graph.dst[e]]),
+                'receives_offer_id': int(graph.offer_ids[received]),
+                'receives_for_need_id': int(graph.need_ids[received]),
+                'gives_value': float(graph.rates[e]),
+                'receives_value': float(graph.rates[received]),
+            })
+
+        names = [p['username'] for p in participants]
+        proposals.append(BrokerProposal(
+            proposal_type=f'chain_{len(cycle)}',
+            title=f'{len(cycle)}-Person Chain: ' + ' → '.join(names + names[:1]),
+            description='\n'.join(
+                f"{p['username']} teaches {p['gives_skill']} to {usernames.get(p['gives_to_user_id'], '')}"
+                for p in participants
+            ),
+            participants_data={'participants': participants},
+            cycle_key=cycle_key(graph, cycle),
+            fairness_score=fairness,
+            efficiency_score=efficiency,
+        ))
+    return proposals
+
+
+def generate_proposals(max_degree=8, lengths=(3, 4), min_fairness=50, max_cycles=None,
+                       workers=1, time_budget=None, batch_size=1000, dry_run=False):
+    """
+    Find chains among all active skills and store the ones not proposed yet.
+
+    Every new proposal goes out in a single bulk insert. Returns a dict of
+    run statistics.
+    """
+    started = time.monotonic()
+    graph = load_graph(max_degree=max_degree)
+    loaded = time.monotonic()
+
+    graph, cycles, finished = find_cycles_parallel(
+        graph, workers=workers, time_budget=time_budget, lengths=lengths,
+        min_fairness=min_fairness, max_cycles=max_cycles,
+    )
+    searched = time.monotonic()
+
+    existing = set(BrokerProposal.objects.exclude(cycle_key='').values_list('cycle_key', flat=True))
+    fresh = [cycle for cycle in cycles if cycle_key(graph, cycle) not in existing]
+
+    created = 0
+    if not dry_run and fresh:
+        created = len(BrokerProposal.objects.bulk_create(build_proposals(graph, fresh), batch_size=batch_size))
+
+    return {
+        'users': graph.node_count,
+        'edges': graph.edge_count,
+        'cycles': len(cycles),
+        'new': len(fresh),
+        'created': created,
+        'finished': finished,
+        'load_seconds': loaded - started,
+        'search_seconds': searched - loaded,
+        'total_seconds': time.monotonic() - started,
+    }
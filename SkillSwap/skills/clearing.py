@@ -0,0 +1,208 @@
+from collections import defaultdict
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BrokerProposal, ExchangeChain, ChainLink
+from .notifications import notify
+
+
+def pack_cycles(candidates, capacity=2, pinned=(), deadline=None):
+    """
+    Pick a heavy set of cycles where nobody sits in more than ``capacity`` of them.
+
+    ``candidates`` is a list of ``(users, weight)`` and ``pinned`` a list of
+    user tuples for chains already running, which use up capacity but are
+    never dropped. A greedy pass by weight is followed by local search: force
+    an unpicked cycle in, evict the lightest cycles blocking it, greedily
+    refill the freed seats, and keep the move only if total weight grows.
+    Passes repeat until none improves or ``time.time()`` passes ``deadline``.
+
+    Returns ``(selected, stats)`` with ``selected`` as candidate indexes,
+    heaviest first.
+    """
+    users = [tuple(set(u)) for u, _ in candidates]
+    weights = [w for _, w in candidates]
+    order = sorted(range(len(candidates)), key=lambda i: (-weights[i], i))
+
+    rank = {i: position for position, i in enumerate(order)}
+
+    holders = defaultdict(set)
+    touching = defaultdict(list)
+    for i in order:
+        for u in users[i]:
+            touching[u].append(i)
+    load = dict.fromkeys(touching, 0)
+    for group in pinned:
+        for u in set(group):
+            if u in load:
+                load[u] += 1
+    selected = set()
+
+    def fits(i):
+        for u in users[i]:
+            if load[u] >= capacity:
+                return False
+        return True
+
+    def add(i):
+        selected.add(i)
+        for u in users[i]:
+            load[u] += 1
+            holders[u].add(i)
+
+    def remove(i):
+        selected.discard(i)
+        for u in users[i]:
+            load[u] -= 1
+            holders[u].discard(i)
+
+    def refill(pool):
+        added = []
+        for i in pool:
+            if i not in selected and fits(i):
+                add(i)
+                added.append(i)
+        return added
+
+    refill(order)
+    greedy_weight = sum(weights[i] for i in selected)
+
+    # Only cycles touching users whose seats changed in the last pass can
+    # find a new improving move, so later passes revisit just those.
+    swaps = passes = 0
+    timed_out = False
+    pool = order
+    while pool and not timed_out:
+        passes += 1
+        changed = set()
+        for c in pool:
+            if deadline is not None and time.time() > deadline:
+                timed_out = True
+                break
+            if c in selected:
+                continue
+
+            evict = set()
+            for u in users[c]:
+                over = load[u] - sum(1 for h in holders[u] if h in evict) - capacity + 1
+                blockers = sorted((h for h in holders[u] if h not in evict), key=lambda h: (weights[h], h))
+                if over > len(blockers):
+                    break
+                evict.update(blockers[:max(over, 0)])
+            else:
+                for h in evict:
+                    remove(h)
+                add(c)
+                freed = sorted({i for h in evict for u in users[h] for i in touching[u]}, key=rank.__getitem__)
+                added = refill(freed)
+                gain = weights[c] + sum(weights[i] for i in added) - sum(weights[h] for h in evict)
+                if gain > 1e-9:
+                    swaps += 1
+                    changed.update(u for i in list(evict) + added + [c] for u in users[i])
+                else:
+                    for i in added + [c]:
+                        remove(i)
+                    for h in evict:
+                        add(h)
+        pool = sorted({i for u in changed for i in touching[u]}, key=rank.__getitem__)
+
+    ranked = sorted(selected, key=lambda i: (-weights[i], i))
+    served = {u for i in ranked for u in users[i]}
+    stats = {
+        'candidates': len(candidates),
+        'selected': len(ranked),
+        'users_in_candidates': len(touching),
+        'users_served': len(served),
+        'greedy_weight': round(greedy_weight, 3),
+        'total_weight': round(sum(weights[i] for i in ranked), 3),
+        'swaps': swaps,
+        'passes': passes,
+        'timed_out': timed_out,
+    }
+    return ranked, stats
+
+
+def _proposal_users(cycle_key, participants_data):
+    if cycle_key:
+        return tuple(int(u) for u in cycle_key.split('-'))
+    return tuple(p['user_id'] for p in participants_data.get('participants', []) if 'user_id' in p)
+
+
+def _chain_users():
+    """User ids per chain from a single ChainLink query"""
+    members = defaultdict(list)
+    for chain_id, user_id in ChainLink.objects.values_list('chain_id', 'user_id'):
+        members[chain_id].append(user_id)
+    return members
+
+
+def load_candidates():
+    """
+    Candidate and pinned cycles for the clearing run.
+
+    Generated proposals and chains still being formed are candidates,
+    weighted by size times quality. Proposals already sent out and chains
+    under way are pinned: they hold their participants' seats.
+    Returns ``(candidates, refs, pinned)``, where ``refs[i]`` is the
+    ``('proposal' | 'chain', id)`` of ``candidates[i]``.
+    """
+    candidates, refs, pinned = [], [], []
+
+    proposals = BrokerProposal.objects.exclude(status__in=['rejected', 'converted']).values_list(
+        'id', 'status', 'cycle_key', 'participants_data', 'fairness_score', 'efficiency_score'
+    )
+    for pk, status, key, data, fairness, efficiency in proposals:
+        users = _proposal_users(key, data)
+        if status != 'generated':
+            pinned.append(users)
+        elif len(users) > 1:
+            candidates.append((users, len(users) * (fairness + efficiency) / 200))
+            refs.append(('proposal', pk))
+
+    members = _chain_users()
+    chains = ExchangeChain.objects.filter(
+        status__in=['forming', 'proposed', 'pending', 'accepted', 'in_progress']
+    ).values_list('id', 'status')
+    for pk, status in chains:
+        users = tuple(members.get(pk, ()))
+        if status in ['accepted', 'in_progress']:
+            pinned.append(users)
+        elif len(users) > 1:
+            candidates.append((users, float(len(users))))
+            refs.append(('chain', pk))
+
+    return candidates, refs, pinned
+
+
+def clear(capacity=2, time_budget=10, apply=False):
+    """
+    Choose a conflict-free set of proposals and chains, best first.
+
+    With ``apply`` the chosen generated proposals are marked as proposed in
+    a single update. Returns ``(ranked, stats)`` with ``ranked`` as a list of
+    ``(kind, id, weight)``.
+    """
+    started = time.monotonic()
+    candidates, refs, pinned = load_candidates()
+    deadline = time.time() + time_budget if time_budget else None
+    selected, stats = pack_cycles(candidates, capacity=capacity, pinned=pinned, deadline=deadline)
+
+    ranked = [(*refs[i], candidates[i][1]) for i in selected]
+    if apply:
+        with transaction.atomic():
+            proposals = list(BrokerProposal.objects.select_for_update().filter(
+                id__in=[pk for kind, pk, _ in ranked if kind == 'proposal'], status='generated'
+            ).only('id', 'title', 'cycle_key', 'participants_data'))
+            BrokerProposal.objects.filter(id__in=[p.id for p in proposals]).update(
+                status='proposed', proposed_to_users_at=timezone.now()
+            )
+            notify(
+                (user_id, 'proposal_suggested', proposal)
+                for proposal in proposals for user_id in _proposal_users(proposal.cycle_key, proposal.participants_data)
+            )
+
+    stats['pinned'] = len(pinned)
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    return ranked, stats
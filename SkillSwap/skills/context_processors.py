@@ -1,31 +1,34 @@
-from .models import Notification
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import get_recent_notifications, get_unread_notifications_count
 
 def notifications_context(request):
     """
-    Add notification data to all templates
+    Add notification data to all templates.
+
+    Both values are lazy, so pages that never show the notification bell
+    do not even load the user. The unread count comes from the cache, or
+    else rides along on the recent notifications query.
     """
-    if request.user.is_authenticated:
+    def recent_notifications():
+        if not request.user.is_authenticated:
+            return []
         try:
-         
-            unread_count = Notification.objects.filter(
-                user=request.user, 
-                is_read=False
-            ).count()
-            
+            return list(get_recent_notifications(request.user, 5))
+        except Exception as e:
+            return []
 
-            recent_notifications = Notification.objects.filter(
-                user=request.user
-            ).order_by('-created_at')[:5]
-            
+    recent = SimpleLazyObject(recent_notifications)
+
+    def unread_count():
+        if not request.user.is_authenticated:
+            return 0
+        try:
+            return get_unread_notifications_count(request.user, recent)
         except Exception as e:
-           
-            unread_count = 0
-            recent_notifications = []
-    else:
-        unread_count = 0
-        recent_notifications = []
-    
+            return 0
+
     return {
-        'unread_notifications_count': unread_count,
-        'recent_notifications': recent_notifications,
-    }
\ No newline at end of file
+        'unread_notifications_count': SimpleLazyObject(unread_count),
+        'recent_notifications': recent,
+    }
@@ -0,0 +1,114 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Skill, OfferedSkill, NeededSkill, SkillExchange, SkillCounter
+
+
+FIELDS = ('offer_count', 'need_count', 'exchanges_as_offer', 'exchanges_as_response', 'completed_exchanges')
+
+
+def bump(field, skill_ids, delta=1):
+    """
+    Add ``delta`` to ``field`` once per occurrence in ``skill_ids`` as a
+    single UPDATE ... SET field = field + n per skill, creating the row if
+    the skill has none yet (never for decrements, which may run while the
+    skill itself is being deleted).
+    """
+    for skill_id, n in Counter(skill_ids).items():
+        change = {field: F(field) + delta * n}
+        if SkillCounter.objects.filter(skill_id=skill_id).update(**change) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                SkillCounter.objects.create(skill_id=skill_id, **{field: delta * n})
+        except IntegrityError:
+            # Another request created the row first
+            SkillCounter.objects.filter(skill_id=skill_id).update(**change)
+
+
+def exchange_skills(exchange):
+    """(skill id of the initiator's offer, skill id of the responder's offer)"""
+    return exchange.skill_from_initiator.skill_id, exchange.skill_from_responder.skill_id
+
+
+def exchange_created(exchange):
+    offer_skill, response_skill = exchange_skills(exchange)
+    bump('exchanges_as_offer', [offer_skill])
+    bump('exchanges_as_response', [response_skill])
+    if exchange.status == 'completed':
+        bump('completed_exchanges', [offer_skill, response_skill])
+
+
+def exchange_deleted(exchange):
+    offer_skill, response_skill = exchange_skills(exchange)
+    bump('exchanges_as_offer', [offer_skill], -1)
+    bump('exchanges_as_response', [response_skill], -1)
+    if exchange.status == 'completed':
+        bump('completed_exchanges', [offer_skill, response_skill], -1)
+
+
+def exchange_status_changed(exchange, old_status):
+    if (old_status == 'completed') != (exchange.status == 'completed'):
+        bump('completed_exchanges', list(exchange_skills(exchange)), 1 if exchange.status == 'completed' else -1)
+
+
+def top_skills(limit=10):
+    """Most exchanged skills, read from the counters table"""
+    return (
+        SkillCounter.objects.select_related('skill')
+        .annotate(exchanges=F('exchanges_as_offer') + F('exchanges_as_response'))
+        .filter(exchanges__gt=0)
+        .order_by('-exchanges', 'skill__skill')[:limit]
+    )
+
+
+def recount():
+    """{skill_id: {field: value}} computed from scratch, one grouped query per field"""
+    sources = {
+        'offer_count': OfferedSkill.objects.filter(is_active=True).values('skill_id'),
+        'need_count': NeededSkill.objects.filter(is_active=True).values('skill_id'),
+        'exchanges_as_offer': SkillExchange.objects.values(skill_id=F('skill_from_initiator__skill_id')),
+        'exchanges_as_response': SkillExchange.objects.values(skill_id=F('skill_from_responder__skill_id')),
+    }
+    completed = SkillExchange.objects.filter(status='completed')
+    sides = [
+        completed.values(skill_id=F('skill_from_initiator__skill_id')),
+        completed.values(skill_id=F('skill_from_responder__skill_id')),
+    ]
+
+    counts = {pk: dict.fromkeys(FIELDS, 0) for pk in Skill.objects.values_list('id', flat=True)}
+    for field, rows in [*sources.items(), *[('completed_exchanges', side) for side in sides]]:
+        for row in rows.annotate(n=Count('id')).order_by():
+            counts[row['skill_id']][field] += row['n']
+    return counts
+
+
+def verify(fix=False):
+    """
+    Compare the counters with a fresh recount. Returns the mismatches as
+    ``{skill_id: {field: (stored, actual)}}``; with ``fix`` they are written.
+    """
+    actual = recount()
+    stored = {
+        row['skill_id']: row
+        for row in SkillCounter.objects.values('skill_id', *FIELDS)
+    }
+
+    mismatches = {}
+    for skill_id, counts in actual.items():
+        current = stored.get(skill_id, dict.fromkeys(FIELDS, 0))
+        diff = {f: (current[f], counts[f]) for f in FIELDS if current[f] != counts[f]}
+        if diff:
+            mismatches[skill_id] = diff
+
+    if fix and mismatches:
+        with transaction.atomic():
+            SkillCounter.objects.bulk_update(
+                [SkillCounter(skill_id=pk, **actual[pk]) for pk in mismatches if pk in stored], FIELDS
+            )
+            SkillCounter.objects.bulk_create(
+                [SkillCounter(skill_id=pk, **actual[pk]) for pk in mismatches if pk not in stored]
+            )
+    return mismatches
@@ -0,0 +1,152 @@
+"""
+Cycle search over array-encoded graphs.
+
+Kept free of Django imports so process-pool workers can load it without
+setting up the ORM: workers only ever see plain CSR arrays.
+"""
+from collections import defaultdict
+import time
+
+
+class CycleFinder:
+    """
+    Enumerates simple 3- and 4-cycles of a CSR graph.
+
+    The out-edges of node i are ``indptr[i]:indptr[i + 1]`` in ``dst`` and
+    ``rates``. Each cycle is reported once, rotated to start at its lowest
+    node: every other node must have a higher index than the start, so
+    disjoint sets of start nodes can be searched independently.
+    """
+
+    def __init__(self, indptr, dst, rates):
+        self.indptr = list(indptr)
+        self.dst = list(dst)
+        self.rates = list(rates)
+        self.src = [i for i in range(len(self.indptr) - 1) for _ in range(self.indptr[i], self.indptr[i + 1])]
+
+        self.edge_of = {(s, d): e for e, (s, d) in enumerate(zip(self.src, self.dst))}
+        self.in_edges = defaultdict(list)
+        for e, d in enumerate(self.dst):
+            self.in_edges[d].append(e)
+
+    def cycles(self, starts, lengths=(3, 4), min_fairness=50, deadline=None):
+        """
+        Yield cycles starting at each node of ``starts`` as tuples of edge indexes.
+
+        Consecutive edges whose rates differ by more than ``min_fairness``
+        percent are pruned while walking, since such a pair caps the whole
+        cycle's fairness. 4-cycles are joined in the middle: paths
+        a -> b -> c are matched against precomputed c -> d -> a paths instead
+        of walking a third hop. Stops early once ``time.time()`` passes
+        ``deadline``.
+        """
+        indptr, dst, src, rates = self.indptr, self.dst, self.src, self.rates
+        edge_of, in_edges = self.edge_of, self.in_edges
+        ratio = min_fairness / 100
+
+        def fair(e, f):
+            return min(rates[e], rates[f]) >= ratio * max(rates[e], rates[f])
+
+        self.stopped_early = False
+        for a in starts:
+            if deadline is not None and time.time() > deadline:
+                self.stopped_early = True
+                return
+
+            back = defaultdict(list)
+            if 4 in lengths:
+                for e_da in in_edges[a]:
+                    d = src[e_da]
+                    if d <= a:
+                        continue
+                    for e_cd in in_edges[d]:
+                        c = src[e_cd]
+                        if c > a and fair(e_cd, e_da):
+                            back[c].append((e_cd, e_da))
+
+            for e_ab in range(indptr[a], indptr[a + 1]):
+                b = dst[e_ab]
+                if b <= a:
+                    continue
+                for e_bc in range(indptr[b], indptr[b + 1]):
+                    c = dst[e_bc]
+                    if c <= a or not fair(e_ab, e_bc):
+                        continue
+                    if 3 in lengths:
+                        e_ca = edge_of.get((c, a))
+                        if e_ca is not None and fair(e_bc, e_ca) and fair(e_ca, e_ab):
+                            yield (e_ab, e_bc, e_ca)
+                    for e_cd, e_da in back.get(c, ()):
+                        if src[e_da] != b and fair(e_bc, e_cd) and fair(e_da, e_ab):
+                            yield (e_ab, e_bc, e_cd, e_da)
+
+
+def strongly_connected(indptr, dst):
+    """Label each node with its strongly connected component (iterative Tarjan)"""
+    indptr, dst = list(indptr), list(dst)
+    n = len(indptr) - 1
+    index = [-1] * n
+    low = [0] * n
+    label = [-1] * n
+    on_stack = [False] * n
+    stack = []
+    counter = components = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, indptr[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+
+        while work:
+            node, edge = work[-1]
+            if edge < indptr[node + 1]:
+                work[-1] = (node, edge + 1)
+                child = dst[edge]
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, indptr[child]))
+                elif on_stack[child]:
+                    low[node] = min(low[node], index[child])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    label[member] = components
+                    if member == node:
+                        break
+                components += 1
+
+    return label
+
+
+def canonical_rotation(cycle, src):
+    """Rotate a cycle of edge indexes to start at the edge leaving its lowest node"""
+    first = min(range(len(cycle)), key=lambda i: src[cycle[i]])
+    return tuple(cycle[first:]) + tuple(cycle[:first])
+
+
+_finder = None
+
+
+def init_worker(indptr, dst, rates):
+    global _finder
+    _finder = CycleFinder(indptr, dst, rates)
+
+
+def search(starts, lengths, min_fairness, deadline):
+    """Pool task: return (cycles, finished) for a block of start nodes"""
+    cycles = list(_finder.cycles(starts, lengths, min_fairness, deadline))
+    return cycles, not _finder.stopped_early
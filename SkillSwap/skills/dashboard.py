@@ -0,0 +1,134 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from .models import OfferedSkill, NeededSkill, SkillExchange, ExchangeChain, ChainLink
+
+
+ACTIVE_STATUSES = ['pending', 'under_review', 'negotiating', 'accepted', 'in_progress']
+
+RECENT = 5
+COMPLETED = 10
+
+DASHBOARD_TIMEOUT = 300
+
+
+def _version_key(user_id):
+    return f'skills:dashboard_version:{user_id}'
+
+
+def _move_versions(user_ids):
+    # A fresh timestamp rather than incr(): an evicted version can never
+    # come back as a number some older cached dashboard was stored under
+    now = time.time_ns()
+    cache.set_many({_version_key(pk): now for pk in user_ids}, None)
+
+
+def invalidate(*user_ids):
+    """
+    Make the cached dashboards of ``user_ids`` stale by moving their version
+    on once the current transaction commits; a dashboard rendered before
+    then would otherwise be cached under the new version with the old data.
+    """
+    user_ids = [pk for pk in user_ids if pk]
+    if user_ids:
+        transaction.on_commit(lambda: _move_versions(user_ids))
+
+
+def _version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def _count(queryset, field='id', distinct=False):
+    """A correlated COUNT over ``queryset``, 0 when it matches nothing"""
+    counted = queryset.order_by().values('user').annotate(n=Count(field, distinct=distinct)).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def _counts(user):
+    return User.objects.filter(pk=user.pk).values(
+        offered=_count(OfferedSkill.objects.filter(user=OuterRef('pk'), is_active=True)),
+        needed=_count(NeededSkill.objects.filter(user=OuterRef('pk'), is_active=True)),
+        chains=_count(ChainLink.objects.filter(user=OuterRef('pk')), 'chain', distinct=True),
+    ).get()
+
+
+def _exchanges(user):
+    """
+    Every exchange list on the dashboard from one windowed query: the latest
+    initiated and responded-to exchanges by role, the latest active and
+    completed ones by state, and the active total alongside.
+    """
+    state = Case(
+        When(status__in=ACTIVE_STATUSES, then=Value('active')),
+        When(status='completed', then=Value('completed')),
+        default=Value('other'),
+    )
+    role = Case(When(initiator=user, then=Value(1)), default=Value(0), output_field=IntegerField())
+    # Active exchanges list by last update, completed ones by completion
+    touched = Case(When(status='completed', then=F('completed_at')), default=F('last_updated'))
+
+    rows = SkillExchange.objects.filter(Q(initiator=user) | Q(responder=user)).select_related(
+        'initiator', 'responder', 'skill_from_initiator__skill', 'skill_from_responder__skill'
+    ).annotate(
+        state=state,
+        role_rank=Window(RowNumber(), partition_by=[role], order_by=[F('created_at').desc(), F('id').desc()]),
+        state_rank=Window(RowNumber(), partition_by=[state], order_by=[touched.desc(), F('id').desc()]),
+        state_total=Window(Count('id'), partition_by=[state]),
+    ).filter(
+        Q(role_rank__lte=RECENT)
+        | Q(state='active', state_rank__lte=RECENT)
+        | Q(state='completed', state_rank__lte=COMPLETED)
+    )
+
+    lists = {'initiated_exchanges': [], 'responded_exchanges': [], 'active_exchanges': [], 'completed_exchanges': []}
+    active_total = 0
+    for exchange in rows:
+        if exchange.role_rank <= RECENT:
+            role_list = 'initiated_exchanges' if exchange.initiator_id == user.pk else 'responded_exchanges'
+            lists[role_list].append((exchange.role_rank, exchange))
+        if exchange.state == 'active':
+            active_total = exchange.state_total
+            if exchange.state_rank <= RECENT:
+                lists['active_exchanges'].append((exchange.state_rank, exchange))
+        elif exchange.state == 'completed' and exchange.state_rank <= COMPLETED:
+            lists['completed_exchanges'].append((exchange.state_rank, exchange))
+
+    panels = {name: [exchange for _, exchange in sorted(ranked, key=lambda r: r[0])] for name, ranked in lists.items()}
+    return panels, active_total
+
+
+def compute_dashboard(user):
+    """Every dashboard panel in three queries"""
+    counts = _counts(user)
+    panels, active_total = _exchanges(user)
+    return {
+        **panels,
+        'offered_count': counts['offered'],
+        'needed_count': counts['needed'],
+        'active_count': active_total,
+        'chain_count': counts['chains'],
+        'exchange_chains': list(ExchangeChain.objects.filter(chain_links__user=user).distinct()[:RECENT]),
+    }
+
+
+def dashboard_data(user):
+    """
+    compute_dashboard(), cached per user until an exchange, offer, need,
+    chain or notification of theirs changes (see invalidate()).
+    """
+    key = f'skills:dashboard:{user.pk}:{_version(user.pk)}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_dashboard(user)
+        cache.set(key, data, DASHBOARD_TIMEOUT)
+    return data
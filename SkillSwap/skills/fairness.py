@@ -0,0 +1,210 @@
+"""
+Fair-exchange math over plain numbers, free of model instances.
+
+Inputs may be Decimals, floats, ints or numeric strings; floats go through
+str() so 12.1 stays 12.1 rather than its binary expansion. All arithmetic is
+exact Decimal, rounded half-up only where a result is presented, and the
+pure functions are memoized on their (normalized) arguments, so model
+methods called over and over on the same exchange cost a dict lookup.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+
+CACHE_SIZE = 4096
+
+CENTS = Decimal('0.01')
+TENTHS = Decimal('0.1')
+RATIO_PLACES = Decimal('0.00001')
+
+BALANCE_TOLERANCE = Decimal('0.01')
+BALANCED_SCORE = 95
+
+
+def to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value))
+    except InvalidOperation as e:
+        raise ValueError(f'Not a number: {value!r}') from e
+
+
+def _round(value, places):
+    return value.quantize(places, rounding=ROUND_HALF_UP)
+
+
+class FairExchange(NamedTuple):
+    ratio: Decimal
+    hours_ratio: Decimal
+    initiator_hours: Decimal
+    responder_hours: Decimal
+    initiator_value: Decimal
+    responder_value: Decimal
+    total_value: Decimal
+    is_balanced: bool
+    imbalance: Decimal
+
+    def as_dict(self):
+        """JSON-ready floats, shaped like calculate_fair_exchange() has always returned"""
+        return {
+            'ratio': float(self.ratio),
+            'initiator_hours': float(self.initiator_hours),
+            'responder_hours': float(self.responder_hours),
+            'initiator_value': float(self.initiator_value),
+            'responder_value': float(self.responder_value),
+            'total_value': float(self.total_value),
+            'is_balanced': self.is_balanced,
+            'imbalance': float(self.imbalance),
+        }
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fair_exchange(rate_a, rate_b):
+    if rate_a <= 0 or rate_b <= 0:
+        return None
+
+    # The cheaper side works more hours, rounded to the cent.
+    if rate_a >= rate_b:
+        hours_a, hours_b = Decimal('1.00'), _round(rate_a / rate_b, CENTS)
+    else:
+        hours_a, hours_b = _round(rate_b / rate_a, CENTS), Decimal('1.00')
+
+    value_a = rate_a * hours_a
+    value_b = rate_b * hours_b
+    total_value = (value_a + value_b) / 2
+    imbalance = abs(value_a - value_b)
+    tolerance = total_value * BALANCE_TOLERANCE if total_value > 0 else BALANCE_TOLERANCE
+
+    return FairExchange(
+        ratio=rate_a / rate_b,
+        hours_ratio=_round(max(rate_a, rate_b) / min(rate_a, rate_b), RATIO_PLACES),
+        initiator_hours=hours_a,
+        responder_hours=hours_b,
+        initiator_value=value_a,
+        responder_value=value_b,
+        total_value=_round(total_value, CENTS),
+        is_balanced=imbalance <= tolerance,
+        imbalance=_round(imbalance, CENTS),
+    )
+
+
+def fair_exchange(rate_a, rate_b):
+    """
+    Hours each side gives so an exchange between two hourly rates balances,
+    as a FairExchange, or None unless both rates are positive.
+    """
+    return _fair_exchange(to_decimal(rate_a), to_decimal(rate_b))
+
+
+def fair_exchanges(pairs, rates):
+    """{(id_a, id_b): fair_exchange() or None} for id pairs looked up in ``rates``"""
+    return {
+        (a, b): fair_exchange(rates[a], rates[b]) if a in rates and b in rates else None
+        for a, b in pairs
+    }
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _value_fairness(given, received):
+    high = max(given, received)
+    if high <= 0:
+        return 0
+    return float(_round(min(given, received) / high * 100, TENTHS))
+
+
+def value_fairness(given, received):
+    """0-100 (1 decimal place) for how closely two amounts of value match"""
+    return _value_fairness(to_decimal(given), to_decimal(received))
+
+
+def exchange_value(rate, hours):
+    return to_decimal(rate) * to_decimal(hours)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fairness_score(rate_a, hours_a, rate_b, hours_b):
+    if min(rate_a, hours_a, rate_b, hours_b) <= 0:
+        return 0
+    return _value_fairness(rate_a * hours_a, rate_b * hours_b)
+
+
+def fairness_score(rate_a, hours_a, rate_b, hours_b):
+    """Fairness of the value each side gives; 0 unless every rate and hour count is positive"""
+    return _fairness_score(to_decimal(rate_a), to_decimal(hours_a), to_decimal(rate_b), to_decimal(hours_b))
+
+
+def value_imbalance(rate_a, hours_a, rate_b, hours_b):
+    return float(abs(exchange_value(rate_a, hours_a) - exchange_value(rate_b, hours_b)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _suggest_adjustment(rate_a, hours_a, rate_b, hours_b):
+    score = _fairness_score(rate_a, hours_a, rate_b, hours_b)
+    if rate_a <= 0 or rate_b <= 0:
+        return None
+
+    perfect_ratio = rate_a / rate_b
+    current_ratio = hours_a / hours_b if hours_b > 0 else 0
+    if abs(current_ratio - perfect_ratio) / perfect_ratio <= Decimal('0.05'):
+        return {'adjustment_needed': False, 'fairness_score': score}
+
+    if perfect_ratio >= 1:
+        hours = (Decimal(1), _round(perfect_ratio, TENTHS))
+    else:
+        hours = (_round(1 / perfect_ratio, TENTHS), Decimal(1))
+    return {
+        'perfect_ratio': float(_round(perfect_ratio, CENTS)),
+        'adjustment_needed': True,
+        'suggested_initiator_hours': float(hours[0]),
+        'suggested_responder_hours': float(hours[1]),
+        'current_fairness_score': score,
+    }
+
+
+def suggest_adjustment(rate_a, hours_a, rate_b, hours_b):
+    """
+    Hours that would line up with the rate ratio when the current split is
+    more than 5% off it, else ``{'adjustment_needed': False, ...}``;
+    None unless both rates are positive.
+    """
+    suggestion = _suggest_adjustment(to_decimal(rate_a), to_decimal(hours_a), to_decimal(rate_b), to_decimal(hours_b))
+    return dict(suggestion) if suggestion else suggestion
+
+
+def fairness_report(rate_a, hours_a, rate_b, hours_b, calculated_ratio=0, total_value=0):
+    """Everything the exchange detail page shows, including the adjustment, in one pass"""
+    rate_a, hours_a, rate_b, hours_b = map(to_decimal, (rate_a, hours_a, rate_b, hours_b))
+    value_a = rate_a * hours_a
+    value_b = rate_b * hours_b
+    score = _fairness_score(rate_a, hours_a, rate_b, hours_b)
+    suggestion = _suggest_adjustment(rate_a, hours_a, rate_b, hours_b)
+
+    return {
+        'fairness_score': score,
+        'initiator_value': float(value_a),
+        'responder_value': float(value_b),
+        'value_difference': float(abs(value_a - value_b)),
+        'hourly_rate_ratio': float(rate_a / rate_b) if rate_b > 0 else 0,
+        'hours_ratio': float(hours_a / hours_b) if hours_b > 0 else 0,
+        'is_balanced': score >= BALANCED_SCORE,
+        'calculated_ratio': float(calculated_ratio),
+        'total_value': float(total_value),
+        'adjustment': dict(suggestion) if suggestion else suggestion,
+    }
+
+
+def fairness_scores(rates_a, hours_a, rates_b, hours_b):
+    """
+    fairness_score() over whole arrays at once, in float arithmetic: for
+    aggregates, where a tie at the rounding boundary does not matter.
+    """
+    rates_a, hours_a, rates_b, hours_b = (np.asarray(a, dtype=float) for a in (rates_a, hours_a, rates_b, hours_b))
+    value_a = rates_a * hours_a
+    value_b = rates_b * hours_b
+    valid = (rates_a > 0) & (hours_a > 0) & (rates_b > 0) & (hours_b > 0)
+    high = np.where(valid, np.fmax(value_a, value_b), 1)
+    return np.where(valid, np.round(np.fmin(value_a, value_b) / high * 100, 1), 0.0)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from skills import fairness, rollups
+from skills.models import SkillExchange, RollupWatermark
+
+
+class Command(BaseCommand):
+    help = "Fill in SkillExchange.fairness_score for rows saved before it was stored, or whose score drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Exchanges read and updated per query")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = (
+            'id', 'fairness_score', 'initiator_hourly_rate', 'initiator_hours_required',
+            'responder_hourly_rate', 'responder_hours_required',
+        )
+
+        # Walk the table by primary key so every batch is an index range scan
+        # and only rows whose score changed are written back.
+        last_id = scanned = updated = 0
+        while True:
+            rows = list(SkillExchange.objects.filter(id__gt=last_id).order_by('id').values_list(*fields)[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            stale = []
+            for pk, stored, *inputs in rows:
+                score = fairness.fairness_score(*inputs)
+                if stored != fairness.to_decimal(score):
+                    stale.append(SkillExchange(id=pk, fairness_score=score))
+            SkillExchange.objects.bulk_update(stale, ['fairness_score'])
+            updated += len(stale)
+
+        # bulk_update leaves last_updated alone, so make the next rollup run redo every day
+        if updated:
+            RollupWatermark.objects.filter(name=rollups.WATERMARK).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled fairness scores: {updated} of {scanned} exchanges updated"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from skills.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = "Time SkillSwap's batch engines on synthetic data, one row per input size"
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS))
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            help="Input sizes to run, overriding the benchmark's defaults")
+
+    def handle(self, *args, **options):
+        bench, default_sizes = BENCHMARKS[options['name']]
+        self.stdout.write(bench.__doc__)
+
+        header = None
+        for row in bench(options['sizes'] or default_sizes):
+            if header is None:
+                header = list(row)
+                self.stdout.write('  '.join(f'{name:>12}' for name in header))
+            self.stdout.write('  '.join(f'{row[name]:>12}' for name in header))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from skills import clearing
+
+
+class Command(BaseCommand):
+    help = "Pick a conflict-free set of broker proposals and chains where each user sits in at most k of them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=2,
+                            help="Most chains any one user may sit in at once")
+        parser.add_argument('--time-budget', type=float, default=10,
+                            help="Seconds the optimizer may spend improving the greedy solution")
+        parser.add_argument('--top', type=int, default=20,
+                            help="How many of the chosen cycles to list")
+        parser.add_argument('--apply', action='store_true',
+                            help="Mark the chosen generated proposals as proposed")
+
+    def handle(self, *args, **options):
+        ranked, stats = clearing.clear(
+            capacity=options['capacity'],
+            time_budget=options['time_budget'],
+            apply=options['apply'],
+        )
+
+        for position, (kind, pk, weight) in enumerate(ranked[:options['top']], start=1):
+            self.stdout.write(f"{position:>4}. {kind} #{pk}  weight {weight:.2f}")
+
+        self.stdout.write(
+            f"Chose {stats['selected']} of {stats['candidates']} candidates, serving "
+            f"{stats['users_served']} of {stats['users_in_candidates']} users "
+            f"(weight {stats['greedy_weight']} greedy -> {stats['total_weight']}, "
+            f"{stats['swaps']} swaps, {stats['seconds']}s)"
+        )
+        if stats['timed_out']:
+            self.stdout.write(self.style.WARNING("Time budget ran out before the search converged"))
+        if options['apply']:
+            self.stdout.write(self.style.SUCCESS("Chosen proposals marked as proposed"))
@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from skills import outbox
+
+
+PURGE_EVERY = 3600
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox events as notifications, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE,
+                            help="Events claimed per transaction")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep draining, polling every --interval seconds when idle")
+        parser.add_argument('--interval', type=float, default=2,
+                            help="Seconds to wait between polls with --loop")
+        parser.add_argument('--stats', action='store_true',
+                            help="Only report the outbox lag")
+        parser.add_argument('--purge-days', type=int,
+                            help="Also delete events delivered more than this many days ago")
+
+    def report(self):
+        lag = outbox.lag()
+        self.stdout.write(
+            f"Outbox: {lag['pending']} pending ({lag['retrying']} retrying), "
+            f"oldest {lag['oldest_age']}s, {lag['dead']} given up"
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.report()
+            return
+
+        if options['loop'] and not settings.SKILLSWAP_OUTBOX_WORKER:
+            raise CommandError(
+                "SKILLSWAP_OUTBOX_WORKER is off: without a shared database and cache a separate drainer "
+                "cannot see the web service's events, which are delivered in process instead"
+            )
+
+        purged_at = None
+        while True:
+            delivered, failed = outbox.drain(batch_size=options['batch_size'])
+            if delivered or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} events, {failed} failed"))
+                self.report()
+            if options['purge_days'] is not None and (purged_at is None or time.monotonic() - purged_at > PURGE_EVERY):
+                purged_at = time.monotonic()
+                purged = outbox.purge(timezone.now() - timedelta(days=options['purge_days']))
+                if purged:
+                    self.stdout.write(f"Purged {purged} delivered events")
+            if not options['loop']:
+                break
+            if not delivered:
+                time.sleep(options['interval'])
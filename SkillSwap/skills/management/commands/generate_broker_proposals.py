@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from skills import broker
+
+
+class Command(BaseCommand):
+    help = "Find 3- and 4-person exchange chains among active skills and store them as BrokerProposals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lengths', type=int, nargs='+', choices=[3, 4], default=[3, 4],
+                            help="Chain lengths to search for")
+        parser.add_argument('--max-degree', type=int, default=8,
+                            help="Most users each user is linked to as a potential provider")
+        parser.add_argument('--min-fairness', type=int, default=50,
+                            help="Drop chains where neighbouring rates differ by more than this percentage")
+        parser.add_argument('--max-cycles', type=int, default=None,
+                            help="Stop after this many chains")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Processes to search the graph with")
+        parser.add_argument('--time-budget', type=float, default=None,
+                            help="Seconds the search may run before keeping what it has found")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Search without writing proposals")
+
+    def handle(self, *args, **options):
+        stats = broker.generate_proposals(
+            max_degree=options['max_degree'],
+            lengths=tuple(options['lengths']),
+            min_fairness=options['min_fairness'],
+            max_cycles=options['max_cycles'],
+            workers=options['workers'],
+            time_budget=options['time_budget'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(
+            f"{stats['users']} users, {stats['edges']} edges: found {stats['cycles']} chains "
+            f"({stats['new']} new) in {stats['search_seconds']:.2f}s"
+        )
+        if not stats['finished']:
+            self.stdout.write(self.style.WARNING("Time budget ran out; results are partial"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {stats['created']} broker proposals in {stats['total_seconds']:.2f}s"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from skills import match_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MatchCandidate index from all active offered and needed skills"
+
+    def handle(self, *args, **options):
+        count = match_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt match index: {count} candidates"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from skills import rollups
+
+
+class Command(BaseCommand):
+    help = "Roll up exchanges changed since the last run into the daily rollup table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Rebuild every day from scratch, also dropping deleted exchanges")
+
+    def handle(self, *args, **options):
+        days, exchanges = rollups.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {exchanges} changed exchanges across {days} days"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from skills import notifications
+
+
+class Command(BaseCommand):
+    help = "Recount per-user unread notification counters from scratch and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help="Overwrite drifted counters with the recounted values")
+
+    def handle(self, *args, **options):
+        mismatches = notifications.verify_unread(fix=options['fix'])
+
+        for user_id, (stored, actual) in sorted(mismatches.items()):
+            self.stdout.write(f"User #{user_id}: unread {stored} -> {actual}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All notification counters match"))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed counters for {len(mismatches)} users"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} users have drifted; rerun with --fix"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from skills import counters
+
+
+class Command(BaseCommand):
+    help = "Recount per-skill offer, need and exchange counters from scratch and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help="Overwrite drifted counters with the recounted values")
+
+    def handle(self, *args, **options):
+        mismatches = counters.verify(fix=options['fix'])
+
+        for skill_id, diff in sorted(mismatches.items()):
+            fields = ", ".join(f"{field} {stored} -> {actual}" for field, (stored, actual) in diff.items())
+            self.stdout.write(f"Skill #{skill_id}: {fields}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All skill counters match"))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed counters for {len(mismatches)} skills"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} skills have drifted; rerun with --fix"))
@@ -0,0 +1,96 @@
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .matching import candidate_pairs
+from . import scoring
+from .models import MatchCandidate
+
+
+BATCH_SIZE = 1000
+
+PAIR_FIELDS = ('id', 'user_id', 'offer_id', 'offer_user_id', 'offer_rate', 'max_hourly_rate', 'urgency')
+
+
+def build_candidates(rows):
+    """
+    Score a batch of candidate_pairs() rows and turn them into MatchCandidate
+    objects, one per participant.
+
+    Both rows of a pair share rate fit, urgency and fairness (the offer's rate
+    against the needing user's own rates); reputation is the counterparty's,
+    so the two participants can see the same pair scored differently.
+    """
+    if not rows:
+        return []
+    need_ids, need_users, offer_ids, offer_users, rates, caps, urgency = zip(*rows)
+    users = set(need_users) | set(offer_users)
+    own_rates = scoring.offer_rates(users)
+    ratings = scoring.received_ratings(users)
+
+    rates = np.array(rates, dtype=float)
+    caps = np.array([np.nan if cap is None else cap for cap in caps], dtype=float)
+    counter_rates = np.array([own_rates.get(u, np.nan) for u in need_users])
+
+    def scores_rated_by(counterparties):
+        stars, counts = np.array([ratings.get(u, (0, 0)) for u in counterparties], dtype=float).reshape(-1, 2).T
+        return scoring.score_batch(rates, caps, urgency, counter_rates, stars, counts).tolist()
+
+    candidates = []
+    rows = zip(need_ids, need_users, offer_ids, offer_users, scores_rated_by(offer_users), scores_rated_by(need_users))
+    for need_id, need_user_id, offer_id, offer_user_id, need_side, offer_side in rows:
+        candidates.append(MatchCandidate(
+            user_id=need_user_id, offer_id=offer_id, need_id=need_id,
+            match_type='skill_match', score=need_side,
+        ))
+        candidates.append(MatchCandidate(
+            user_id=offer_user_id, offer_id=offer_id, need_id=need_id,
+            match_type='need_match', score=offer_side,
+        ))
+    return candidates
+
+
+@transaction.atomic
+def _replace(stale, pairs):
+    stale.delete()
+    rows = pairs.values_list(*PAIR_FIELDS).iterator(chunk_size=BATCH_SIZE)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        MatchCandidate.objects.bulk_create(build_candidates(batch), batch_size=BATCH_SIZE)
+
+
+def sync_offer(offer):
+    """
+    Recompute the candidates of a single offer after it is created, re-rated or
+    toggled, along with those of its owner's needs, whose fairness uses it
+    """
+    _replace(
+        MatchCandidate.objects.filter(Q(offer_id=offer.pk) | Q(need__user_id=offer.user_id)),
+        candidate_pairs().filter(Q(offer_id=offer.pk) | Q(user_id=offer.user_id)),
+    )
+
+
+def sync_need(need):
+    """Recompute the candidates of a single need after it is created, re-capped or toggled"""
+    _replace(
+        MatchCandidate.objects.filter(need_id=need.pk),
+        candidate_pairs().filter(id=need.pk),
+    )
+
+
+def sync_user(user):
+    """
+    Recompute every candidate touching ``user``, e.g. after a bulk edit of
+    their skills or a new rating changing their reputation
+    """
+    _replace(
+        MatchCandidate.objects.filter(Q(offer__user=user) | Q(need__user=user)),
+        candidate_pairs().filter(Q(user=user) | Q(offer_user_id=user.pk)),
+    )
+
+
+def rebuild():
+    """Recompute the whole index from scratch; returns the number of rows written"""
+    _replace(MatchCandidate.objects.all(), candidate_pairs())
+    return MatchCandidate.objects.count()
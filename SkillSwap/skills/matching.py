@@ -0,0 +1,77 @@
+import base64
+import json
+
+from django.db.models import F, Q
+
+from .models import NeededSkill, MatchCandidate
+
+
+def candidate_pairs():
+    """
+    Every active (need, offer) pair on the same skill between two different users.
+
+    Resolved as a single join on skill_id with the max_hourly_rate filter
+    applied in SQL. Each row is a NeededSkill annotated with the matching
+    offer's id, owner and rate; narrow it further with ``.filter()``.
+    """
+    return NeededSkill.objects.filter(
+        is_active=True,
+        skill__offered_by_users__is_active=True,
+    ).annotate(
+        offer_id=F('skill__offered_by_users__id'),
+        offer_user_id=F('skill__offered_by_users__user_id'),
+        offer_rate=F('skill__offered_by_users__hourly_rate_equivalent'),
+    ).filter(
+        Q(max_hourly_rate__isnull=True) | Q(max_hourly_rate__gte=F('offer_rate'))
+    ).exclude(
+        user_id=F('offer_user_id')
+    )
+
+
+def find_matches_for(user, match_type=None):
+    """
+    Best matches for ``user``, read from the MatchCandidate index.
+
+    'skill_match' rows are offers for the user's needs, 'need_match' rows are
+    needs the user's offers can serve.
+    """
+    matches = MatchCandidate.objects.filter(user=user)
+    if match_type:
+        matches = matches.filter(match_type=match_type)
+
+    return matches.select_related(
+        'offer__user', 'offer__skill', 'need__user', 'need__skill'
+    ).order_by('-score', 'id')
+
+
+def encode_cursor(match):
+    """Opaque cursor pointing just past ``match`` in (-score, id) order"""
+    raw = json.dumps([match.score, match.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(score, id) from encode_cursor(); raises ValueError on anything else"""
+    try:
+        score, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return float(score), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def match_page(user, match_type=None, cursor=None, size=10):
+    """
+    One page of find_matches_for(), seeking past ``cursor`` instead of
+    using an offset, so every page costs the same single indexed query.
+
+    Returns ``(matches, next_cursor)``. One extra row is fetched to tell
+    whether another page follows; ``next_cursor`` is None on the last page.
+    """
+    matches = find_matches_for(user, match_type)
+    if cursor:
+        score, pk = decode_cursor(cursor)
+        matches = matches.filter(Q(score__lt=score) | Q(score=score, id__gt=pk))
+
+    page = list(matches[:size + 1])
+    next_cursor = encode_cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0010_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_type', models.CharField(choices=[('skill_match', 'Skill Match - An offer for my need'), ('need_match', 'Need Match - A need my offer can serve')], max_length=20)),
+                ('score', models.FloatField(default=0)),
+                ('need', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_candidates', to='skills.neededskill')),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_candidates', to='skills.offeredskill')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_candidates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Match Candidate',
+                'verbose_name_plural': 'Match Candidates',
+                'ordering': ['-score', 'id'],
+                'indexes': [models.Index(fields=['user', '-score', 'id'], name='skills_matc_user_id_ac1cad_idx')],
+                'unique_together': {('user', 'offer', 'need')},
+            },
+        ),
+    ]
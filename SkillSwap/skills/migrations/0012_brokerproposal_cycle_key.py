@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0011_matchcandidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brokerproposal',
+            name='cycle_key',
+            field=models.CharField(blank=True, db_index=True, help_text='Participant user ids in canonical order, used to deduplicate generated chains', max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0012_brokerproposal_cycle_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skillexchange',
+            name='fairness_score',
+            field=models.DecimalField(db_index=True, decimal_places=1, default=0, help_text='get_fairness_score() as of the last save, for aggregates', max_digits=4),
+        ),
+    ]
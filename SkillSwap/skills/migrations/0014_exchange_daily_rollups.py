@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0013_skillexchange_fairness_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_updated', models.DateTimeField(help_text='Newest source row already rolled up')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExchangeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('under_review', 'Under Review'), ('negotiating', 'Negotiating Terms'), ('accepted', 'Accepted'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('disputed', 'Disputed')], max_length=20)),
+                ('side', models.CharField(choices=[('offer', "Initiator's skill"), ('response', "Responder's skill")], max_length=10)),
+                ('exchange_count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0, help_text='Exchanges priced on at least one side')),
+                ('hours', models.DecimalField(decimal_places=2, default=0, help_text='Hours given by this side', max_digits=12)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, help_text='Hours times hourly rate for this side', max_digits=15)),
+                ('fairness_total', models.DecimalField(decimal_places=1, default=0, help_text='Sum of fairness_score over scored exchanges', max_digits=15)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='skills.skill')),
+            ],
+            options={
+                'verbose_name': 'Exchange Daily Rollup',
+                'verbose_name_plural': 'Exchange Daily Rollups',
+                'ordering': ['-day', 'skill'],
+                'indexes': [models.Index(fields=['side', 'day'], name='skills_exch_side_21e38c_idx'), models.Index(fields=['skill', 'day'], name='skills_exch_skill_i_5fee2d_idx')],
+                'unique_together': {('day', 'status', 'skill', 'side')},
+            },
+        ),
+    ]
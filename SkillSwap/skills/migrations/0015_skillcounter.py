@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0014_exchange_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillCounter',
+            fields=[
+                ('skill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='skills.skill')),
+                ('offer_count', models.IntegerField(default=0)),
+                ('need_count', models.IntegerField(default=0)),
+                ('exchanges_as_offer', models.IntegerField(default=0)),
+                ('exchanges_as_response', models.IntegerField(default=0)),
+                ('completed_exchanges', models.IntegerField(default=0, help_text='Completed exchanges, counted once per side using this skill')),
+            ],
+            options={
+                'verbose_name': 'Skill Counter',
+                'verbose_name_plural': 'Skill Counters',
+            },
+        ),
+    ]
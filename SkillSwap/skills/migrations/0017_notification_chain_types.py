@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0016_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('exchange_proposed', 'Exchange Proposed'), ('exchange_accepted', 'Exchange Accepted'), ('exchange_rejected', 'Exchange Rejected'), ('exchange_completed', 'Exchange Completed'), ('exchange_cancelled', 'Exchange Cancelled'), ('rating_received', 'Rating Received'), ('chain_proposed', 'Chain Proposed'), ('proposal_suggested', 'Chain Suggested'), ('message', 'Message'), ('system', 'System Notification')], max_length=20),
+        ),
+    ]
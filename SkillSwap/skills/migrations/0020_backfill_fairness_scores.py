@@ -0,0 +1,49 @@
+from django.db import migrations
+
+from skills import fairness
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_fairness_scores(apps, schema_editor):
+    # Exchanges saved before fairness_score was stored still read 0, which
+    # the statistics count as a scored, maximally unfair exchange. Same walk
+    # as the backfill_fairness_scores command, which stays for later drift.
+    SkillExchange = apps.get_model('skills', 'SkillExchange')
+    RollupWatermark = apps.get_model('skills', 'RollupWatermark')
+    fields = (
+        'id', 'fairness_score', 'initiator_hourly_rate', 'initiator_hours_required',
+        'responder_hourly_rate', 'responder_hours_required',
+    )
+
+    last_id = updated = 0
+    while True:
+        rows = list(SkillExchange.objects.filter(id__gt=last_id).order_by('id').values_list(*fields)[:BATCH_SIZE])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        stale = []
+        for pk, stored, *inputs in rows:
+            score = fairness.fairness_score(*inputs)
+            if stored != fairness.to_decimal(score):
+                stale.append(SkillExchange(id=pk, fairness_score=score))
+        SkillExchange.objects.bulk_update(stale, ['fairness_score'])
+        updated += len(stale)
+
+    # bulk_update leaves last_updated alone, so the rollups would never see
+    # the new scores; dropping the watermark makes the next run redo every day
+    if updated:
+        RollupWatermark.objects.filter(name='exchange_daily').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0019_notification_feed_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_fairness_scores, migrations.RunPython.noop),
+    ]
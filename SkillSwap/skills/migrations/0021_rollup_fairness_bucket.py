@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+def reset_rollups(apps, schema_editor):
+    # Existing rows have no bucket; without a watermark the next
+    # rollup_exchanges run rebuilds every day
+    apps.get_model('skills', 'ExchangeDailyRollup').objects.all().delete()
+    apps.get_model('skills', 'RollupWatermark').objects.filter(name='exchange_daily').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0020_backfill_fairness_scores'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='exchangedailyrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='exchangedailyrollup',
+            name='fairness_bucket',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Tenth of the 0-100 fairness range; empty for unscored exchanges', null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='exchangedailyrollup',
+            unique_together={('day', 'status', 'skill', 'side', 'fairness_bucket')},
+        ),
+        migrations.RunPython(reset_rollups, migrations.RunPython.noop),
+    ]
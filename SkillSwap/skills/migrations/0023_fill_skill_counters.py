@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def fill_skill_counters(apps, schema_editor):
+    # Count the skills, offers, needs and exchanges already there once;
+    # signals keep the counters current from here on
+    from skills import counters
+    counters.verify(fix=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0022_fill_match_candidates'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_skill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def fill_notification_counters(apps, schema_editor):
+    # Count the unread notifications already there once; notify() and the
+    # mark_* helpers keep the counters current from here on
+    from skills import notifications
+    notifications.verify_unread(fix=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0023_fill_skill_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_notification_counters, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,8 @@ from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+from . import fairness
+
 # Create your models here.
 
 class Category(models.Model):
@@ -96,6 +98,34 @@ class NeededSkill(models.Model):
     def __str__(self):
         return f"{self.user.username} needs: {self.skill.skill}"
 
+
+class MatchCandidate(models.Model):
+
+    MATCH_TYPES = [
+        ('skill_match', 'Skill Match - An offer for my need'),
+        ('need_match', 'Need Match - A need my offer can serve'),
+    ]
+
+    # Each (offer, need) pair is stored once per participant so reading a
+    # user's matches is a single range scan on (user, -score).
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='match_candidates')
+    offer = models.ForeignKey(OfferedSkill, on_delete=models.CASCADE, related_name='match_candidates')
+    need = models.ForeignKey(NeededSkill, on_delete=models.CASCADE, related_name='match_candidates')
+    match_type = models.CharField(max_length=20, choices=MATCH_TYPES)
+    score = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['-score', 'id']
+        unique_together = ['user', 'offer', 'need']
+        indexes = [
+            models.Index(fields=['user', '-score', 'id']),
+        ]
+        verbose_name = "Match Candidate"
+        verbose_name_plural = "Match Candidates"
+
+    def __str__(self):
+        return f"{self.user.username}: {self.offer_id} ↔ {self.need_id} ({self.score})"
+
 class SkillExchange(models.Model):
     EXCHANGE_TYPES = [
         ('direct', 'Direct Exchange - Equal hourly value'),
@@ -133,6 +163,7 @@ class SkillExchange(models.Model):
     
     is_balanced = models.BooleanField(default=False, help_text="Whether the exchange is financially balanced")
     imbalance_amount = models.DecimalField(max_digits=9, decimal_places=2, default=0, help_text="Monetary value difference if not perfectly balanced")
+    fairness_score = models.DecimalField(max_digits=4, decimal_places=1, default=0, db_index=True, help_text="get_fairness_score() as of the last save, for aggregates")
     
     terms = models.TextField(blank=True, help_text="Specific terms and conditions")
 
@@ -182,68 +213,15 @@ class SkillExchange(models.Model):
     def calculate_fair_exchange(self):
   
         try:
-          
-            rate_a = float(self.skill_from_initiator.hourly_rate_equivalent)
-            rate_b = float(self.skill_from_responder.hourly_rate_equivalent)
-            
-          
+            rate_a = fairness.to_decimal(self.skill_from_initiator.hourly_rate_equivalent)
+            rate_b = fairness.to_decimal(self.skill_from_responder.hourly_rate_equivalent)
             self.initiator_hourly_rate = rate_a
             self.responder_hourly_rate = rate_b
-            
-          
-            if rate_a <= 0 or rate_b <= 0:
-             
-                self.initiator_hours_required = 1.0
-                self.responder_hours_required = 1.0
-                self.calculated_ratio = 1.0
-                self.total_value = 0
-                self.is_balanced = False
-                self.imbalance_amount = 0
-                return None
-            
-           
-            ratio = rate_a / rate_b
-            self.calculated_ratio = ratio
-            
-      
-            if ratio >= 1:
-            
-                self.initiator_hours_required = 1.0
-                self.responder_hours_required = round(ratio, 2)  
-            else:
-             
-                self.responder_hours_required = 1.0
-                self.initiator_hours_required = round(1 / ratio, 2)  
-
-            initiator_value = rate_a * float(self.initiator_hours_required)
-            responder_value = rate_b * float(self.responder_hours_required)
-            
-   
-            self.total_value = (initiator_value + responder_value) / 2
-            
-     
-            value_difference = abs(initiator_value - responder_value)
-            self.imbalance_amount = value_difference
-            
-        
-            if self.total_value > 0:
-                tolerance = self.total_value * 0.01  
-                self.is_balanced = value_difference <= tolerance
-            else:
-                self.is_balanced = value_difference <= 0.01 
-            
-            return {
-                'ratio': ratio,
-                'initiator_hours': float(self.initiator_hours_required),
-                'responder_hours': float(self.responder_hours_required),
-                'initiator_value': initiator_value,
-                'responder_value': responder_value,
-                'total_value': float(self.total_value),
-                'is_balanced': self.is_balanced,
-                'imbalance': float(self.imbalance_amount)
-            }
-        except (AttributeError, ValueError, TypeError) as e:
-          
+            result = fairness.fair_exchange(rate_a, rate_b)
+        except (AttributeError, ValueError, TypeError):
+            result = None
+
+        if result is None:
             self.initiator_hours_required = 1.0
             self.responder_hours_required = 1.0
             self.calculated_ratio = 1.0
@@ -251,6 +229,14 @@ class SkillExchange(models.Model):
             self.is_balanced = False
             self.imbalance_amount = 0
             return None
+
+        self.calculated_ratio = result.hours_ratio
+        self.initiator_hours_required = result.initiator_hours
+        self.responder_hours_required = result.responder_hours
+        self.total_value = result.total_value
+        self.is_balanced = result.is_balanced
+        self.imbalance_amount = result.imbalance
+        return result.as_dict()
     
     def save(self, *args, **kwargs):
         
@@ -261,6 +247,11 @@ class SkillExchange(models.Model):
         if (not skip_calculation and self.skill_from_initiator_id and 
             self.skill_from_responder_id):
             self.calculate_fair_exchange()
+
+        self.fairness_score = self.get_fairness_score()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fairness_score' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'fairness_score']
         
         try:
             self.full_clean()
@@ -272,102 +263,38 @@ class SkillExchange(models.Model):
     def is_participant(self, user):
         return user in [self.initiator, self.responder]
     
+    def _fairness_inputs(self):
+        return (
+            self.initiator_hourly_rate, self.initiator_hours_required,
+            self.responder_hourly_rate, self.responder_hours_required,
+        )
+
     def get_fairness_score(self):
       
         try:
-        
-            initiator_rate = float(self.initiator_hourly_rate)
-            responder_rate = float(self.responder_hourly_rate)
-            initiator_hours = float(self.initiator_hours_required)
-            responder_hours = float(self.responder_hours_required)
-            
-            if initiator_rate <= 0 or responder_rate <= 0 or initiator_hours <= 0 or responder_hours <= 0:
-                return 0
-            
- 
-            initiator_value_given = initiator_rate * initiator_hours
-            responder_value_given = responder_rate * responder_hours
-            
-     
-            max_value = max(initiator_value_given, responder_value_given)
-            if max_value > 0:
-                fairness = min(initiator_value_given, responder_value_given) / max_value
-                return round(fairness * 100, 1)
+            return fairness.fairness_score(*self._fairness_inputs())
         except (ValueError, TypeError):
-            pass
-        
-        
-        return 0
+            return 0
     
     def get_value_imbalance(self):
       
         try:
-            initiator_value = float(self.initiator_hourly_rate) * float(self.initiator_hours_required)
-            responder_value = float(self.responder_hourly_rate) * float(self.responder_hours_required)
-            return abs(initiator_value - responder_value)
+            return fairness.value_imbalance(*self._fairness_inputs())
         except (ValueError, TypeError):
             return 0
     
     def suggest_adjustment(self):
     
         try:
-            initiator_rate = float(self.initiator_hourly_rate)
-            responder_rate = float(self.responder_hourly_rate)
-            
-            if initiator_rate <= 0 or responder_rate <= 0:
-                return None
-            
-       
-            perfect_ratio = initiator_rate / responder_rate
-            
-            initiator_hours = float(self.initiator_hours_required)
-            responder_hours = float(self.responder_hours_required)
-            current_ratio = initiator_hours / responder_hours if responder_hours > 0 else 0
-            
-          
-            if perfect_ratio > 0 and abs(current_ratio - perfect_ratio) / perfect_ratio > 0.05:
-                if perfect_ratio >= 1:
-                    suggested_initiator_hours = 1.0
-                    suggested_responder_hours = round(perfect_ratio, 1)
-                else:
-                    suggested_responder_hours = 1.0
-                    suggested_initiator_hours = round(1 / perfect_ratio, 1)
-                
-                return {
-                    'perfect_ratio': round(perfect_ratio, 2),
-                    'adjustment_needed': True,
-                    'suggested_initiator_hours': suggested_initiator_hours,
-                    'suggested_responder_hours': suggested_responder_hours,
-                    'current_fairness_score': self.get_fairness_score()
-                }
-        except (ValueError, TypeError, ZeroDivisionError):
-            pass
-        
-        return {'adjustment_needed': False, 'fairness_score': self.get_fairness_score()}
+            return fairness.suggest_adjustment(*self._fairness_inputs())
+        except (ValueError, TypeError):
+            return {'adjustment_needed': False, 'fairness_score': self.get_fairness_score()}
     
     def get_detailed_fairness_report(self):
 
         try:
-            initiator_value = float(self.initiator_hourly_rate) * float(self.initiator_hours_required)
-            responder_value = float(self.responder_hourly_rate) * float(self.responder_hours_required)
-            responder_rate = float(self.responder_hourly_rate)
-            responder_hours = float(self.responder_hours_required)
-            
-            hourly_rate_ratio = float(self.initiator_hourly_rate) / responder_rate if responder_rate > 0 else 0
-            hours_ratio = float(self.initiator_hours_required) / responder_hours if responder_hours > 0 else 0
-            
-            return {
-                'fairness_score': self.get_fairness_score(),
-                'initiator_value': initiator_value,
-                'responder_value': responder_value,
-                'value_difference': abs(initiator_value - responder_value),
-                'hourly_rate_ratio': hourly_rate_ratio,
-                'hours_ratio': hours_ratio,
-                'is_balanced': self.get_fairness_score() >= 95,  # 95% threshold
-                'calculated_ratio': float(self.calculated_ratio),
-                'total_value': float(self.total_value)
-            }
-        except (ValueError, TypeError, ZeroDivisionError):
+            return fairness.fairness_report(*self._fairness_inputs(), self.calculated_ratio, self.total_value)
+        except (ValueError, TypeError):
             return {
                 'fairness_score': 0,
                 'initiator_value': 0,
@@ -377,7 +304,8 @@ class SkillExchange(models.Model):
                 'hours_ratio': 0,
                 'is_balanced': False,
                 'calculated_ratio': 0,
-                'total_value': 0
+                'total_value': 0,
+                'adjustment': None,
             }
     
     def get_other_party(self, user):
@@ -445,27 +373,15 @@ class ExchangeChain(models.Model):
             return 100
         
     
-        hours_given = sum([float(link.hours_given) for link in links])
-        hours_received = sum([float(link.hours_received) for link in links])
-        
+        hours_given = sum(fairness.to_decimal(link.hours_given) for link in links)
+        hours_received = sum(fairness.to_decimal(link.hours_received) for link in links)
+        value_given = sum(link.get_value_given() for link in links)
+        value_received = sum(link.get_value_received() for link in links)
 
-        value_given = 0
-        value_received = 0
-        
-        for link in links:
-            if link.gives_skill:
-                value_given += float(link.gives_skill.hourly_rate_equivalent) * float(link.hours_given)
-            if link.receives_skill:
-                value_received += float(link.receives_skill.hourly_rate_equivalent) * float(link.hours_received)
-        
         if value_received > 0:
-            fairness_score = min(value_given, value_received) / max(value_given, value_received) * 100
-            return round(fairness_score, 1)
-        
-     
+            return fairness.value_fairness(value_given, value_received)
         if hours_received > 0:
-            return round(min(hours_given, hours_received) / max(hours_given, hours_received) * 100, 1)
-        
+            return fairness.value_fairness(hours_given, hours_received)
         return 0
     
     def update_chain_metrics(self):
@@ -521,24 +437,18 @@ class ChainLink(models.Model):
     def get_value_given(self):
     
         if self.gives_skill:
-            return float(self.gives_skill.hourly_rate_equivalent) * float(self.hours_given)
+            return fairness.exchange_value(self.gives_skill.hourly_rate_equivalent, self.hours_given)
         return 0
     
     def get_value_received(self):
   
         if self.receives_skill:
-            return float(self.receives_skill.hourly_rate_equivalent) * float(self.hours_received)
+            return fairness.exchange_value(self.receives_skill.hourly_rate_equivalent, self.hours_received)
         return 0
     
     def get_fairness_for_user(self):
     
-        value_given = self.get_value_given()
-        value_received = self.get_value_received()
-        
-        if max(value_given, value_received) > 0:
-            fairness = min(value_given, value_received) / max(value_given, value_received) * 100
-            return round(fairness, 1)
-        return 0
+        return fairness.value_fairness(self.get_value_given(), self.get_value_received())
     
     def get_next_in_chain(self):
     
@@ -577,6 +487,7 @@ class BrokerProposal(models.Model):
     
 
     participants_data = models.JSONField(default=dict, help_text="Structured data about proposed exchanges")
+    cycle_key = models.CharField(max_length=100, blank=True, db_index=True, help_text="Participant user ids in canonical order, used to deduplicate generated chains")
     
 
     status = models.CharField(
@@ -610,6 +521,10 @@ class BrokerProposal(models.Model):
         self.status = 'proposed'
         self.proposed_to_users_at = timezone.now()
         self.save()
+
+        from .notifications import notify
+        participants = {p['user_id'] for p in self.participants_data.get('participants', []) if 'user_id' in p}
+        notify((user_id, 'proposal_suggested', self) for user_id in participants)
     
     def calculate_proposal_fairness(self):
 
@@ -638,6 +553,8 @@ class Notification(models.Model):
         ('exchange_completed', 'Exchange Completed'),
         ('exchange_cancelled', 'Exchange Cancelled'),
         ('rating_received', 'Rating Received'),
+        ('chain_proposed', 'Chain Proposed'),
+        ('proposal_suggested', 'Chain Suggested'),
         ('message', 'Message'),
         ('system', 'System Notification'),
     ]
@@ -663,6 +580,8 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read', 'created_at']),
+            # The feed reads and unread ones together, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='skills_notif_feed_idx'),
         ]
     
     def __str__(self):
@@ -670,9 +589,8 @@ class Notification(models.Model):
     
     def mark_as_read(self):
         if not self.is_read:
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save()
+            from .notifications import mark_as_read
+            mark_as_read(self)
     
     @property
     def time_since(self):
@@ -689,4 +607,117 @@ class Notification(models.Model):
             minutes = diff.seconds // 60
             return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
         else:
-            return "Just now"
\ No newline at end of file
+            return "Just now"
+
+class ExchangeDailyRollup(models.Model):
+
+    SIDES = [
+        ('offer', "Initiator's skill"),
+        ('response', "Responder's skill"),
+    ]
+
+    # One row per creation day x current status x skill x side x fairness
+    # bucket. Every exchange is counted once on each side, so site-wide
+    # totals read only the 'offer' rows while per-skill figures read both.
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=SkillExchange.STATUS_CHOICES)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='daily_rollups')
+    side = models.CharField(max_length=10, choices=SIDES)
+    fairness_bucket = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Tenth of the 0-100 fairness range; empty for unscored exchanges")
+
+    exchange_count = models.PositiveIntegerField(default=0)
+    scored_count = models.PositiveIntegerField(default=0, help_text="Exchanges priced on at least one side")
+    hours = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Hours given by this side")
+    total_value = models.DecimalField(max_digits=15, decimal_places=2, default=0, help_text="Hours times hourly rate for this side")
+    fairness_total = models.DecimalField(max_digits=15, decimal_places=1, default=0, help_text="Sum of fairness_score over scored exchanges")
+
+    class Meta:
+        ordering = ['-day', 'skill']
+        unique_together = ['day', 'status', 'skill', 'side', 'fairness_bucket']
+        indexes = [
+            models.Index(fields=['side', 'day']),
+            models.Index(fields=['skill', 'day']),
+        ]
+        verbose_name = "Exchange Daily Rollup"
+        verbose_name_plural = "Exchange Daily Rollups"
+
+    def __str__(self):
+        return f"{self.day} {self.skill_id} {self.status}/{self.side}: {self.exchange_count}"
+
+    @property
+    def avg_fairness(self):
+        return float(self.fairness_total) / self.scored_count if self.scored_count else 0
+
+
+class RollupWatermark(models.Model):
+
+    name = models.CharField(max_length=50, unique=True)
+    last_updated = models.DateTimeField(help_text="Newest source row already rolled up")
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_updated}"
+
+
+class SkillCounter(models.Model):
+
+    # Kept current with F() updates from skills.counters; recount with the
+    # verify_skill_counters command. Offers and needs count only while active.
+    skill = models.OneToOneField(Skill, on_delete=models.CASCADE, primary_key=True, related_name='counter')
+    offer_count = models.IntegerField(default=0)
+    need_count = models.IntegerField(default=0)
+    exchanges_as_offer = models.IntegerField(default=0)
+    exchanges_as_response = models.IntegerField(default=0)
+    completed_exchanges = models.IntegerField(default=0, help_text="Completed exchanges, counted once per side using this skill")
+
+    class Meta:
+        verbose_name = "Skill Counter"
+        verbose_name_plural = "Skill Counters"
+
+    def __str__(self):
+        return f"{self.skill_id}: {self.exchange_count} exchanges"
+
+    @property
+    def exchange_count(self):
+        return self.exchanges_as_offer + self.exchanges_as_response
+
+
+class NotificationCounter(models.Model):
+
+    # Unread notifications per user, kept current with F() updates from
+    # skills.notifications; recount with the verify_notification_counters command.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Notification Counter"
+        verbose_name_plural = "Notification Counters"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+
+class OutboxEvent(models.Model):
+
+    # Recorded in the same transaction as the change that caused it and
+    # delivered later by the drain_outbox command (see skills.outbox).
+    dedup_key = models.CharField(max_length=150, unique=True, help_text="Identifies the event; recording it again is a no-op and channels may drop repeats")
+    event_type = models.CharField(max_length=20)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    content_object = GenericForeignKey('content_type', 'object_id')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+        indexes = [
+            models.Index(fields=['processed_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for {self.recipient_id} ({'delivered' if self.processed_at else 'pending'})"
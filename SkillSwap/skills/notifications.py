@@ -1,99 +1,246 @@
+import base64
+import json
+from collections import Counter
+from datetime import datetime
+
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
 from django.utils import timezone
-from .models import Notification, SkillExchange
+from .models import Notification, NotificationCounter
+from . import dashboard, pubsub
+
+UNREAD_TIMEOUT = 3600
+
+def _unread_key(user_id):
+    return f'skills:unread_notifications:{user_id}'
+
+def change_unread(user_id, delta):
+    """
+    Add ``delta`` to the user's unread counter in one UPDATE ... SET unread =
+    unread + delta, creating the row on first use, and drop the cached count.
+    """
+    change_unread_many({user_id: delta})
+
+def change_unread_many(deltas):
+    """change_unread() for ``{user_id: delta}`` in two queries however many users there are"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if deltas:
+        # Rows a concurrent request creates first are left alone and updated below
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id) for user_id, delta in deltas.items() if delta > 0],
+            ignore_conflicts=True,
+        )
+        NotificationCounter.objects.filter(user_id__in=deltas).update(unread=F('unread') + Case(
+            *[When(user_id=user_id, then=Value(delta)) for user_id, delta in deltas.items()],
+            output_field=IntegerField(),
+        ))
+        cache.delete_many([_unread_key(user_id) for user_id in deltas])
+        transaction.on_commit(lambda: _unread_committed(list(deltas)))
+
+def _unread_committed(user_ids):
+    # Dropped again in case a read before the commit cached the old count
+    cache.delete_many([_unread_key(user_id) for user_id in user_ids])
+    counts = dict(NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread'))
+    for user_id in user_ids:
+        pubsub.publish_unread(user_id, counts.get(user_id, 0))
 
 def create_notification(user, notification_type, title, message, content_object=None):
 
-    notification = Notification.objects.create(
-        user=user,
-        notification_type=notification_type,
-        title=title,
-        message=message,
-        content_object=content_object,
-    )
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            user=user,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            content_object=content_object,
+        )
+        change_unread(user.id, 1)
     return notification
 
-def send_exchange_notification(exchange, notification_type, to_user=None):
+# (title, message) per notification type. Messages are str.format() templates
+# over the notification's object, so only the fields a message uses are read.
+NOTIFICATION_TEMPLATES = {
+    'exchange_proposed': ('New Exchange Proposal', '{obj.initiator.username} has proposed an exchange with you!'),
+    'exchange_accepted': ('Exchange Accepted', '{obj.responder.username} has accepted your exchange proposal!'),
+    'exchange_rejected': ('Exchange Rejected', '{obj.responder.username} has declined your exchange proposal.'),
+    'exchange_cancelled': ('Exchange Cancelled', 'Exchange #{obj.id} has been cancelled.'),
+    'exchange_completed': ('Exchange Completed', 'Your exchange with {obj.responder.username} has been completed!'),
+    'rating_received': ('New Rating Received', 'You received a rating from {obj.responder.username}!'),
+    'chain_proposed': ('Exchange Chain Proposed', '{obj} has been proposed to all participants.'),
+    'proposal_suggested': ('Exchange Chain Suggested', 'We found an exchange chain for you: {obj.title}'),
+}
+
+DEFAULT_TEMPLATE = ('Notification', 'You have a new notification.')
+
+def notify(events):
+    """
+    Create a notification for every ``(recipient, notification_type,
+    content_object)`` in ``events`` with a single bulk_create, formatting each
+    (type, object) message once and resolving each model's ContentType once.
+    Recipients may be users or user ids. Returns the notifications.
+    """
+    messages = {}
+    content_types = {}
+    notifications = []
+    for recipient, notification_type, obj in events:
+        key = (notification_type, type(obj), getattr(obj, 'pk', None))
+        if key not in messages:
+            title, message = NOTIFICATION_TEMPLATES.get(notification_type, DEFAULT_TEMPLATE)
+            messages[key] = (title, message.format(obj=obj))
+        if obj is not None and type(obj) not in content_types:
+            content_types[type(obj)] = ContentType.objects.get_for_model(obj)
+
+        title, message = messages[key]
+        notifications.append(Notification(
+            user_id=getattr(recipient, 'pk', recipient),
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            content_type=content_types.get(type(obj)),
+            object_id=getattr(obj, 'pk', None),
+        ))
+
+    if not notifications:
+        return []
+    unread = Counter(n.user_id for n in notifications)
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        change_unread_many(unread)
+    # bulk_create skips the post_save signal that drops cached dashboards
+    dashboard.invalidate(*unread)
+    return notifications
 
-    
+def exchange_notification_events(exchange, notification_type, to_user=None):
+    """The ``(recipient, type, exchange)`` events for notify() or outbox.record()"""
 
     if to_user:
         recipients = [to_user]
     else:
 
-        if exchange.initiator and exchange.responder:
+        if exchange.initiator_id and exchange.responder_id:
 
             if notification_type == 'exchange_proposed':
-                recipients = [exchange.responder]
+                recipients = [exchange.responder_id]
 
             elif notification_type == 'exchange_accepted':
-                recipients = [exchange.initiator]
+                recipients = [exchange.initiator_id]
 
             elif notification_type == 'exchange_completed':
-                recipients = [exchange.initiator, exchange.responder]
+                recipients = [exchange.initiator_id, exchange.responder_id]
 
             else:
-                recipients = [exchange.get_other_party(exchange.initiator)]
+                recipients = [exchange.responder_id]
         else:
-            return [] 
-    
-    notification_data = {
-        'exchange_proposed': {
-            'title': 'New Exchange Proposal',
-            'message': f'{exchange.initiator.username} has proposed an exchange with you!',
-        },
-        'exchange_accepted': {
-            'title': 'Exchange Accepted',
-            'message': f'{exchange.responder.username} has accepted your exchange proposal!',
-        },
-        'exchange_rejected': {
-            'title': 'Exchange Rejected',
-            'message': f'{exchange.responder.username} has declined your exchange proposal.',
-        },
-        'exchange_cancelled': {
-            'title': 'Exchange Cancelled',
-            'message': f'Exchange #{exchange.id} has been cancelled.',
-        },
-        'exchange_completed': {
-            'title': 'Exchange Completed',
-            'message': f'Your exchange with {exchange.get_other_party(exchange.initiator).username} has been completed!',
-        },
-        'rating_received': {
-            'title': 'New Rating Received',
-            'message': f'You received a rating from {exchange.get_other_party(exchange.initiator).username}!',
-        },
-    }
-    
-    notifications = []
-    for user in recipients:
-        data = notification_data.get(notification_type, {
-            'title': 'Notification',
-            'message': 'You have a new notification.',
-        })
-        
-        notification = create_notification(
-            user=user,
-            notification_type=notification_type,
-            title=data['title'],
-            message=data['message'],
-            content_object=exchange,
-        )
-        notifications.append(notification)
-    
-    return notifications
+            return []
+
+    return [(user, notification_type, exchange) for user in recipients]
 
-def get_unread_notifications_count(user):
-    """Get count of unread notifications for a user"""
-    return Notification.objects.filter(user=user, is_read=False).count()
+def send_exchange_notification(exchange, notification_type, to_user=None):
+    return notify(exchange_notification_events(exchange, notification_type, to_user))
+
+def get_unread_notifications_count(user, recent=None):
+    """
+    Get count of unread notifications for a user, from the cache or else the
+    counter row, which ``recent`` (from get_recent_notifications) already carries
+    """
+    count = cache.get(_unread_key(user.id))
+    if count is None:
+        if recent is not None:
+            count = (recent[0].unread_total or 0) if recent else 0
+        else:
+            count = NotificationCounter.objects.filter(user_id=user.id).values_list('unread', flat=True).first() or 0
+        cache.set(_unread_key(user.id), count, UNREAD_TIMEOUT)
+    return count
 
 def get_recent_notifications(user, limit=10):
-    """Get recent notifications for a user"""
-    return Notification.objects.filter(user=user).order_by('-created_at')[:limit]
+    """Get recent notifications for a user, each annotated with the user's ``unread_total``"""
+    unread = NotificationCounter.objects.filter(user=OuterRef('user')).values('unread')
+    return Notification.objects.filter(user=user).annotate(
+        unread_total=Subquery(unread)
+    ).prefetch_related('content_object').order_by('-created_at')[:limit]
+
+FEED_PAGE_SIZE = 20
+
+def encode_feed_cursor(notification):
+    """Opaque cursor pointing just past ``notification`` in (-created_at, -id) order"""
+    raw = json.dumps([notification.created_at.isoformat(), notification.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_feed_cursor(cursor):
+    """(created_at, id) from encode_feed_cursor(); raises ValueError on anything else"""
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def notification_page(user, cursor=None, size=FEED_PAGE_SIZE):
+    """
+    One page of the user's notifications, newest first, seeking past
+    ``cursor`` on (created_at, id) so each page is one index range scan
+    however long the history. Targets are prefetched, one query per
+    content type on the page.
+
+    Returns ``(notifications, next_cursor)``; one extra row is fetched so
+    ``next_cursor`` is None on the last page, even a full one.
+    """
+    feed = Notification.objects.filter(user=user).order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_feed_cursor(cursor)
+        feed = feed.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    page = list(feed.prefetch_related('content_object')[:size + 1])
+    next_cursor = encode_feed_cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
+
+def mark_as_read(notification):
+    """Mark one notification as read, counting it only if this call is the one that did"""
+    now = timezone.now()
+    with transaction.atomic():
+        marked = Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True, read_at=now)
+        change_unread(notification.user_id, -marked)
+    notification.is_read = True
+    notification.read_at = notification.read_at or now
+    dashboard.invalidate(notification.user_id)
 
 def mark_all_as_read(user):
     """Mark all notifications as read for a user"""
-    Notification.objects.filter(user=user, is_read=False).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
\ No newline at end of file
+    with transaction.atomic():
+        marked = Notification.objects.filter(user=user, is_read=False).update(
+            is_read=True,
+            read_at=timezone.now()
+        )
+        change_unread(user.id, -marked)
+    dashboard.invalidate(user.id)
+
+def recount_unread():
+    """{user_id: unread notifications} for every user with a counter or an unread notification"""
+    counts = dict.fromkeys(NotificationCounter.objects.values_list('user_id', flat=True), 0)
+    rows = Notification.objects.filter(is_read=False).values('user_id').annotate(n=Count('id')).order_by()
+    counts.update((row['user_id'], row['n']) for row in rows)
+    return counts
+
+def verify_unread(fix=False):
+    """
+    Compare the unread counters with a fresh recount. Returns the mismatches
+    as ``{user_id: (stored, actual)}``; with ``fix`` they are written.
+    """
+    actual = recount_unread()
+    stored = dict(NotificationCounter.objects.values_list('user_id', 'unread'))
+    mismatches = {
+        user_id: (stored.get(user_id, 0), count)
+        for user_id, count in actual.items() if stored.get(user_id, 0) != count
+    }
+
+    if fix and mismatches:
+        with transaction.atomic():
+            NotificationCounter.objects.bulk_update(
+                [NotificationCounter(user_id=pk, unread=actual[pk]) for pk in mismatches if pk in stored], ['unread']
+            )
+            NotificationCounter.objects.bulk_create(
+                [NotificationCounter(user_id=pk, unread=actual[pk]) for pk in mismatches if pk not in stored]
+            )
+        cache.delete_many([_unread_key(pk) for pk in mismatches])
+    return mismatches
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+Transactional outbox for notifications.
+
+Views record compact OutboxEvent rows inside the transaction that changes
+the exchange, so the event exists exactly when the change does, and the
+drain_outbox command turns them into Notification rows (and whatever
+other CHANNELS are configured) in batches, off the request path. That
+worker must share the web service's database and cache, so it only runs
+where SKILLSWAP_OUTBOX_WORKER is set; elsewhere the recording process
+drains the outbox itself right after its transaction commits.
+
+Delivery is at least once. A batch is claimed, delivered and marked in a
+single transaction, so the Notification channel sees each event once; a
+channel outside the database may see an event again after a crash and
+should drop repeats by ``dedup_key``.
+"""
+import logging
+import traceback
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q, prefetch_related_objects
+from django.utils import timezone
+
+from .models import OutboxEvent, SkillExchange
+from .notifications import notify
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+
+# Where there is no SKIP LOCKED (SQLite), one drainer at a time
+DRAIN_LOCK = 'skills:outbox:drain'
+DRAIN_LOCK_TIMEOUT = 300
+
+# Relations each notification message reads, loaded once per batch
+MESSAGE_RELATIONS = {SkillExchange: ['initiator', 'responder']}
+
+
+def dedup_key(recipient_id, event_type, obj):
+    if obj is None:
+        return f'{event_type}:{recipient_id}'
+    return f'{event_type}:{obj._meta.label_lower}:{obj.pk}:{recipient_id}'
+
+
+def record(events):
+    """
+    Record ``(recipient, event_type, content_object)`` events for later
+    delivery; events already recorded under the same dedup key are skipped.
+    Call inside the transaction that makes the change they announce.
+    """
+    rows = []
+    for recipient, event_type, obj in events:
+        recipient_id = getattr(recipient, 'pk', recipient)
+        rows.append(OutboxEvent(
+            dedup_key=dedup_key(recipient_id, event_type, obj),
+            event_type=event_type,
+            recipient_id=recipient_id,
+            content_type=ContentType.objects.get_for_model(obj) if obj is not None else None,
+            object_id=getattr(obj, 'pk', None),
+        ))
+    created = OutboxEvent.objects.bulk_create(rows, ignore_conflicts=True)
+    if not settings.SKILLSWAP_OUTBOX_WORKER:
+        transaction.on_commit(drain_in_process)
+    return created
+
+
+def deliver_notifications(events):
+    """Channel: one Notification per event, written with a single bulk_create"""
+    targets = [event.content_object for event in events if event.content_object is not None]
+    for model, relations in MESSAGE_RELATIONS.items():
+        prefetch_related_objects([t for t in targets if isinstance(t, model)], *relations)
+    notify((event.recipient_id, event.event_type, event.content_object) for event in events)
+
+
+CHANNELS = [deliver_notifications]
+
+
+def _claim(batch_size):
+    pending = OutboxEvent.objects.filter(processed_at__isnull=True).order_by('id')
+    if connection.features.has_select_for_update_skip_locked:
+        # Concurrent drainers each take a different batch instead of waiting
+        pending = pending.select_for_update(skip_locked=True, of=('self',))
+    return list(pending[:batch_size])
+
+
+def _deliver(events):
+    with transaction.atomic():
+        for channel in CHANNELS:
+            channel(events)
+
+
+def drain_batch(batch_size=BATCH_SIZE):
+    """
+    Deliver up to ``batch_size`` pending events. When a batch fails, its
+    events are retried one by one so one bad event cannot hold up the
+    rest; an event that has failed MAX_ATTEMPTS times is given up on, with
+    its last error kept. Returns ``(delivered, failed)``.
+    """
+    with transaction.atomic():
+        events = _claim(batch_size)
+        if not events:
+            return 0, 0
+        prefetch_related_objects(events, 'content_object')
+        now = timezone.now()
+
+        try:
+            _deliver(events)
+            delivered, failed = events, []
+        except Exception:
+            logger.exception('Outbox batch failed, retrying its %d events one by one', len(events))
+            delivered, failed = [], []
+            for event in events:
+                try:
+                    _deliver([event])
+                    delivered.append(event)
+                except Exception:
+                    event.last_error = traceback.format_exc(limit=5)
+                    failed.append(event)
+
+        OutboxEvent.objects.filter(id__in=[e.id for e in delivered]).update(
+            processed_at=now, attempts=F('attempts') + 1, last_error=''
+        )
+        for event in failed:
+            event.attempts += 1
+            event.processed_at = now if event.attempts >= MAX_ATTEMPTS else None
+        OutboxEvent.objects.bulk_update(failed, ['attempts', 'processed_at', 'last_error'])
+    return len(delivered), len(failed)
+
+
+def drain(batch_size=BATCH_SIZE, max_batches=None):
+    """Drain batches until the outbox is empty; returns ``(delivered, failed)`` totals"""
+    locked = not connection.features.has_select_for_update_skip_locked
+    if locked and not cache.add(DRAIN_LOCK, True, DRAIN_LOCK_TIMEOUT):
+        return 0, 0
+
+    delivered = failed = batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            done, errors = drain_batch(batch_size)
+            delivered, failed, batches = delivered + done, failed + errors, batches + 1
+            # Stop once a batch comes back short, or all failures (they wait for the next run)
+            if done + errors < batch_size or not done:
+                break
+    finally:
+        if locked:
+            cache.delete(DRAIN_LOCK)
+    return delivered, failed
+
+
+def drain_in_process():
+    """drain() after a commit, where no worker does; a failure leaves events pending for the next one"""
+    try:
+        drain()
+    except Exception:
+        logger.exception('In-process outbox drain failed')
+
+
+def lag():
+    """Pending and given-up event counts, and the age in seconds of the oldest pending event"""
+    row = OutboxEvent.objects.aggregate(
+        pending=Count('id', filter=Q(processed_at__isnull=True)),
+        retrying=Count('id', filter=Q(processed_at__isnull=True, attempts__gt=0)),
+        dead=Count('id', filter=Q(processed_at__isnull=False) & ~Q(last_error='')),
+        oldest=Min('created_at', filter=Q(processed_at__isnull=True)),
+    )
+    oldest = row.pop('oldest')
+    row['oldest_age'] = round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0
+    return row
+
+
+def purge(older_than):
+    """Delete delivered events processed before ``older_than``; returns how many"""
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=older_than, last_error='').delete()
+    return deleted
@@ -0,0 +1,179 @@
+"""
+Publish/subscribe for the live event stream.
+
+Publishers are ordinary sync code (signal handlers, views) on any thread;
+subscribers are async consumers, one bounded queue each, on an event loop.
+Every event carries absolute state (the unread count, an exchange's status)
+rather than a delta, so when a slow consumer's queue fills up the oldest
+event is dropped without leaving the consumer wrong for long.
+
+The backend is chosen by the SKILLSWAP_PUBSUB_BACKEND setting. LocalBroker
+only reaches subscribers in the publishing process; PostgresBroker relays
+through LISTEN/NOTIFY so WSGI workers can publish to ASGI streams.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 32
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class Subscription:
+    """One consumer's bounded queue, filled from any thread"""
+
+    def __init__(self, broker, channel, maxsize=QUEUE_SIZE):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, event):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop has closed under a stream that never unsubscribed
+            self.broker.unsubscribe(self)
+
+    async def get(self, timeout=None):
+        """The next event, or None after ``timeout`` seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel, maxsize=QUEUE_SIZE):
+        """A Subscription to ``channel``; call from a coroutine and close() it when done"""
+        subscription = Subscription(self, channel, maxsize)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscriptions.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+    def deliver(self, channel, event):
+        """Hand ``event`` to every subscriber of ``channel`` in this process"""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Publishes with NOTIFY on the default database and keeps one LISTEN
+    connection per process, started by the first subscriber, that delivers
+    to the local subscriptions.
+    """
+
+    PG_CHANNEL = 'skillswap_events'
+    RECONNECT_DELAY = 5
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, channel, event):
+        payload = json.dumps({'channel': channel, 'event': event})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.PG_CHANNEL, payload])
+
+    def subscribe(self, channel, maxsize=QUEUE_SIZE):
+        subscription = super().subscribe(channel, maxsize)
+        if self._listener is None or self._listener.done():
+            self._listener = subscription.loop.create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import psycopg
+
+        params = connections['default'].get_connection_params()
+        # Django's cursor classes are sync ones
+        params.pop('cursor_factory', None)
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(**params, autocommit=True) as conn:
+                    await conn.execute(f'LISTEN {self.PG_CHANNEL}')
+                    async for notify in conn.notifies():
+                        message = json.loads(notify.payload)
+                        self.deliver(message['channel'], message['event'])
+            except (psycopg.Error, OSError):
+                logger.exception('Event listener lost its connection')
+                await asyncio.sleep(self.RECONNECT_DELAY)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        backend = getattr(settings, 'SKILLSWAP_PUBSUB_BACKEND', 'skills.pubsub.LocalBroker')
+        _broker = import_string(backend)()
+    return _broker
+
+
+def publish(channel, event):
+    """Publish ``event`` once the current transaction commits; failures are logged, never raised"""
+    def send():
+        try:
+            get_broker().publish(channel, event)
+        except Exception:
+            logger.exception('Could not publish %s to %s', event.get('type'), channel)
+
+    transaction.on_commit(send)
+
+
+def publish_unread(user_id, count):
+    publish(user_channel(user_id), {'type': 'unread', 'count': count})
+
+
+def publish_exchange(exchange):
+    event = {'type': 'exchange', 'id': exchange.id, 'status': exchange.status}
+    for user_id in {exchange.initiator_id, exchange.responder_id}:
+        publish(user_channel(user_id), event)
@@ -0,0 +1,104 @@
+import numpy as np
+from django.db.models import Q
+
+from .models import OfferedSkill, NeededSkill
+
+
+OFFER_FIELDS = ('id', 'user_id', 'user__username', 'skill_id', 'skill__skill', 'hourly_rate_equivalent')
+NEED_FIELDS = ('id', 'user_id', 'user__username', 'skill_id', 'skill__skill', 'max_hourly_rate')
+
+
+class SkillSets:
+    """
+    Offered and needed skills of a population of users as packed bitsets.
+
+    Row i of ``offered`` / ``needed`` belongs to ``user_ids[i]`` and bit j
+    stands for ``skill_ids[j]``, so finding everyone who offers something a
+    user needs is one vectorized AND over the whole population.
+    Rows are tuples shaped like OFFER_FIELDS / NEED_FIELDS.
+    """
+
+    def __init__(self, offers, needs):
+        self.offers = {(row[1], row[3]): row for row in offers}
+        self.needs = {(row[1], row[3]): row for row in needs}
+
+        keys = np.array(list(self.offers) + list(self.needs), dtype=np.int64).reshape(-1, 2)
+        self.user_ids = np.unique(keys[:, 0])
+        self.skill_ids = np.unique(keys[:, 1])
+
+        self.offered = self._pack(self.offers)
+        self.needed = self._pack(self.needs)
+
+    def _pack(self, rows):
+        words = np.zeros((len(self.user_ids), (len(self.skill_ids) + 7) // 8), dtype=np.uint8)
+        if rows:
+            keys = np.array(list(rows), dtype=np.int64)
+            users = np.searchsorted(self.user_ids, keys[:, 0])
+            bits = np.searchsorted(self.skill_ids, keys[:, 1])
+            np.bitwise_or.at(words, (users, bits // 8), (128 >> (bits % 8)).astype(np.uint8))
+        return words
+
+    def _skills(self, words):
+        return self.skill_ids[np.flatnonzero(np.unpackbits(words)[:len(self.skill_ids)])]
+
+    def _served(self, giver, taker):
+        """(offer, need) rows where ``giver`` offers a skill ``taker`` needs within their cap"""
+        giver_id, taker_id = self.user_ids[giver], self.user_ids[taker]
+        served = []
+        for skill_id in self._skills(self.offered[giver] & self.needed[taker]):
+            offer = self.offers[(giver_id, skill_id)]
+            need = self.needs[(taker_id, skill_id)]
+            if need[5] is None or offer[5] <= need[5]:
+                served.append((offer, need))
+        return served
+
+    def partners(self, user_id):
+        """Users who can both serve ``user_id`` and be served by them, best overlap first"""
+        a = np.searchsorted(self.user_ids, user_id)
+        if a == len(self.user_ids) or self.user_ids[a] != user_id:
+            return []
+
+        they_serve = (self.offered & self.needed[a]).any(axis=1)
+        we_serve = (self.needed & self.offered[a]).any(axis=1)
+        mutual = they_serve & we_serve
+        mutual[a] = False
+
+        results = []
+        for b in np.flatnonzero(mutual):
+            they_offer = self._served(b, a)
+            they_need = self._served(a, b)
+            if they_offer and they_need:
+                results.append({
+                    'user_id': int(self.user_ids[b]),
+                    'username': they_offer[0][0][2],
+                    'they_offer': [
+                        {'offer_id': offer[0], 'skill': offer[4], 'rate': float(offer[5])}
+                        for offer, need in they_offer
+                    ],
+                    'they_need': [
+                        {'need_id': need[0], 'offer_id': offer[0], 'skill': need[4], 'rate': float(offer[5])}
+                        for offer, need in they_need
+                    ],
+                })
+
+        results.sort(key=lambda r: (-(len(r['they_offer']) + len(r['they_need'])), r['username']))
+        return results
+
+    @classmethod
+    def for_user(cls, user):
+        """Load only the rows that could take part in a mutual match with ``user``"""
+        my_needs = NeededSkill.objects.filter(user=user, is_active=True).values('skill_id')
+        my_offers = OfferedSkill.objects.filter(user=user, is_active=True).values('skill_id')
+
+        offers = OfferedSkill.objects.filter(
+            Q(user=user) | Q(skill_id__in=my_needs), is_active=True
+        ).values_list(*OFFER_FIELDS)
+        needs = NeededSkill.objects.filter(
+            Q(user=user) | Q(skill_id__in=my_offers), is_active=True
+        ).values_list(*NEED_FIELDS)
+
+        return cls(list(offers), list(needs))
+
+
+def reciprocal_matches(user):
+    return SkillSets.for_user(user).partners(user.pk)
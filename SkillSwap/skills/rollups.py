@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, PositiveSmallIntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SkillExchange, ExchangeDailyRollup, RollupWatermark
+
+
+# Exchanges priced on at least one side; the rest have no meaningful score.
+SCORED = ~Q(initiator_hourly_rate=0, responder_hourly_rate=0)
+
+FAIRNESS_BUCKETS = 10
+
+
+def _bucket(i):
+    width = 100 / FAIRNESS_BUCKETS
+    low = Q(fairness_score__gte=i * width)
+    if i == FAIRNESS_BUCKETS - 1:
+        return low
+    return low & Q(fairness_score__lt=(i + 1) * width)
+
+
+# Which tenth of the fairness range a scored exchange falls in; None if unscored
+FAIRNESS_BUCKET = Case(
+    *[When(SCORED & _bucket(i), then=Value(i)) for i in range(FAIRNESS_BUCKETS)],
+    default=None, output_field=PositiveSmallIntegerField(),
+)
+
+WATERMARK = 'exchange_daily'
+
+# Rows committed slightly out of last_updated order would slip past an exact
+# watermark, so each run looks back this far. Rebuilding a day is idempotent.
+LOOKBACK = timedelta(minutes=5)
+
+DAYS_PER_BATCH = 31
+
+# Pages reading the rollups bring them up to date at most this often
+MAX_AGE = 60
+REFRESHED_KEY = 'skills:rollups:refreshed'
+REFRESH_LOCK = 'skills:rollups:lock'
+REFRESH_LOCK_TIMEOUT = 300
+
+SIDES = {
+    'offer': ('skill_from_initiator__skill_id', 'initiator_hourly_rate', 'initiator_hours_required'),
+    'response': ('skill_from_responder__skill_id', 'responder_hourly_rate', 'responder_hours_required'),
+}
+
+
+def _aggregate(days):
+    """Rollup rows for every exchange created on ``days``, computed in one grouped query per side"""
+    exchanges = SkillExchange.objects.filter(created_at__date__in=days).annotate(
+        day=TruncDate('created_at'), fairness_bucket=FAIRNESS_BUCKET,
+    )
+    for side, (skill, rate, hours) in SIDES.items():
+        groups = exchanges.values('day', 'status', 'fairness_bucket', skill_id=F(skill)).annotate(
+            exchange_count=Count('id'),
+            scored_count=Count('id', filter=SCORED),
+            hours=Sum(hours),
+            total_value=Sum(F(rate) * F(hours), output_field=DecimalField(max_digits=15, decimal_places=2)),
+            fairness_total=Sum('fairness_score', filter=SCORED),
+        ).order_by()
+        for group in groups:
+            yield ExchangeDailyRollup(side=side, **{**group, 'fairness_total': group['fairness_total'] or 0})
+
+
+@transaction.atomic
+def rollup_days(days):
+    """Replace the rollups of ``days`` with freshly aggregated ones"""
+    ExchangeDailyRollup.objects.filter(day__in=days).delete()
+    ExchangeDailyRollup.objects.bulk_create(_aggregate(days), batch_size=1000)
+
+
+def refresh(full=False):
+    """
+    Roll up every day holding an exchange changed since the last run.
+
+    Days are keyed on created_at, which never changes, so rebuilding each
+    touched day whole keeps status moves consistent. Deleted exchanges are
+    only dropped by a ``full`` run. Returns ``(days, exchanges)`` processed.
+    """
+    mark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    changed = SkillExchange.objects.all()
+    if mark and not full:
+        changed = changed.filter(last_updated__gte=mark.last_updated - LOOKBACK)
+
+    newest = changed.aggregate(newest=Max('last_updated'))['newest']
+    if newest is None:
+        if full:
+            ExchangeDailyRollup.objects.all().delete()
+        return 0, 0
+    count = changed.filter(last_updated__lte=newest).count()
+    days = sorted(set(
+        changed.filter(last_updated__lte=newest).annotate(day=TruncDate('created_at'))
+        .values_list('day', flat=True).order_by()
+    ))
+
+    if full:
+        ExchangeDailyRollup.objects.exclude(day__in=days).delete()
+    for i in range(0, len(days), DAYS_PER_BATCH):
+        rollup_days(days[i:i + DAYS_PER_BATCH])
+
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'last_updated': newest})
+    return len(days), count
+
+
+def refresh_if_stale():
+    """
+    refresh() unless one ran in the last MAX_AGE seconds. Only the caller
+    that wins the lock refreshes; the rest read the rollups as they are
+    rather than wait. Returns whether this call refreshed.
+    """
+    if cache.get(REFRESHED_KEY) or not cache.add(REFRESH_LOCK, True, REFRESH_LOCK_TIMEOUT):
+        return False
+    try:
+        refresh()
+        cache.set(REFRESHED_KEY, True, MAX_AGE)
+    finally:
+        cache.delete(REFRESH_LOCK)
+    return True
+
+
+def _summarize(row):
+    return {
+        'exchanges': row['exchanges'] or 0,
+        'hours': row['hours'] or 0,
+        'value': row['value'] or 0,
+        'avg_fairness': round(float(row['fairness']) / row['scored'], 1) if row['scored'] else 0,
+    }
+
+
+TOTALS = {
+    'exchanges': Sum('exchange_count'), 'scored': Sum('scored_count'),
+    'hours': Sum('hours'), 'value': Sum('total_value'), 'fairness': Sum('fairness_total'),
+}
+
+
+def totals(status=None, since=None):
+    """Exchange count, hours, value and average fairness over the rollups"""
+    rows = ExchangeDailyRollup.objects.filter(side='offer')
+    if status:
+        rows = rows.filter(status=status)
+    if since:
+        rows = rows.filter(day__gte=since)
+    return _summarize(rows.aggregate(**TOTALS))
+
+
+def status_totals():
+    """{status: totals()} for every status, plus '' for all of them, in one query"""
+    rows = list(ExchangeDailyRollup.objects.filter(side='offer').values('status').annotate(**TOTALS).order_by())
+    overall = {
+        key: sum((row[key] for row in rows if row[key] is not None), start=0)
+        for key in TOTALS
+    }
+    return {'': _summarize(overall), **{row['status']: _summarize(row) for row in rows}}
+
+
+def fairness_histogram():
+    """Scored exchanges in each tenth of the fairness range, lowest first, in one query"""
+    histogram = [0] * FAIRNESS_BUCKETS
+    rows = ExchangeDailyRollup.objects.filter(side='offer', fairness_bucket__isnull=False).values(
+        'fairness_bucket'
+    ).annotate(exchanges=Sum('exchange_count')).order_by()
+    for row in rows:
+        histogram[row['fairness_bucket']] = row['exchanges']
+    return histogram
+
+
+def skill_activity(days=30, status=None, limit=10):
+    """
+    Skills with the most exchanges over the last ``days`` days, counting
+    either side, with hours and value traded. Reads only the rollup rows in
+    the date range, so cost follows the range, not the history.
+    """
+    rows = ExchangeDailyRollup.objects.filter(day__gte=timezone.now().date() - timedelta(days=days - 1))
+    if status:
+        rows = rows.filter(status=status)
+
+    return list(
+        rows.values('skill_id', 'skill__skill').annotate(
+            exchanges=Sum('exchange_count'), hours=Sum('hours'), value=Sum('total_value'),
+        ).order_by('-exchanges', 'skill__skill')[:limit]
+    )
@@ -0,0 +1,102 @@
+"""
+Vectorized match scoring.
+
+Every function takes equal-length NumPy arrays, one entry per candidate,
+so a whole batch is scored in a handful of array operations. Missing
+values are NaN: an uncapped need, a counterparty with no active offers.
+"""
+import numpy as np
+from django.db.models import Avg, Count, Sum
+
+from .models import OfferedSkill, SkillExchange
+
+
+WEIGHTS = {'rate_fit': 0.35, 'urgency': 0.15, 'fairness': 0.25, 'reputation': 0.25}
+
+URGENCY_SCORES = {'low': 40.0, 'medium': 70.0, 'high': 100.0}
+
+# Unrated users start at 3 stars, and a user's own ratings outweigh this
+# prior once they have more than PRIOR_RATINGS of them.
+PRIOR_STARS = 3.0
+PRIOR_RATINGS = 2
+
+
+def rate_fit(offer_rates, max_rates):
+    """50 at the need's cap, rising to 100 as the rate drops; 75 when uncapped"""
+    capped = max_rates > 0
+    fit = 50 + 50 * (1 - offer_rates / np.where(capped, max_rates, 1))
+    return np.where(capped, np.clip(fit, 0, 100), 75.0)
+
+
+def urgency(labels):
+    labels = np.asarray(labels)
+    return np.select(
+        [labels == 'low', labels == 'high'],
+        [URGENCY_SCORES['low'], URGENCY_SCORES['high']],
+        URGENCY_SCORES['medium'],
+    )
+
+
+def fairness(offer_rates, counter_rates):
+    """
+    How evenly an hour trades against an hour, as min/max of the two rates.
+
+    This is the ``calculated_ratio`` SkillExchange.calculate_fair_exchange
+    would set, folded to 0-100; 50 when either rate is missing or not positive.
+    """
+    known = (offer_rates > 0) & (counter_rates > 0)
+    low = np.where(known, np.fmin(offer_rates, counter_rates), 1)
+    high = np.where(known, np.fmax(offer_rates, counter_rates), 1)
+    return np.where(known, 100 * low / high, 50.0)
+
+
+def reputation(rating_sums, rating_counts):
+    """Average stars received, pulled towards PRIOR_STARS for users with few ratings"""
+    stars = (rating_sums + PRIOR_STARS * PRIOR_RATINGS) / (rating_counts + PRIOR_RATINGS)
+    return (stars - 1) * 25
+
+
+def score_batch(offer_rates, max_rates, urgency_labels, counter_rates, rating_sums, rating_counts):
+    """0-100 scores for a batch of candidates, rounded to 2 places"""
+    total = (
+        WEIGHTS['rate_fit'] * rate_fit(offer_rates, max_rates)
+        + WEIGHTS['urgency'] * urgency(urgency_labels)
+        + WEIGHTS['fairness'] * fairness(offer_rates, counter_rates)
+        + WEIGHTS['reputation'] * reputation(rating_sums, rating_counts)
+    )
+    return np.round(total, 2)
+
+
+def top_k(scores, k):
+    """Indexes of the ``k`` highest scores, best first, ties by index"""
+    scores = np.asarray(scores)
+    if k >= len(scores):
+        picked = np.arange(len(scores))
+    else:
+        picked = np.argpartition(-scores, k - 1)[:k]
+    return picked[np.lexsort((picked, -scores[picked]))]
+
+
+def offer_rates(user_ids):
+    """{user_id: mean rate of their active offers}"""
+    rows = OfferedSkill.objects.filter(user_id__in=user_ids, is_active=True).values('user_id').annotate(
+        rate=Avg('hourly_rate_equivalent')
+    )
+    return {row['user_id']: float(row['rate']) for row in rows}
+
+
+def received_ratings(user_ids):
+    """
+    {user_id: (sum, count)} of the stars each user was given.
+
+    The initiator's rating is of the responder and vice versa.
+    """
+    totals = {}
+    for user_field, rating_field in [('initiator_id', 'responder_rating'), ('responder_id', 'initiator_rating')]:
+        rows = SkillExchange.objects.filter(
+            **{f'{user_field}__in': user_ids, f'{rating_field}__isnull': False}
+        ).values(user_field).annotate(stars=Sum(rating_field), n=Count('id'))
+        for row in rows:
+            stars, n = totals.get(row[user_field], (0, 0))
+            totals[row[user_field]] = (stars + row['stars'], n + row['n'])
+    return totals
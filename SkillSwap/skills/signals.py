@@ -0,0 +1,122 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, dashboard, match_index, notifications, pubsub
+from .models import OfferedSkill, NeededSkill, SkillExchange, ExchangeChain, ChainLink, Notification
+
+
+# Deleted offers and needs drop out of the match index through the
+# MatchCandidate foreign keys, so only saves need handling for it.
+
+@receiver(post_save, sender=OfferedSkill)
+def offered_skill_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        match_index.sync_offer(instance)
+
+
+@receiver(post_save, sender=NeededSkill)
+def needed_skill_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        match_index.sync_need(instance)
+
+
+@receiver(post_save, sender=SkillExchange)
+def exchange_rated(sender, instance, raw=False, **kwargs):
+    # Ratings feed the counterparty reputation part of match scores. The
+    # initiator's rating is of the responder and vice versa.
+    if raw or instance.status != 'completed':
+        return
+    if instance.initiator_rating:
+        match_index.sync_user(instance.responder)
+    if instance.responder_rating:
+        match_index.sync_user(instance.initiator)
+
+
+LISTING_COUNTERS = {OfferedSkill: 'offer_count', NeededSkill: 'need_count'}
+
+
+@receiver(post_init, sender=OfferedSkill)
+@receiver(post_init, sender=NeededSkill)
+def listing_loaded(sender, instance, **kwargs):
+    # Remember the stored skill and whether it is counted (active rows only),
+    # so a save can tell what moved
+    instance._counted_skill = instance.skill_id if instance.pk and instance.is_active else None
+
+
+@receiver(post_save, sender=OfferedSkill)
+@receiver(post_save, sender=NeededSkill)
+def listing_counted(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    counted = instance.skill_id if instance.is_active else None
+    if counted != instance._counted_skill:
+        if instance._counted_skill is not None:
+            counters.bump(LISTING_COUNTERS[sender], [instance._counted_skill], -1)
+        if counted is not None:
+            counters.bump(LISTING_COUNTERS[sender], [counted])
+    instance._counted_skill = counted
+
+
+@receiver(post_delete, sender=OfferedSkill)
+@receiver(post_delete, sender=NeededSkill)
+def listing_uncounted(sender, instance, **kwargs):
+    if instance._counted_skill is not None:
+        counters.bump(LISTING_COUNTERS[sender], [instance._counted_skill], -1)
+
+
+@receiver(post_init, sender=SkillExchange)
+def exchange_loaded(sender, instance, **kwargs):
+    # Remember the stored status so a save can tell whether it changed
+    instance._counted_status = instance.status if instance.pk else None
+
+
+@receiver(post_save, sender=SkillExchange)
+def exchange_published(sender, instance, created, raw=False, **kwargs):
+    # Registered ahead of exchange_counted, which moves _counted_status on
+    if not raw and (created or instance.status != instance._counted_status):
+        pubsub.publish_exchange(instance)
+
+
+@receiver(post_save, sender=SkillExchange)
+def exchange_counted(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.exchange_created(instance)
+    else:
+        counters.exchange_status_changed(instance, instance._counted_status)
+    instance._counted_status = instance.status
+
+
+@receiver(post_delete, sender=SkillExchange)
+def exchange_uncounted(sender, instance, **kwargs):
+    counters.exchange_deleted(instance)
+
+
+# Cached dashboards (see dashboard.dashboard_data) are dropped on any write
+# to what they show, once the write commits. Bulk writes that skip signals
+# call invalidate() directly.
+
+@receiver([post_save, post_delete], sender=SkillExchange)
+def exchange_changed(sender, instance, **kwargs):
+    dashboard.invalidate(instance.initiator_id, instance.responder_id)
+
+
+@receiver([post_save, post_delete], sender=OfferedSkill)
+@receiver([post_save, post_delete], sender=NeededSkill)
+@receiver([post_save, post_delete], sender=ChainLink)
+@receiver([post_save, post_delete], sender=Notification)
+def user_item_changed(sender, instance, **kwargs):
+    dashboard.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=ExchangeChain)
+def chain_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        dashboard.invalidate(*instance.chain_links.values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        notifications.change_unread(instance.user_id, -1)
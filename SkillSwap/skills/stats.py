@@ -0,0 +1,107 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import Skill, SkillExchange
+from .rollups import FAIRNESS_BUCKETS, fairness_histogram, refresh_if_stale, status_totals, totals
+
+
+SITE_STATS_KEY = 'skills:site_stats'
+SITE_STATS_LOCK = 'skills:site_stats:lock'
+SITE_STATS_MAX_AGE = 60
+SITE_STATS_LOCK_TIMEOUT = 30
+SITE_STATS_WAIT = 2
+
+
+def percentile(histogram, q):
+    """Approximate q-th percentile (0-100), interpolating inside histogram buckets"""
+    total = sum(histogram)
+    if not total:
+        return 0
+    width = 100 / len(histogram)
+    target = total * q / 100
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            return round(i * width + width * (target - seen) / count, 1)
+        seen += count
+    return 100
+
+
+def exchange_summary():
+    """
+    Exchange counts, average fairness and the fairness distribution, all
+    read from the daily rollups in two queries however many exchanges exist.
+    """
+    by_status = status_totals()
+    empty = {'exchanges': 0}
+
+    histogram = fairness_histogram()
+    scored = sum(histogram)
+    width = 100 // FAIRNESS_BUCKETS
+
+    return {
+        'total': by_status['']['exchanges'],
+        'completed': by_status.get('completed', empty)['exchanges'],
+        'pending': by_status.get('pending', empty)['exchanges'],
+        'scored': scored,
+        'avg_fairness': by_status['']['avg_fairness'],
+        'median_fairness': percentile(histogram, 50),
+        'p10_fairness': percentile(histogram, 10),
+        'histogram': [
+            {'low': i * width, 'high': (i + 1) * width, 'count': count,
+             'percent': round(100 * count / scored, 1) if scored else 0}
+            for i, count in enumerate(histogram)
+        ],
+    }
+
+
+def compute_site_stats():
+    refresh_if_stale()
+    completed = totals(status='completed')
+    return {
+        'featured_skills': list(Skill.objects.order_by('id')[:8]),
+        'recent_exchanges': list(
+            SkillExchange.objects.filter(status='completed').select_related(
+                'initiator', 'responder', 'skill_from_initiator__skill', 'skill_from_responder__skill'
+            ).order_by('-completed_at')[:4]
+        ),
+        'total_users': User.objects.count(),
+        'total_exchanges': completed['exchanges'],
+        'total_hours_traded': completed['hours'],
+    }
+
+
+def site_stats():
+    """
+    Public home page numbers, at most SITE_STATS_MAX_AGE seconds old.
+
+    Once they go stale, the one request that wins the cache lock recomputes
+    them while every other request keeps getting the stale copy, so expiry
+    never sends a burst of identical queries to the database. Only a cold
+    cache makes requests wait, briefly, for the winner.
+    """
+    cached = cache.get(SITE_STATS_KEY)
+    if cached and time.time() - cached['computed_at'] < SITE_STATS_MAX_AGE:
+        return cached['stats']
+
+    if cache.add(SITE_STATS_LOCK, True, SITE_STATS_LOCK_TIMEOUT):
+        try:
+            stats = compute_site_stats()
+            # Kept well past its max age so there is always a stale copy to serve
+            cache.set(SITE_STATS_KEY, {'computed_at': time.time(), 'stats': stats}, SITE_STATS_MAX_AGE * 10)
+            return stats
+        finally:
+            cache.delete(SITE_STATS_LOCK)
+
+    if cached:
+        return cached['stats']
+
+    deadline = time.time() + SITE_STATS_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        cached = cache.get(SITE_STATS_KEY)
+        if cached:
+            return cached['stats']
+    return compute_site_stats()
@@ -1,9 +1,35 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
+from decimal import Decimal
 from django.utils import timezone
-from .models import Skill, Category, OfferedSkill, NeededSkill, SkillExchange
+from django.urls import reverse
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from unittest import mock
+import threading
+import time
+from io import StringIO
+import numpy as np
+from .models import (
+    Skill, Category, OfferedSkill, NeededSkill, SkillExchange, ExchangeChain, ChainLink,
+    MatchCandidate, BrokerProposal, ExchangeDailyRollup, SkillCounter, Notification, NotificationCounter, OutboxEvent,
+)
+from .matching import find_matches_for
+from .reciprocal import reciprocal_matches
+from . import match_index, broker, clearing, scoring, fairness, stats, rollups, counters, dashboard, pubsub, outbox
+from .views import dashboard as dashboard_view
+from main import page_cache
+from .context_processors import notifications_context
+from .notifications import (
+    create_notification, exchange_notification_events, mark_all_as_read, notify, send_exchange_notification,
+    notification_page,
+)
 
 # Create your tests here.
 
@@ -443,6 +469,1279 @@ class FairnessCalculationTestCase(TestCase):
         print("\n✅ TEST 8 PASSED: Complete exchange lifecycle tested!")
         return True
 
+class MatchingTestCase(TestCase):
+    """
+    Test suite for the set-based matching engine behind find_matches
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.carol = User.objects.create(username='carol')
+
+        self.python = Skill.objects.create(skill='Python')
+        self.design = Skill.objects.create(skill='Design')
+
+        NeededSkill.objects.create(user=self.alice, skill=self.python, max_hourly_rate=40)
+        self.bob_python = OfferedSkill.objects.create(user=self.bob, skill=self.python, hourly_rate_equivalent=30)
+        OfferedSkill.objects.create(user=self.carol, skill=self.python, hourly_rate_equivalent=60)
+
+        OfferedSkill.objects.create(user=self.alice, skill=self.design, hourly_rate_equivalent=50)
+        NeededSkill.objects.create(user=self.bob, skill=self.design)
+        NeededSkill.objects.create(user=self.carol, skill=self.design, max_hourly_rate=20)
+
+    def test_both_directions_respect_rate_caps(self):
+        """
+        TEST: Alice's need matches Bob (under her cap) but not Carol,
+        and Alice's offer matches Bob's open need but not Carol's capped one
+        """
+        matches = find_matches_for(self.alice)
+
+        self.assertEqual(
+            sorted((m.match_type, m.offer.user.username, m.need.user.username) for m in matches),
+            [('need_match', 'alice', 'bob'), ('skill_match', 'bob', 'alice')]
+        )
+        self.assertEqual(find_matches_for(self.alice).count(), 2)
+        self.assertEqual(find_matches_for(self.alice, match_type='need_match').count(), 1)
+
+    def test_inactive_and_own_skills_are_ignored(self):
+        """
+        TEST: Deactivated offers drop out and users never match themselves
+        """
+        OfferedSkill.objects.create(user=self.alice, skill=self.python, hourly_rate_equivalent=10)
+        self.bob_python.is_active = False
+        self.bob_python.save()
+
+        matches = find_matches_for(self.alice, match_type='skill_match')
+        self.assertEqual(matches.count(), 0)
+
+    def test_find_matches_query_count_is_constant(self):
+        """
+        TEST: find_matches does not issue queries per need or per offer
+        """
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as few_skills:
+            self.client.get(reverse('skills:find_matches'))
+
+        for i in range(10):
+            skill = Skill.objects.create(skill=f'Skill {i}')
+            NeededSkill.objects.create(user=self.alice, skill=skill)
+            OfferedSkill.objects.create(user=self.bob, skill=skill, hourly_rate_equivalent=20)
+            OfferedSkill.objects.create(user=self.carol, skill=skill, hourly_rate_equivalent=20)
+
+        with CaptureQueriesContext(connection) as many_skills:
+            response = self.client.get(reverse('skills:find_matches'))
+
+        self.assertEqual(response.context['match_count'], 22)
+        self.assertEqual(len(response.context['matches']), 20)
+        self.assertEqual(len(many_skills), len(few_skills))
+
+
+class MatchIndexTestCase(TestCase):
+    """
+    Test suite for the incrementally maintained MatchCandidate index
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.python = Skill.objects.create(skill='Python')
+        self.design = Skill.objects.create(skill='Design')
+
+    def snapshot(self):
+        return sorted(MatchCandidate.objects.values_list('user_id', 'offer_id', 'need_id', 'match_type', 'score'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        match_index.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_index_follows_creates_toggles_and_rerates(self):
+        """
+        TEST: Creating, deactivating, re-rating and deleting skills keeps
+        the index identical to a full rebuild
+        """
+        need = NeededSkill.objects.create(user=self.alice, skill=self.python, max_hourly_rate=40)
+        offer = OfferedSkill.objects.create(user=self.bob, skill=self.python, hourly_rate_equivalent=30)
+        self.assertEqual(MatchCandidate.objects.count(), 2)
+        self.assertMatchesRebuild()
+
+        offer.hourly_rate_equivalent = 45
+        offer.save()
+        self.assertEqual(MatchCandidate.objects.count(), 0)
+        self.assertMatchesRebuild()
+
+        need.max_hourly_rate = None
+        need.save()
+        self.assertEqual(MatchCandidate.objects.count(), 2)
+        self.assertMatchesRebuild()
+
+        need.is_active = False
+        need.save()
+        self.assertEqual(MatchCandidate.objects.count(), 0)
+        self.assertMatchesRebuild()
+
+        need.is_active = True
+        need.save()
+        offer.delete()
+        self.assertEqual(MatchCandidate.objects.count(), 0)
+        self.assertMatchesRebuild()
+
+    def test_profile_form_bulk_edit_is_indexed(self):
+        """
+        TEST: The profile form replaces skills with bulk_create, which must
+        still land in the index
+        """
+        OfferedSkill.objects.create(user=self.bob, skill=self.python)
+        NeededSkill.objects.create(user=self.bob, skill=self.design)
+
+        self.client.force_login(self.alice)
+        self.client.post(reverse('accounts:profile_form'), {
+            'bio': 'Designer',
+            'offered_skills': [self.design.id],
+            'needed_skills': [self.python.id],
+        })
+
+        self.assertEqual(
+            sorted(find_matches_for(self.alice).values_list('match_type', flat=True)),
+            ['need_match', 'skill_match']
+        )
+        self.assertMatchesRebuild()
+
+
+class ReciprocalMatchTestCase(TestCase):
+    """
+    Test suite for two-way matches found with per-user skill bitsets
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.carol = User.objects.create(username='carol')
+        self.dave = User.objects.create(username='dave')
+
+        self.python = Skill.objects.create(skill='Python')
+        self.design = Skill.objects.create(skill='Design')
+
+        OfferedSkill.objects.create(user=self.alice, skill=self.python, hourly_rate_equivalent=30)
+        NeededSkill.objects.create(user=self.alice, skill=self.design, max_hourly_rate=50)
+
+    def test_only_mutual_partners_within_caps(self):
+        """
+        TEST: Bob is a two-way match; Carol only offers, and Dave is over Alice's cap
+        """
+        self.bob_design = OfferedSkill.objects.create(user=self.bob, skill=self.design, hourly_rate_equivalent=40)
+        NeededSkill.objects.create(user=self.bob, skill=self.python)
+        OfferedSkill.objects.create(user=self.carol, skill=self.design, hourly_rate_equivalent=20)
+        OfferedSkill.objects.create(user=self.dave, skill=self.design, hourly_rate_equivalent=90)
+        NeededSkill.objects.create(user=self.dave, skill=self.python)
+
+        partners = reciprocal_matches(self.alice)
+
+        self.assertEqual([p['username'] for p in partners], ['bob'])
+        self.assertEqual(partners[0]['they_offer'][0]['offer_id'], self.bob_design.id)
+        self.assertEqual(partners[0]['they_need'][0]['skill'], 'Python')
+
+    def test_api_returns_reciprocal_matches(self):
+        """
+        TEST: The JSON endpoint exposes the same partners
+        """
+        OfferedSkill.objects.create(user=self.bob, skill=self.design, hourly_rate_equivalent=40)
+        NeededSkill.objects.create(user=self.bob, skill=self.python)
+
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('skills:api_reciprocal_matches'))
+
+        self.assertEqual([p['username'] for p in response.json()['matches']], ['alice'])
+
+
+class BrokerTestCase(TestCase):
+    """
+    Test suite for generating BrokerProposal chains from the skill graph
+    """
+
+    def setUp(self):
+        self.users = [User.objects.create(username=name) for name in ['ana', 'ben', 'cai', 'dee']]
+        self.skills = [Skill.objects.create(skill=name) for name in ['Cooking', 'Guitar', 'Spanish', 'Yoga']]
+
+    def ring(self, users, rates):
+        """Each user offers the next skill in line and needs their own index's skill"""
+        for i, (user, rate) in enumerate(zip(users, rates)):
+            OfferedSkill.objects.create(user=user, skill=self.skills[(i + 1) % len(users)], hourly_rate_equivalent=rate)
+            NeededSkill.objects.create(user=user, skill=self.skills[i])
+
+    def test_three_person_chain_is_proposed_once(self):
+        """
+        TEST: ana -> ben -> cai -> ana is found, scored and not duplicated on rerun
+        """
+        self.ring(self.users[:3], [40, 40, 30])
+
+        stats = broker.generate_proposals()
+        self.assertEqual(stats['created'], 1)
+
+        proposal = BrokerProposal.objects.get()
+        self.assertEqual(proposal.proposal_type, 'chain_3')
+        self.assertEqual(proposal.fairness_score, 75)
+        self.assertEqual(len(proposal.participants_data['participants']), 3)
+        self.assertEqual(proposal.cycle_key.split('-')[0], str(self.users[0].id))
+
+        self.assertEqual(broker.generate_proposals()['created'], 0)
+
+    def test_four_person_chain_and_fairness_pruning(self):
+        """
+        TEST: A 4-person ring is found, but not when one rate is far off the others
+        """
+        self.ring(self.users, [40, 40, 40, 40])
+        self.assertEqual(broker.generate_proposals(dry_run=True)['cycles'], 1)
+
+        OfferedSkill.objects.filter(user=self.users[2]).update(hourly_rate_equivalent=10)
+        self.assertEqual(broker.generate_proposals(dry_run=True)['cycles'], 0)
+        self.assertEqual(broker.generate_proposals(dry_run=True, min_fairness=20)['cycles'], 1)
+
+    def test_parallel_run_matches_serial_run(self):
+        """
+        TEST: Splitting the search over worker processes finds the same chains
+        """
+        self.ring(self.users, [40, 40, 40, 40])
+        extra = User.objects.create(username='eve')
+        OfferedSkill.objects.create(user=extra, skill=self.skills[1], hourly_rate_equivalent=35)
+        NeededSkill.objects.create(user=extra, skill=self.skills[0])
+
+        graph = broker.load_graph()
+        serial = broker.find_cycles_parallel(graph, workers=1)
+        parallel = broker.find_cycles_parallel(graph, workers=2, time_budget=60)
+
+        self.assertEqual(len(serial[1]), 2)
+        self.assertEqual(
+            sorted(broker.cycle_key(serial[0], c) for c in serial[1]),
+            sorted(broker.cycle_key(parallel[0], c) for c in parallel[1])
+        )
+        self.assertTrue(parallel[2])
+
+    def test_rate_caps_remove_edges(self):
+        """
+        TEST: A need capped below the provider's rate breaks the chain
+        """
+        self.ring(self.users[:3], [40, 40, 40])
+        NeededSkill.objects.filter(user=self.users[0]).update(max_hourly_rate=20)
+
+        self.assertEqual(broker.generate_proposals(dry_run=True)['cycles'], 0)
+
+
+class ClearingTestCase(TestCase):
+    """
+    Test suite for choosing a conflict-free set of broker proposals
+    """
+
+    def test_local_search_beats_greedy(self):
+        """
+        TEST: Three light cycles replace one heavy cycle that blocks them all
+        """
+        candidates = [((1, 2, 3), 3), ((1, 4), 2), ((2, 5), 2), ((3, 6), 2)]
+        selected, stats = clearing.pack_cycles(candidates, capacity=1)
+
+        self.assertEqual(stats['greedy_weight'], 3)
+        self.assertEqual(stats['total_weight'], 6)
+        self.assertEqual(sorted(selected), [1, 2, 3])
+
+    def test_capacity_and_pinned_seats(self):
+        """
+        TEST: Nobody sits in more than capacity cycles, counting pinned chains
+        """
+        candidates = [((1, 2), 1), ((1, 3), 1), ((1, 4), 1)]
+
+        selected, _ = clearing.pack_cycles(candidates, capacity=2)
+        self.assertEqual(len(selected), 2)
+
+        selected, _ = clearing.pack_cycles(candidates, capacity=2, pinned=[(1, 9)])
+        self.assertEqual(len(selected), 1)
+
+    def test_apply_marks_proposals(self):
+        """
+        TEST: Applying marks only the chosen generated proposals as proposed
+        """
+        users = [User.objects.create(username=name) for name in ['ana', 'ben', 'cai', 'dee']]
+        ids = [u.id for u in users]
+        heavy = BrokerProposal.objects.create(
+            proposal_type='chain_3', cycle_key='-'.join(map(str, ids[:3])),
+            fairness_score=90, efficiency_score=90, participants_data={}
+        )
+        clash = BrokerProposal.objects.create(
+            proposal_type='chain_3', cycle_key='-'.join(map(str, ids[1:])),
+            fairness_score=50, efficiency_score=50, participants_data={}
+        )
+
+        ranked, stats = clearing.clear(capacity=1, apply=True)
+
+        self.assertEqual([(kind, pk) for kind, pk, _ in ranked], [('proposal', heavy.id)])
+        self.assertEqual(stats['users_served'], 3)
+        heavy.refresh_from_db()
+        clash.refresh_from_db()
+        self.assertEqual(heavy.status, 'proposed')
+        self.assertIsNotNone(heavy.proposed_to_users_at)
+        self.assertEqual(clash.status, 'generated')
+
+
+class MatchScoringTestCase(TestCase):
+    """
+    Test suite for vectorized match scores
+    """
+
+    def test_components(self):
+        """
+        TEST: Rate fit, fairness and reputation follow their definitions,
+        with neutral values for missing data
+        """
+        np.testing.assert_allclose(scoring.rate_fit(np.array([20.0, 40.0, 30.0]), np.array([40.0, 40.0, np.nan])), [75, 50, 75])
+        np.testing.assert_allclose(scoring.fairness(np.array([30.0, 30.0, 30.0]), np.array([60.0, 30.0, np.nan])), [50, 100, 50])
+        np.testing.assert_allclose(scoring.reputation(np.array([0.0, 48.0]), np.array([0.0, 10.0])), [50, 87.5])
+        np.testing.assert_allclose(scoring.urgency(['low', 'medium', 'high']), [40, 70, 100])
+
+    def test_top_k_matches_full_sort(self):
+        """
+        TEST: Partial-sort top-k picks the same rows as sorting everything
+        """
+        scores = np.random.default_rng(1).integers(0, 50, size=500).astype(float)
+        expected = sorted(range(500), key=lambda i: (-scores[i], i))
+
+        self.assertEqual(scoring.top_k(scores, 10).tolist(), expected[:10])
+        self.assertEqual(scoring.top_k(scores, 600).tolist(), expected)
+
+    def test_ratings_rescore_matches(self):
+        """
+        TEST: A good rating lifts the rated user's matches as seen by others
+        """
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        python = Skill.objects.create(skill='Python')
+        design = Skill.objects.create(skill='Design')
+        NeededSkill.objects.create(user=alice, skill=python, max_hourly_rate=40)
+        bob_python = OfferedSkill.objects.create(user=bob, skill=python, hourly_rate_equivalent=30)
+        alice_design = OfferedSkill.objects.create(user=alice, skill=design, hourly_rate_equivalent=30)
+
+        before = find_matches_for(alice).get().score
+        exchange = SkillExchange.objects.create(
+            initiator=alice, responder=bob, status='completed',
+            skill_from_initiator=alice_design, skill_from_responder=bob_python,
+        )
+        exchange.initiator_rating = 5
+        exchange.save()
+
+        self.assertGreater(find_matches_for(alice).get().score, before)
+        incremental = sorted(MatchCandidate.objects.values_list('user_id', 'need_id', 'offer_id', 'score'))
+        match_index.rebuild()
+        self.assertEqual(incremental, sorted(MatchCandidate.objects.values_list('user_id', 'need_id', 'offer_id', 'score')))
+
+
+class PotentialExchangesApiTestCase(TestCase):
+    """
+    Test suite for the cursor-paginated potential exchanges API
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        python = Skill.objects.create(skill='Python')
+        OfferedSkill.objects.create(user=self.alice, skill=python, hourly_rate_equivalent=30)
+        for i in range(25):
+            NeededSkill.objects.create(
+                user=User.objects.create(username=f'user{i}'), skill=python,
+                urgency=['low', 'medium', 'high'][i % 3],
+            )
+        self.client.force_login(self.alice)
+
+    def test_cursor_walks_every_match_once(self):
+        """
+        TEST: Following next cursors returns all matches in score order,
+        with the same number of queries on every page
+        """
+        url = reverse('skills:api_potential_exchanges')
+        seen, query_counts, cursor = [], [], None
+        while True:
+            params = {'limit': 10, **({'cursor': cursor} if cursor else {})}
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url, params).json()
+            query_counts.append(len(queries))
+            seen += [(-m['match_score'], m['need']['id']) for m in data['matches']]
+            cursor = data['next']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual([s for s, _ in seen], sorted(s for s, _ in seen))
+        self.assertEqual(len(set(query_counts)), 1)
+
+    def test_full_last_page_has_no_next_cursor(self):
+        """
+        TEST: When the matches fill the last page exactly, it carries no
+        cursor to an empty page after it
+        """
+        url = reverse('skills:api_potential_exchanges')
+        first = self.client.get(url, {'limit': 20}).json()
+        last = self.client.get(url, {'limit': 5, 'cursor': first['next']}).json()
+        self.assertEqual(len(last['matches']), 5)
+        self.assertIsNone(last['next'])
+
+    def test_bad_parameters(self):
+        """
+        TEST: Garbled cursors and unknown match types are rejected
+        """
+        url = reverse('skills:api_potential_exchanges')
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'type': 'everything'}).status_code, 400)
+        self.assertEqual(len(self.client.get(url, {'type': 'skill_match'}).json()['matches']), 0)
+
+
+class BatchFairExchangeTestCase(TestCase):
+    """
+    Test suite for the batch fair exchange API
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        other = User.objects.create(username='bob')
+        rates = [35.5, 60, 12.25, 99.99, 0]
+        self.offers = [
+            OfferedSkill.objects.create(
+                user=[self.user, other][i % 2], skill=Skill.objects.create(skill=f'Skill {i}'),
+                hourly_rate_equivalent=rate,
+            )
+            for i, rate in enumerate(rates)
+        ]
+        self.client.force_login(self.user)
+
+    def test_batch_matches_model_calculation(self):
+        """
+        TEST: Every pair matches SkillExchange.calculate_fair_exchange exactly,
+        from a single skills query
+        """
+        pairs = [(a, b) for a in self.offers for b in self.offers if a != b]
+        query = ','.join(f'{a.id}:{b.id}' for a, b in pairs) + ',999:1'
+
+        with CaptureQueriesContext(connection) as queries:
+            results = self.client.get(reverse('skills:api_calculate_exchanges'), {'pairs': query}).json()['results']
+        self.assertEqual(sum('offeredskill' in q['sql'] for q in queries), 1)
+
+        for a, b in pairs:
+            expected = SkillExchange(skill_from_initiator=a, skill_from_responder=b).calculate_fair_exchange()
+            result = results[f'{a.id}:{b.id}']
+            self.assertEqual(result['success'], expected is not None)
+            if expected:
+                self.assertEqual(result['data'], expected)
+        self.assertEqual(results['999:1']['error'], 'Skill not found')
+
+    def test_malformed_pairs_are_rejected(self):
+        """
+        TEST: Pairs that are not two integer ids get a 400
+        """
+        url = reverse('skills:api_calculate_exchanges')
+        for bad in ['', '1', '1:x', '1:2:3']:
+            self.assertEqual(self.client.get(url, {'pairs': bad}).status_code, 400)
+
+
+class FairnessKernelTestCase(TestCase):
+    """
+    Test suite for the shared fairness kernel
+    """
+
+    def test_exact_decimal_results(self):
+        """
+        TEST: Rates that are awkward in binary give exact cents and ratios
+        """
+        result = fairness.fair_exchange(12.1, 36.3)
+
+        self.assertEqual(result.initiator_hours, Decimal('3.00'))
+        self.assertEqual(result.responder_hours, Decimal('1.00'))
+        self.assertEqual(result.hours_ratio, Decimal('3.00000'))
+        self.assertEqual(result.imbalance, Decimal('0.00'))
+        self.assertTrue(result.is_balanced)
+        self.assertIsNone(fairness.fair_exchange(0, 10))
+
+    def test_repeat_calls_hit_the_cache(self):
+        """
+        TEST: The same rates and hours are only computed once, whatever their type
+        """
+        fairness._fairness_score.cache_clear()
+        fairness.fairness_score(50, 1, 40, '1.25')
+        fairness.fairness_score(Decimal('50.00'), 1.0, 40.0, Decimal('1.25'))
+
+        info = fairness._fairness_score.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
+
+    def test_vectorized_scores_match_scalar(self):
+        """
+        TEST: The array variant agrees with the scalar kernel
+        """
+        rng = np.random.default_rng(2)
+        inputs = [
+            np.round(rng.uniform(0, 100, 200), 2), np.round(rng.uniform(0, 3, 200), 2),
+            np.round(rng.uniform(0, 100, 200), 2), np.round(rng.uniform(0, 3, 200), 2),
+        ]
+        inputs[0][:5] = 0
+
+        expected = [fairness.fairness_score(*row) for row in zip(*inputs)]
+        np.testing.assert_allclose(fairness.fairness_scores(*inputs), expected, atol=0.1)
+
+    def test_models_delegate_to_kernel(self):
+        """
+        TEST: Exchange and chain link fairness come from the same kernel
+        """
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        offer_a = OfferedSkill.objects.create(user=alice, skill=Skill.objects.create(skill='Cooking'), hourly_rate_equivalent=30)
+        offer_b = OfferedSkill.objects.create(user=bob, skill=Skill.objects.create(skill='Guitar'), hourly_rate_equivalent=45)
+        exchange = SkillExchange.objects.create(
+            initiator=alice, responder=bob, skill_from_initiator=offer_a, skill_from_responder=offer_b,
+        )
+        exchange.responder_hours_required = Decimal('0.5')
+
+        report = exchange.get_detailed_fairness_report()
+        self.assertEqual(report['fairness_score'], fairness.fairness_score(30, '1.50', 45, '0.5'))
+        self.assertEqual(report['adjustment'], exchange.suggest_adjustment())
+        self.assertEqual(exchange.calculated_ratio, Decimal('1.5'))
+
+        chain = ExchangeChain.objects.create()
+        link = ChainLink.objects.create(
+            chain=chain, user=alice, gives_skill=offer_a, receives_skill=offer_b, hours_given=3, hours_received=2,
+        )
+        self.assertEqual(link.get_fairness_for_user(), 100.0)
+
+
+class ExchangeStatisticsTestCase(TestCase):
+    """
+    Test suite for stored fairness scores and the statistics aggregates
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', is_staff=True)
+        self.bob = User.objects.create(username='bob')
+        self.offers = [
+            OfferedSkill.objects.create(user=user, skill=Skill.objects.create(skill=name), hourly_rate_equivalent=rate)
+            for user, name, rate in [(self.alice, 'Cooking', 40), (self.bob, 'Guitar', 40), (self.bob, 'Yoga', 20)]
+        ]
+
+    def exchange(self, responder_offer, responder_hours=None):
+        exchange = SkillExchange.objects.create(
+            initiator=self.alice, responder=self.bob,
+            skill_from_initiator=self.offers[0], skill_from_responder=responder_offer,
+        )
+        if responder_hours is not None:
+            exchange.responder_hours_required = responder_hours
+            exchange.save(skip_calculation=True, update_fields=['responder_hours_required'])
+        return exchange
+
+    def test_score_is_stored_on_save(self):
+        """
+        TEST: The stored score follows hours edits, even with update_fields
+        """
+        exchange = self.exchange(self.offers[1], responder_hours=Decimal('0.5'))
+        exchange.refresh_from_db()
+
+        self.assertEqual(exchange.fairness_score, Decimal('50.0'))
+        self.assertEqual(float(exchange.fairness_score), exchange.get_fairness_score())
+
+    def test_summary_is_one_query(self):
+        """
+        TEST: Counts, average, percentiles and histogram all come from the
+        rollups, and unpriced exchanges are left out of the distribution
+        """
+        self.exchange(self.offers[1])
+        self.exchange(self.offers[2])
+        self.exchange(self.offers[1], responder_hours=Decimal('0.5'))
+        SkillExchange.objects.filter(id=self.exchange(self.offers[1]).id).update(
+            initiator_hourly_rate=0, responder_hourly_rate=0, fairness_score=0,
+        )
+
+        rollups.refresh()
+        with self.assertNumQueries(2):
+            summary = stats.exchange_summary()
+
+        self.assertEqual(summary['total'], 4)
+        self.assertEqual(summary['scored'], 3)
+        self.assertEqual(summary['pending'], 4)
+        self.assertEqual(summary['avg_fairness'], round((100 + 100 + 50) / 3, 1))
+        self.assertEqual([b['count'] for b in summary['histogram']], [0] * 5 + [1] + [0] * 3 + [2])
+        self.assertGreaterEqual(summary['median_fairness'], 90)
+
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('skills:statistics'))
+        self.assertEqual(response.context['avg_fairness'], summary['avg_fairness'])
+
+    def test_backfill_repairs_stale_scores(self):
+        """
+        TEST: The backfill command rewrites only scores that do not match
+        """
+        fresh = self.exchange(self.offers[1])
+        stale = self.exchange(self.offers[2])
+        SkillExchange.objects.filter(id=stale.id).update(fairness_score=0)
+
+        out = StringIO()
+        call_command('backfill_fairness_scores', batch_size=1, stdout=out)
+
+        self.assertIn('1 of 2', out.getvalue())
+        self.assertEqual(SkillExchange.objects.get(id=stale.id).fairness_score, Decimal('100.0'))
+        self.assertEqual(SkillExchange.objects.get(id=fresh.id).fairness_score, Decimal('100.0'))
+
+
+class ExchangeRollupTestCase(TestCase):
+    """
+    Test suite for the incremental daily exchange rollups
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.cooking = Skill.objects.create(skill='Cooking')
+        self.guitar = Skill.objects.create(skill='Guitar')
+        self.alice_offer = OfferedSkill.objects.create(user=self.alice, skill=self.cooking, hourly_rate_equivalent=40)
+        self.bob_offer = OfferedSkill.objects.create(user=self.bob, skill=self.guitar, hourly_rate_equivalent=20)
+
+    def exchange(self, **fields):
+        return SkillExchange.objects.create(
+            initiator=self.alice, responder=self.bob,
+            skill_from_initiator=self.alice_offer, skill_from_responder=self.bob_offer, **fields
+        )
+
+    def test_incremental_refresh_follows_status_changes(self):
+        """
+        TEST: A status change after the last run moves the exchange between
+        rollup rows; rows older than the watermark are not rescanned
+        """
+        exchange = self.exchange()
+        self.exchange(status='completed')
+        self.assertEqual(rollups.refresh(), (1, 2))
+        self.assertEqual(rollups.totals()['exchanges'], 2)
+        self.assertEqual(rollups.totals(status='completed')['exchanges'], 1)
+
+        exchange.status = 'completed'
+        exchange.save()
+        self.assertEqual(rollups.refresh()[0], 1)
+
+        completed = rollups.totals(status='completed')
+        self.assertEqual(completed['exchanges'], 2)
+        self.assertEqual(completed['hours'], Decimal('2.00'))
+        self.assertEqual(completed['value'], Decimal('80.00'))
+        self.assertEqual(completed['avg_fairness'], 100.0)
+        self.assertEqual(rollups.totals(status='pending')['exchanges'], 0)
+
+        SkillExchange.objects.update(last_updated=timezone.now() - timedelta(days=1))
+        self.assertEqual(rollups.refresh(), (0, 0))
+
+    def test_readers_refresh_stale_rollups(self):
+        """
+        TEST: The pages reading rollups bring them up to date once the last
+        refresh is older than MAX_AGE, and not before
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.exchange(status='completed')
+        self.assertTrue(rollups.refresh_if_stale())
+
+        self.exchange(status='completed')
+        self.assertFalse(rollups.refresh_if_stale())
+        self.assertEqual(rollups.totals()['exchanges'], 1)
+
+        cache.delete(rollups.REFRESHED_KEY)
+        self.assertEqual(stats.compute_site_stats()['total_exchanges'], 2)
+
+    def test_skill_activity_counts_both_sides_in_range(self):
+        """
+        TEST: Per-skill activity counts each side's skill and skips old days
+        """
+        self.exchange()
+        old = self.exchange()
+        SkillExchange.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=60))
+        rollups.refresh(full=True)
+
+        activity = {row['skill__skill']: row for row in rollups.skill_activity(days=30)}
+        self.assertEqual(set(activity), {'Cooking', 'Guitar'})
+        self.assertEqual(activity['Cooking']['exchanges'], 1)
+        self.assertEqual(activity['Guitar']['hours'], Decimal('2.00'))
+        self.assertEqual(len(rollups.skill_activity(days=90)), 2)
+        self.assertEqual(rollups.totals()['exchanges'], 2)
+
+        response = self.client.get(reverse('main:home_view'))
+        self.assertEqual(response.context['total_exchanges'], 0)
+
+
+class SkillCounterTestCase(TestCase):
+    """
+    Test suite for the maintained per-skill counters
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.cooking = Skill.objects.create(skill='Cooking')
+        self.guitar = Skill.objects.create(skill='Guitar')
+
+    def test_counters_follow_changes_and_match_recount(self):
+        """
+        TEST: Offers, needs, exchanges and status changes keep the counters
+        equal to a fresh recount
+        """
+        alice_offer = OfferedSkill.objects.create(user=self.alice, skill=self.cooking, hourly_rate_equivalent=30)
+        bob_offer = OfferedSkill.objects.create(user=self.bob, skill=self.guitar, hourly_rate_equivalent=30)
+        OfferedSkill.objects.create(user=self.bob, skill=self.cooking, hourly_rate_equivalent=30)
+        NeededSkill.objects.create(user=self.alice, skill=self.guitar)
+
+        exchange = SkillExchange.objects.create(
+            initiator=self.alice, responder=self.bob,
+            skill_from_initiator=alice_offer, skill_from_responder=bob_offer,
+        )
+        exchange.status = 'completed'
+        exchange.save()
+        SkillExchange.objects.get(id=exchange.id).save()
+
+        cooking = SkillCounter.objects.get(skill=self.cooking)
+        self.assertEqual((cooking.offer_count, cooking.exchanges_as_offer, cooking.completed_exchanges), (2, 1, 1))
+        self.assertEqual(counters.verify(), {})
+        self.assertEqual([c.skill.skill for c in counters.top_skills()], ['Cooking', 'Guitar'])
+
+        alice_offer.delete()
+        self.assertEqual(counters.verify(), {})
+        self.assertEqual(list(counters.top_skills()), [])
+
+    def test_only_active_listings_are_counted(self):
+        """
+        TEST: Deactivating, reactivating, moving and deleting offers and
+        needs keep the counters equal to a recount of the active ones
+        """
+        offer = OfferedSkill.objects.create(user=self.alice, skill=self.cooking, hourly_rate_equivalent=30)
+        need = NeededSkill.objects.create(user=self.bob, skill=self.cooking, is_active=False)
+        self.assertEqual(SkillCounter.objects.get(skill=self.cooking).need_count, 0)
+
+        offer.is_active = False
+        offer.save()
+        self.assertEqual(SkillCounter.objects.get(skill=self.cooking).offer_count, 0)
+        offer.save()
+        self.assertEqual(SkillCounter.objects.get(skill=self.cooking).offer_count, 0)
+
+        offer = OfferedSkill.objects.get(id=offer.id)
+        offer.is_active = True
+        offer.skill = self.guitar
+        offer.save()
+        self.assertEqual(SkillCounter.objects.get(skill=self.guitar).offer_count, 1)
+
+        need.is_active = True
+        need.save()
+        self.assertEqual(SkillCounter.objects.get(skill=self.cooking).need_count, 1)
+        self.assertEqual(counters.verify(), {})
+
+        NeededSkill.objects.get(id=need.id).delete()
+        offer.is_active = False
+        offer.save()
+        OfferedSkill.objects.get(id=offer.id).delete()
+        self.assertEqual(counters.verify(), {})
+
+    def test_profile_form_and_verify_command(self):
+        """
+        TEST: Bulk-created skills are counted, and the command repairs drift
+        """
+        self.client.force_login(self.alice)
+        self.client.post(reverse('accounts:profile_form'), {
+            'offered_skills': [self.cooking.id], 'needed_skills': [self.cooking.id, self.guitar.id],
+        })
+        self.assertEqual(counters.verify(), {})
+
+        SkillCounter.objects.filter(skill=self.cooking).update(need_count=7)
+        out = StringIO()
+        call_command('verify_skill_counters', stdout=out)
+        self.assertIn('need_count 7 -> 1', out.getvalue())
+
+        call_command('verify_skill_counters', fix=True, stdout=StringIO())
+        self.assertEqual(SkillCounter.objects.get(skill=self.cooking).need_count, 1)
+
+
+class SiteStatsTestCase(TestCase):
+    """
+    Test suite for the cached public home page counters
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        offers = [
+            OfferedSkill.objects.create(user=user, skill=Skill.objects.create(skill=name), hourly_rate_equivalent=30)
+            for user, name in [(alice, 'Cooking'), (bob, 'Guitar')]
+        ]
+        for _ in range(3):
+            SkillExchange.objects.create(
+                initiator=alice, responder=bob, status='completed', completed_at=timezone.now(),
+                skill_from_initiator=offers[0], skill_from_responder=offers[1],
+            )
+        rollups.refresh()
+
+    def test_home_page_is_served_from_cache(self):
+        """
+        TEST: Only the first anonymous visit queries the counters, and
+        recent exchanges come with their users and skills
+        """
+        self.client.get(reverse('main:home_view'))
+        # Render again rather than replay the cached page
+        page_cache.invalidate()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('main:home_view'))
+
+        self.assertEqual(response.context['total_users'], 2)
+        self.assertEqual(response.context['total_exchanges'], 3)
+        with self.assertNumQueries(0):
+            [(e.initiator.username, e.skill_from_responder.skill.skill) for e in response.context['recent_exchanges']]
+
+    def test_stale_copy_is_served_while_another_request_recomputes(self):
+        """
+        TEST: Past the max age, a request that loses the lock gets the stale
+        numbers instead of recomputing
+        """
+        first = stats.site_stats()
+        User.objects.create(username='carol')
+
+        with mock.patch('skills.stats.time.time', return_value=time.time() + stats.SITE_STATS_MAX_AGE + 1):
+            cache.add(stats.SITE_STATS_LOCK, True)
+            with self.assertNumQueries(0):
+                self.assertEqual(stats.site_stats()['total_users'], first['total_users'])
+
+            cache.delete(stats.SITE_STATS_LOCK)
+            self.assertEqual(stats.site_stats()['total_users'], 3)
+
+
+class DashboardTestCase(TestCase):
+    """
+    Test suite for the cached dashboard service
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.alice_offer = OfferedSkill.objects.create(
+            user=self.alice, skill=Skill.objects.create(skill='Cooking'), hourly_rate_equivalent=30
+        )
+        self.bob_offer = OfferedSkill.objects.create(
+            user=self.bob, skill=Skill.objects.create(skill='Guitar'), hourly_rate_equivalent=30
+        )
+        for status in ['pending'] * 6 + ['completed']:
+            SkillExchange.objects.create(
+                initiator=self.alice, responder=self.bob, status=status,
+                skill_from_initiator=self.alice_offer, skill_from_responder=self.bob_offer,
+            )
+        self.incoming = SkillExchange.objects.create(
+            initiator=self.bob, responder=self.alice, status='in_progress',
+            skill_from_initiator=self.bob_offer, skill_from_responder=self.alice_offer,
+        )
+
+    def _request(self):
+        request = RequestFactory().get(reverse('skills:dashboard'))
+        request.user = self.alice
+        return request
+
+    def test_panels_match_their_querysets(self):
+        """
+        TEST: The windowed query returns the same lists and counts as one
+        query per panel would
+        """
+        data = dashboard.compute_dashboard(self.alice)
+        mine = SkillExchange.objects.filter(Q(initiator=self.alice) | Q(responder=self.alice))
+
+        self.assertEqual(data['initiated_exchanges'], list(mine.filter(initiator=self.alice).order_by('-created_at', '-id')[:5]))
+        self.assertEqual(data['responded_exchanges'], [self.incoming])
+        self.assertEqual(data['active_count'], 7)
+        self.assertEqual(data['active_exchanges'][0], self.incoming)
+        self.assertEqual(len(data['active_exchanges']), 5)
+        self.assertEqual(data['completed_exchanges'], list(mine.filter(status='completed')))
+        self.assertEqual((data['offered_count'], data['needed_count'], data['chain_count']), (1, 0, 0))
+
+    def test_render_stays_within_query_budget(self):
+        """
+        TEST: A dashboard render costs at most 5 queries, and only the
+        notification bell's once the panels are cached
+        """
+        for _ in range(3):
+            create_notification(self.alice, 'exchange_accepted', 'Accepted', '')
+        Notification.objects.first().mark_as_read()
+        with CaptureQueriesContext(connection) as queries:
+            response = dashboard_view(self._request())
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 5)
+
+        with self.assertNumQueries(1):
+            dashboard_view(self._request())
+        self.assertEqual(notifications_context(self._request())['unread_notifications_count'], 2)
+
+    def test_writes_invalidate_the_cached_panels(self):
+        """
+        TEST: Changing an exchange or adding a need shows on the first render
+        after it commits; until then the cached version is left alone
+        """
+        self.assertEqual(dashboard.dashboard_data(self.bob)['active_count'], 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.incoming.status = 'completed'
+            self.incoming.save()
+            self.assertEqual(dashboard.dashboard_data(self.bob)['active_count'], 7)
+        self.assertEqual(dashboard.dashboard_data(self.bob)['active_count'], 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NeededSkill.objects.create(user=self.bob, skill=self.alice_offer.skill)
+        self.assertEqual(dashboard.dashboard_data(self.bob)['needed_count'], 1)
+
+
+class NotificationCounterTestCase(TestCase):
+    """
+    Test suite for the cached per-user unread notification counter
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice')
+        self.notes = [create_notification(self.alice, 'system', f'Note {i}', '') for i in range(3)]
+
+    def test_counter_follows_reads_and_deletes(self):
+        """
+        TEST: Marking read (once, however often it is called), marking all
+        read and deleting keep the counter equal to the real count
+        """
+        count = lambda: notifications_context(self._request())['unread_notifications_count']
+        self.assertEqual(count(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(count(), 3)
+
+        stale = Notification.objects.get(id=self.notes[0].id)
+        self.notes[0].mark_as_read()
+        stale.mark_as_read()
+        self.assertEqual(count(), 2)
+
+        self.notes[1].delete()
+        self.assertEqual(count(), 1)
+        mark_all_as_read(self.alice)
+        self.assertEqual(count(), 0)
+        self.assertEqual(NotificationCounter.objects.get(user=self.alice).unread, 0)
+
+    def test_context_is_lazy(self):
+        """
+        TEST: Pages that never show the bell run no notification queries
+        """
+        with self.assertNumQueries(0):
+            notifications_context(self._request())
+
+    def test_verify_command_repairs_drift(self):
+        """
+        TEST: The repair command reports and fixes a drifted counter
+        """
+        NotificationCounter.objects.filter(user=self.alice).update(unread=9)
+        out = StringIO()
+        call_command('verify_notification_counters', stdout=out)
+        self.assertIn('unread 9 -> 3', out.getvalue())
+
+        call_command('verify_notification_counters', fix=True, stdout=StringIO())
+        self.assertEqual(notifications_context(self._request())['unread_notifications_count'], 3)
+
+    def _request(self):
+        request = RequestFactory().get('/')
+        request.user = self.alice
+        return request
+
+
+class NotificationStreamTestCase(TestCase):
+    """
+    Test suite for the pub/sub broker and the server-sent events stream
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+
+    async def test_broker_delivers_across_threads_and_drops_oldest(self):
+        """
+        TEST: Events published from another thread arrive, and a full queue
+        keeps only the newest events
+        """
+        broker = pubsub.LocalBroker()
+        subscription = broker.subscribe('user:1', maxsize=2)
+        publisher = threading.Thread(target=lambda: [broker.publish('user:1', {'n': n}) for n in range(3)])
+        publisher.start()
+        publisher.join()
+
+        events = [await subscription.get(timeout=1) for _ in range(3)]
+        self.assertEqual(events, [{'n': 1}, {'n': 2}, None])
+        self.assertEqual(subscription.dropped, 1)
+        subscription.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_writes_publish_after_commit(self):
+        """
+        TEST: New notifications publish the unread count and status changes
+        publish the exchange, once committed
+        """
+        offers = [
+            OfferedSkill.objects.create(user=user, skill=Skill.objects.create(skill=name), hourly_rate_equivalent=30)
+            for user, name in [(self.alice, 'Cooking'), (self.bob, 'Guitar')]
+        ]
+        with mock.patch.object(pubsub.LocalBroker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                create_notification(self.alice, 'system', 'Hello', '')
+                exchange = SkillExchange.objects.create(
+                    initiator=self.alice, responder=self.bob,
+                    skill_from_initiator=offers[0], skill_from_responder=offers[1],
+                )
+                exchange.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                exchange.status = 'accepted'
+                exchange.save()
+
+        sent = [call.args for call in publish.call_args_list]
+        self.assertIn(('user:%d' % self.alice.id, {'type': 'unread', 'count': 1}), sent)
+        exchange_events = [event for channel, event in sent if event['type'] == 'exchange']
+        self.assertEqual([e['status'] for e in exchange_events], ['pending', 'pending', 'accepted', 'accepted'])
+
+    async def test_stream_pushes_count_events_and_heartbeats(self):
+        """
+        TEST: The stream opens with the unread count, then relays published
+        events and sends heartbeats while idle
+        """
+        await self.async_client.aforce_login(self.alice)
+        response = await self.async_client.get(reverse('skills:notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        self.assertIn(b'"count": 0', await anext(chunks))
+
+        pubsub.get_broker().publish(pubsub.user_channel(self.alice.id), {'type': 'exchange', 'id': 7, 'status': 'accepted'})
+        self.assertIn(b'event: exchange', await anext(chunks))
+
+        with mock.patch('skills.views.STREAM_HEARTBEAT', 0.01):
+            self.assertEqual(await anext(chunks), b': heartbeat\n\n')
+        await chunks.aclose()
+
+    def test_stream_is_refused_under_wsgi(self):
+        """
+        TEST: A WSGI request gets 204 so the browser falls back to polling
+        """
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('skills:notification_stream')).status_code, 204)
+
+    def test_only_signed_in_pages_open_the_stream(self):
+        """
+        TEST: Anonymous pages carry no EventSource, so they cost no extra request
+        """
+        page_cache.invalidate()
+        self.assertNotContains(self.client.get(reverse('main:home_view')), 'EventSource(')
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse('main:home_view')), 'EventSource(')
+
+
+class NotificationDispatchTestCase(TestCase):
+    """
+    Test suite for bulk notification dispatch
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.users = [User.objects.create(username=f'user{i}') for i in range(20)]
+        self.proposal = BrokerProposal.objects.create(title='Cooking for Guitar', description='', participants_data={
+            'participants': [{'user_id': user.id} for user in self.users[:3]],
+        })
+
+    def test_fan_out_costs_the_same_for_any_number_of_recipients(self):
+        """
+        TEST: One recipient and twenty take the same number of queries, and
+        the unread counters follow
+        """
+        notify([(self.users[0], 'proposal_suggested', self.proposal)])
+        with CaptureQueriesContext(connection) as one:
+            notify([(self.users[0], 'proposal_suggested', self.proposal)])
+        with CaptureQueriesContext(connection) as many:
+            notify((user.id, 'proposal_suggested', self.proposal) for user in self.users)
+
+        self.assertEqual(len(many), len(one))
+        self.assertEqual(NotificationCounter.objects.get(user=self.users[0]).unread, 3)
+        self.assertEqual(NotificationCounter.objects.get(user=self.users[19]).unread, 1)
+        note = Notification.objects.filter(user=self.users[19]).get()
+        self.assertEqual(note.content_object, self.proposal)
+        self.assertEqual(note.message, 'We found an exchange chain for you: Cooking for Guitar')
+
+    def test_exchange_and_proposal_notifications(self):
+        """
+        TEST: Exchange notifications keep their wording and proposing a chain
+        notifies every participant
+        """
+        offers = [
+            OfferedSkill.objects.create(user=user, skill=Skill.objects.create(skill=name), hourly_rate_equivalent=30)
+            for user, name in [(self.users[0], 'Cooking'), (self.users[1], 'Guitar')]
+        ]
+        exchange = SkillExchange.objects.create(
+            initiator=self.users[0], responder=self.users[1],
+            skill_from_initiator=offers[0], skill_from_responder=offers[1],
+        )
+        [proposed] = send_exchange_notification(exchange, 'exchange_proposed')
+        self.assertEqual((proposed.user_id, proposed.message), (self.users[1].id, 'user0 has proposed an exchange with you!'))
+        self.assertEqual(len(send_exchange_notification(exchange, 'exchange_completed')), 2)
+
+        self.proposal.propose_to_users()
+        self.assertEqual(
+            set(Notification.objects.filter(notification_type='proposal_suggested').values_list('user_id', flat=True)),
+            {user.id for user in self.users[:3]},
+        )
+
+
+class OutboxTestCase(TestCase):
+    """
+    Test suite for the notification outbox and its drain command
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        offers = [
+            OfferedSkill.objects.create(user=user, skill=Skill.objects.create(skill=name), hourly_rate_equivalent=30)
+            for user, name in [(self.alice, 'Cooking'), (self.bob, 'Guitar')]
+        ]
+        self.exchange = SkillExchange.objects.create(
+            initiator=self.alice, responder=self.bob,
+            skill_from_initiator=offers[0], skill_from_responder=offers[1],
+        )
+
+    def test_views_record_events_and_drain_delivers_them_once(self):
+        """
+        TEST: A status change records one event per recipient, repeats are
+        deduplicated, and draining turns them into notifications
+        """
+        self.client.force_login(self.bob)
+        self.client.post(reverse('skills:update_exchange_status', args=[self.exchange.id]), {'status': 'accepted'})
+        outbox.record(exchange_notification_events(self.exchange, 'exchange_accepted'))
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(outbox.lag()['pending'], 1)
+
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(outbox.drain(), (0, 0))
+        note = Notification.objects.get()
+        self.assertEqual((note.user, note.message), (self.alice, 'bob has accepted your exchange proposal!'))
+        self.assertEqual(outbox.lag(), {'pending': 0, 'retrying': 0, 'dead': 0, 'oldest_age': 0})
+
+    def test_without_a_worker_events_are_delivered_after_commit(self):
+        """
+        TEST: Where no worker shares the database, recording drains the
+        outbox in process on commit and the drain loop refuses to start
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.record(exchange_notification_events(self.exchange, 'exchange_accepted'))
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(outbox.lag()['pending'], 0)
+
+        with self.settings(SKILLSWAP_OUTBOX_WORKER=True), self.captureOnCommitCallbacks() as callbacks:
+            outbox.record(exchange_notification_events(self.exchange, 'exchange_completed'))
+        self.assertEqual(callbacks, [])
+        self.assertGreater(outbox.lag()['pending'], 0)
+
+        with self.assertRaises(CommandError):
+            call_command('drain_outbox', loop=True, stdout=StringIO())
+
+    def test_failing_event_does_not_hold_up_the_batch(self):
+        """
+        TEST: Events a channel keeps failing on are retried, then given up
+        on, while the rest of their batch is delivered
+        """
+        outbox.record(exchange_notification_events(self.exchange, 'exchange_completed'))
+
+        def flaky(events):
+            if any(event.recipient_id == self.alice.id for event in events):
+                raise RuntimeError('channel down')
+
+        with mock.patch.object(outbox, 'CHANNELS', [flaky, outbox.deliver_notifications]), self.assertLogs('skills.outbox'):
+            self.assertEqual(outbox.drain_batch(), (1, 1))
+            self.assertEqual(list(Notification.objects.values_list('user', flat=True)), [self.bob.id])
+            for _ in range(outbox.MAX_ATTEMPTS - 1):
+                outbox.drain_batch()
+
+        failed = OutboxEvent.objects.get(recipient=self.alice)
+        self.assertEqual(failed.attempts, outbox.MAX_ATTEMPTS)
+        self.assertIn('channel down', failed.last_error)
+
+        out = StringIO()
+        call_command('drain_outbox', stats=True, stdout=out)
+        self.assertIn('0 pending (0 retrying), oldest 0s, 1 given up', out.getvalue())
+
+
+class NotificationFeedTestCase(TestCase):
+    """
+    Test suite for the keyset-paginated notification feed
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        offers = [
+            OfferedSkill.objects.create(user=user, skill=Skill.objects.create(skill=name), hourly_rate_equivalent=30)
+            for user, name in [(self.alice, 'Cooking'), (bob, 'Guitar')]
+        ]
+        self.exchanges = [
+            SkillExchange.objects.create(
+                initiator=bob, responder=self.alice,
+                skill_from_initiator=offers[1], skill_from_responder=offers[0],
+            )
+            for _ in range(25)
+        ]
+        # One bulk insert, so created_at ties and only the id orders them
+        notify((self.alice, 'exchange_proposed', exchange) for exchange in self.exchanges)
+
+    def test_pages_walk_the_whole_feed_at_a_fixed_cost(self):
+        """
+        TEST: Cursor pages cover every notification once, newest first, each
+        in the same number of queries with targets prefetched
+        """
+        with CaptureQueriesContext(connection) as first_queries:
+            first, cursor = notification_page(self.alice, size=20)
+        with CaptureQueriesContext(connection) as second_queries:
+            second, end = notification_page(self.alice, cursor, size=20)
+
+        self.assertEqual(len(first_queries), len(second_queries))
+        self.assertEqual(len(first) + len(second), 25)
+        self.assertIsNone(end)
+        ids = [n.id for n in first + second]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        with self.assertNumQueries(0):
+            self.assertEqual(second[-1].content_object, self.exchanges[0])
+
+        with self.assertRaises(ValueError):
+            notification_page(self.alice, 'not-a-cursor')
+
+        _, cursor = notification_page(self.alice, size=5)
+        last, end = notification_page(self.alice, cursor, size=20)
+        self.assertEqual(len(last), 20)
+        self.assertIsNone(end)
+
+    def test_json_feed_and_mark_read_redirect(self):
+        """
+        TEST: The JSON feed pages with ``next`` and links to the exchange,
+        and marking read redirects there
+        """
+        self.client.force_login(self.alice)
+        data = self.client.get(reverse('skills:notifications_api'), {'limit': 10}).json()
+        self.assertEqual(len(data['notifications']), 10)
+        latest = data['notifications'][0]
+        self.assertEqual(latest['url'], reverse('skills:exchange_detail', args=[self.exchanges[-1].id]))
+
+        data = self.client.get(reverse('skills:notifications_api'), {'cursor': data['next'], 'limit': 20}).json()
+        self.assertEqual((len(data['notifications']), data['next']), (15, None))
+        self.assertEqual(self.client.get(reverse('skills:notifications_api'), {'cursor': 'x'}).status_code, 400)
+
+        response = self.client.get(reverse('skills:notification_mark_read', args=[latest['id']]))
+        self.assertRedirects(response, latest['url'], fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('skills:notifications')).context['unread_count'], 24)
+
+
 def run_all_tests():
     """
     Function to run all tests manually if needed
@@ -24,10 +24,14 @@ urlpatterns = [
     path('chains/', views.exchange_chains, name='exchange_chains'),
     path('api/user-skills/', views.get_user_offered_skills, name='api_user_skills'),
     path('api/calculate-exchange/', views.calculate_fair_exchange_api, name='api_calculate_exchange'),
+    path('api/calculate-exchanges/', views.calculate_fair_exchanges_api, name='api_calculate_exchanges'),
     path('api/potential-exchanges/', views.get_potential_exchanges, name='api_potential_exchanges'),
+    path('api/reciprocal-matches/', views.get_reciprocal_matches, name='api_reciprocal_matches'),
     path('notifications/', views.notifications, name='notifications'),
+    path('api/notifications/', views.notifications_api, name='notifications_api'),
     path('notifications/<int:notification_id>/read/', views.notification_mark_read, name='notification_mark_read'),
     path('api/notifications/count/', views.get_notifications_count, name='get_notifications_count'),
+    path('api/notifications/stream/', views.notification_stream, name='notification_stream'),
     path('statistics/', views.exchange_statistics, name='statistics'),
 
 ]
@@ -1,17 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.db.models import Q
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.urls import reverse
 from django.core.paginator import Paginator
-from .notifications import send_exchange_notification, get_unread_notifications_count, get_recent_notifications, mark_all_as_read
+from .notifications import (
+    notify, exchange_notification_events, get_unread_notifications_count, mark_all_as_read,
+    notification_page, FEED_PAGE_SIZE,
+)
+from .matching import find_matches_for, match_page
+from . import fairness, outbox, pubsub
+from .stats import exchange_summary
+from .rollups import refresh_if_stale, skill_activity
+from .counters import top_skills
+from .dashboard import dashboard_data
+from .reciprocal import reciprocal_matches
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
 from django.utils import timezone
 from .models import (
     Skill, OfferedSkill, NeededSkill, 
-    SkillExchange, ExchangeChain, ChainLink, BrokerProposal,
+    SkillExchange, ExchangeChain, ChainLink, BrokerProposal, MatchCandidate,
     Notification  # ADDED THIS IMPORT
 )
 from .forms import (
@@ -49,27 +63,7 @@ def cat_skill_add(request):
 
 @login_required
 def dashboard(request: HttpRequest):
-    user = request.user
-
-    context = {
-        'user_offered_skills': OfferedSkill.objects.filter(user=user, is_active=True),
-        'user_needed_skills': NeededSkill.objects.filter(user=user, is_active=True),
-        'initiated_exchanges': SkillExchange.objects.filter(initiator=user).order_by('-created_at')[:5],
-        'responded_exchanges': SkillExchange.objects.filter(responder=user).order_by('-created_at')[:5],
-        'active_exchanges': SkillExchange.objects.filter(
-            Q(initiator=user) | Q(responder=user), 
-            status__in=['pending', 'under_review', 'negotiating', 'accepted', 'in_progress']
-        ).order_by('-last_updated'),
-        'completed_exchanges': SkillExchange.objects.filter(
-            Q(initiator=user) | Q(responder=user), 
-            status='completed'
-        ).order_by('-completed_at')[:10],
-        'exchange_chains': ExchangeChain.objects.filter(chain_links__user=user).distinct()[:5],
-        'unread_notifications': get_unread_notifications_count(user), 
-        'recent_notifications': get_recent_notifications(user, 5),     
-    }
-
-    return render(request, 'skills/dashboard.html', context)
+    return render(request, 'skills/dashboard.html', dashboard_data(request.user))
 
 @login_required
 def offer_skill(request):
@@ -146,56 +140,15 @@ def manage_needed_skills(request):
 @login_required
 def find_matches(request):
     """Find matching skills for user's needs and vice versa"""
-    user = request.user
-    
 
-    matching_offers = []
-    for need in NeededSkill.objects.filter(user=user, is_active=True):
-        offers = OfferedSkill.objects.filter(
-            is_active=True,
-            skill=need.skill,
-        ).exclude(user=user)
-        
-  
-        if need.max_hourly_rate:
-            offers = offers.filter(hourly_rate_equivalent__lte=need.max_hourly_rate)
-        
-        for offer in offers:
-            matching_offers.append({
-                'need': need,
-                'offer': offer,
-                'fairness_score': 100, 
-                'match_type': 'skill_match'
-            })
-    
-
-    matching_needs = []
-    for offer in OfferedSkill.objects.filter(user=user, is_active=True):
-        needs = NeededSkill.objects.filter(
-            is_active=True,
-            skill=offer.skill,
-        ).exclude(user=user)
-        
-     
-        needs = needs.filter(
-            Q(max_hourly_rate__isnull=True) | 
-            Q(max_hourly_rate__gte=offer.hourly_rate_equivalent)
-        )
-        
-        for need in needs:
-            matching_needs.append({
-                'offer': offer,
-                'need': need,
-                'fairness_score': 100,  
-                'match_type': 'need_match'
-            })
-    
+    paginator = Paginator(find_matches_for(request.user), 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
 
-    all_matches = matching_offers + matching_needs
-    
     return render(request, 'skills/find_matches.html', {
-        'matches': all_matches[:20],  
-        'match_count': len(all_matches)
+        'matches': page_obj,
+        'page_obj': page_obj,
+        'match_count': paginator.count,
+        'reciprocal_matches': reciprocal_matches(request.user)[:6],
     })
 
 @login_required
@@ -219,18 +172,17 @@ def initiate_exchange(request, offered_skill_id):
         user_skill = get_object_or_404(OfferedSkill, id=user_skill_id, user=request.user)
         
  
-        exchange = SkillExchange.objects.create(
-            initiator=request.user,
-            responder=target_skill.user,
-            skill_from_initiator=user_skill,
-            skill_from_responder=target_skill,
-            exchange_type='value',  
-            status='pending',
-            terms=request.POST.get('terms', '')
-        )
-        
-
-        send_exchange_notification(exchange, 'exchange_proposed')
+        with transaction.atomic():
+            exchange = SkillExchange.objects.create(
+                initiator=request.user,
+                responder=target_skill.user,
+                skill_from_initiator=user_skill,
+                skill_from_responder=target_skill,
+                exchange_type='value',
+                status='pending',
+                terms=request.POST.get('terms', '')
+            )
+            outbox.record(exchange_notification_events(exchange, 'exchange_proposed'))
         
         messages.success(request, f'Exchange proposal sent to {target_skill.user.username}!')
         return redirect('skills:exchange_detail', exchange_id=exchange.id)
@@ -276,20 +228,19 @@ def propose_exchange(request, needed_skill_id):
         user_skill = get_object_or_404(OfferedSkill, id=user_skill_id, user=request.user)
         initiator_skill = get_object_or_404(OfferedSkill, id=initiator_skill_id, user=needed_skill.user)
         
-        exchange = SkillExchange.objects.create(
-            initiator=request.user,
-            responder=needed_skill.user,
-            skill_from_initiator=user_skill,
-            skill_from_responder=initiator_skill, 
-            exchange_type='value',
-            status='pending',
-            terms=request.POST.get('terms', ''),
-            proposed_start_date=request.POST.get('proposed_start_date') or None,
-            proposed_end_date=request.POST.get('proposed_end_date') or None,
-        )
-        
-
-        send_exchange_notification(exchange, 'exchange_proposed')
+        with transaction.atomic():
+            exchange = SkillExchange.objects.create(
+                initiator=request.user,
+                responder=needed_skill.user,
+                skill_from_initiator=user_skill,
+                skill_from_responder=initiator_skill,
+                exchange_type='value',
+                status='pending',
+                terms=request.POST.get('terms', ''),
+                proposed_start_date=request.POST.get('proposed_start_date') or None,
+                proposed_end_date=request.POST.get('proposed_end_date') or None,
+            )
+            outbox.record(exchange_notification_events(exchange, 'exchange_proposed'))
         
         messages.success(request, f'Exchange proposal sent to {needed_skill.user.username}!')
         return redirect('skills:exchange_detail', exchange_id=exchange.id)
@@ -312,7 +263,7 @@ def exchange_detail(request, exchange_id):
     
 
     fairness_report = exchange.get_detailed_fairness_report()
-    adjustment_suggestion = exchange.suggest_adjustment()
+    adjustment_suggestion = fairness_report['adjustment']
     
 
     can_cancel_statuses = ['pending', 'under_review', 'negotiating']
@@ -346,10 +297,11 @@ def update_exchange_status(request, exchange_id):
     
 
     now = timezone.now()
+    events = []
     if new_status == 'accepted' and not exchange.accepted_at:
         exchange.accepted_at = now
 
-        send_exchange_notification(exchange, 'exchange_accepted')
+        events = exchange_notification_events(exchange, 'exchange_accepted')
         
     elif new_status == 'in_progress' and not exchange.started_at:
         exchange.started_at = now
@@ -357,14 +309,16 @@ def update_exchange_status(request, exchange_id):
     elif new_status == 'completed' and not exchange.completed_at:
         exchange.completed_at = now
 
-        send_exchange_notification(exchange, 'exchange_completed')
+        events = exchange_notification_events(exchange, 'exchange_completed')
         
     elif new_status == 'cancelled':
         exchange.completed_at = now
 
-        send_exchange_notification(exchange, 'exchange_cancelled')
+        events = exchange_notification_events(exchange, 'exchange_cancelled')
     
-    exchange.save()
+    with transaction.atomic():
+        exchange.save()
+        outbox.record(events)
     
     messages.success(request, f'Exchange status updated to {new_status.replace("_", " ").title()}.')
     return redirect('skills:exchange_detail', exchange_id=exchange.id)
@@ -390,14 +344,16 @@ def submit_rating(request, exchange_id):
         exchange.initiator_rating = rating
         exchange.initiator_feedback = feedback
  
-        send_exchange_notification(exchange, 'rating_received', to_user=exchange.responder)
+        events = exchange_notification_events(exchange, 'rating_received', to_user=exchange.responder)
     else:
         exchange.responder_rating = rating
         exchange.responder_feedback = feedback
 
-        send_exchange_notification(exchange, 'rating_received', to_user=exchange.initiator)
+        events = exchange_notification_events(exchange, 'rating_received', to_user=exchange.initiator)
     
-    exchange.save()
+    with transaction.atomic():
+        exchange.save()
+        outbox.record(events)
     messages.success(request, 'Thank you for your rating!')
     return redirect('skills:exchange_detail', exchange_id=exchange.id)
 
@@ -483,6 +439,7 @@ def manage_chain(request, chain_id):
             chain.status = 'proposed'
             chain.proposed_at = timezone.now()
             chain.save()
+            notify((user_id, 'chain_proposed', chain) for user_id in {link.user_id for link in links})
             
             messages.success(request, 'Chain proposed to all participants!')
         
@@ -564,18 +521,55 @@ def exchange_chains(request):
 @login_required
 def notifications(request):
 
-    notifications_list = Notification.objects.filter(user=request.user).order_by('-created_at')
-    unread_count = get_unread_notifications_count(request.user)
-    
-
-    if request.GET.get('mark_read'):
+    if request.GET.get('mark_read') or request.GET.get('mark_all_read'):
         mark_all_as_read(request.user)
         messages.success(request, 'All notifications marked as read!')
         return redirect('skills:notifications')
-    
+
+    try:
+        notifications_list, next_cursor = notification_page(request.user, request.GET.get('cursor'))
+    except ValueError:
+        return redirect('skills:notifications')
+
     return render(request, 'skills/notifications.html', {
         'notifications': notifications_list,
-        'unread_count': unread_count,
+        'next_cursor': next_cursor,
+        'unread_count': get_unread_notifications_count(request.user),
+    })
+
+def _notification_target_url(notification):
+    """Where a notification leads, from its content type id alone, without loading the target"""
+    if notification.object_id and notification.content_type_id == ContentType.objects.get_for_model(SkillExchange).id:
+        return reverse('skills:exchange_detail', args=[notification.object_id])
+    return None
+
+@login_required
+def notifications_api(request):
+    """JSON pages of the notification feed for infinite scroll; pass ``next`` back as ``cursor``"""
+    try:
+        size = max(1, min(int(request.GET.get('limit', FEED_PAGE_SIZE)), 100))
+    except ValueError:
+        size = FEED_PAGE_SIZE
+
+    try:
+        page, next_cursor = notification_page(request.user, request.GET.get('cursor'), size)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'notifications': [
+            {
+                'id': notification.id,
+                'type': notification.notification_type,
+                'title': notification.title,
+                'message': notification.message,
+                'is_read': notification.is_read,
+                'created_at': notification.created_at.isoformat(),
+                'url': _notification_target_url(notification),
+            }
+            for notification in page
+        ],
+        'next': next_cursor,
     })
 
 @login_required
@@ -583,12 +577,9 @@ def notification_mark_read(request, notification_id):
     """Mark a notification as read"""
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
     notification.mark_as_read()
- 
-    if notification.content_object:
-        if isinstance(notification.content_object, SkillExchange):
-            return redirect('skills:exchange_detail', exchange_id=notification.content_object.id)
-    
-    return redirect('skills:notifications')
+
+    url = _notification_target_url(notification)
+    return redirect(url) if url else redirect('skills:notifications')
 
 @login_required
 def get_notifications_count(request):
@@ -596,6 +587,42 @@ def get_notifications_count(request):
     count = get_unread_notifications_count(request.user)
     return JsonResponse({'count': count})
 
+STREAM_HEARTBEAT = 15
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@login_required
+async def notification_stream(request):
+    """
+    Server-sent events for the signed-in user: the unread count, then every
+    change to it and every exchange status change as it happens, with a
+    comment line after STREAM_HEARTBEAT idle seconds to keep proxies from
+    dropping the connection. Streams are coroutines, not threads, so this is
+    only served under ASGI; elsewhere the 204 tells EventSource to give up
+    and the page keeps polling get_notifications_count.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+
+    async def events():
+        subscription = pubsub.get_broker().subscribe(pubsub.user_channel(user.id))
+        try:
+            yield "retry: 5000\n\n"
+            count = await sync_to_async(get_unread_notifications_count)(user)
+            yield _sse('unread', {'type': 'unread', 'count': count})
+            while True:
+                event = await subscription.get(timeout=STREAM_HEARTBEAT)
+                yield ": heartbeat\n\n" if event is None else _sse(event['type'], event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 
 @login_required
@@ -641,46 +668,99 @@ def calculate_fair_exchange_api(request):
             'error': 'Could not calculate fair exchange'
         })
 
+MAX_EXCHANGE_PAIRS = 200
+
+
+@login_required
+def calculate_fair_exchanges_api(request):
+
+    # ?pairs=1:2,1:3,... -> results keyed by "1:2", "1:3", ...
+    try:
+        pairs = [
+            tuple(int(pk) for pk in pair.split(':', 1))
+            for pair in request.GET.get('pairs', '').split(',') if pair
+        ]
+        if any(len(pair) != 2 for pair in pairs):
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'Pairs must look like skill1_id:skill2_id'}, status=400)
+
+    if not pairs:
+        return JsonResponse({'error': 'Missing skill IDs'}, status=400)
+    if len(pairs) > MAX_EXCHANGE_PAIRS:
+        return JsonResponse({'error': f'At most {MAX_EXCHANGE_PAIRS} pairs per request'}, status=400)
+
+    rates = dict(OfferedSkill.objects.filter(
+        id__in={pk for pair in pairs for pk in pair}
+    ).values_list('id', 'hourly_rate_equivalent'))
+
+    results = {}
+    for (a, b), result in fairness.fair_exchanges(pairs, rates).items():
+        if result:
+            results[f'{a}:{b}'] = {
+                'success': True,
+                'data': result.as_dict(),
+                'skill1_rate': float(rates[a]),
+                'skill2_rate': float(rates[b]),
+            }
+        elif a in rates and b in rates:
+            results[f'{a}:{b}'] = {'success': False, 'error': 'Could not calculate fair exchange'}
+        else:
+            results[f'{a}:{b}'] = {'success': False, 'error': 'Skill not found'}
+
+    return JsonResponse({'results': results})
+
 @login_required
 def get_potential_exchanges(request):
 
-    user = request.user
+    match_type = request.GET.get('type', 'need_match')
+    if match_type not in dict(MatchCandidate.MATCH_TYPES):
+        return JsonResponse({'error': 'Unknown match type'}, status=400)
 
-    user_offers = OfferedSkill.objects.filter(user=user, is_active=True)
-    
+    try:
+        size = max(1, min(int(request.GET.get('limit', 10)), 100))
+    except ValueError:
+        size = 10
+
+    try:
+        page, next_cursor = match_page(request.user, match_type, request.GET.get('cursor'), size)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
 
     matches = []
-    for offer in user_offers:
-        matching_needs = NeededSkill.objects.filter(
-            is_active=True,
-            skill=offer.skill,
-        ).exclude(user=user)
-        
-        for need in matching_needs:
+    for match in page:
+        matches.append({
+            'type': match.match_type,
+            'offer': {
+                'id': match.offer.id,
+                'skill': match.offer.skill.skill,
+                'user': match.offer.user.username,
+                'rate': float(match.offer.hourly_rate_equivalent),
+            },
+            'need': {
+                'id': match.need.id,
+                'skill': match.need.skill.skill,
+                'user': match.need.user.username,
+                'urgency': match.need.urgency,
+            },
+            'match_score': match.score,
+        })
 
-            if need.max_hourly_rate and offer.hourly_rate_equivalent > need.max_hourly_rate:
-                continue
-            
-            matches.append({
-                'type': 'need_match',
-                'offer': {
-                    'id': offer.id,
-                    'skill': offer.skill.skill,
-                    'rate': float(offer.hourly_rate_equivalent),
-                },
-                'need': {
-                    'id': need.id,
-                    'skill': need.skill.skill,
-                    'user': need.user.username,
-                    'urgency': need.urgency,
-                },
-                'match_score': 85, 
-            })
-    
-    return JsonResponse({'matches': matches[:10]})
+    return JsonResponse({'matches': matches, 'next': next_cursor})
 
 
 
+@login_required
+def get_reciprocal_matches(request):
+
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 100)
+    except ValueError:
+        limit = 20
+
+    return JsonResponse({'matches': reciprocal_matches(request.user)[:limit]})
+
+
 @login_required
 def exchange_statistics(request):
 
@@ -689,30 +769,21 @@ def exchange_statistics(request):
         return redirect('skills:dashboard')
     
 
-    total_exchanges = SkillExchange.objects.count()
-    completed_exchanges = SkillExchange.objects.filter(status='completed').count()
-    pending_exchanges = SkillExchange.objects.filter(status='pending').count()
-    
-
-    exchanges_with_score = SkillExchange.objects.exclude(
-        initiator_hourly_rate=0,
-        responder_hourly_rate=0
-    )
-    total_fairness = sum([e.get_fairness_score() for e in exchanges_with_score])
-    avg_fairness = total_fairness / exchanges_with_score.count() if exchanges_with_score.count() > 0 else 0
+    refresh_if_stale()
+    summary = exchange_summary()
     
 
-    from django.db.models import Count
-    popular_skills = Skill.objects.annotate(
-        exchange_count=Count('offered_by_users__exchanges_as_offer') + 
-                       Count('offered_by_users__exchanges_as_response')
-    ).order_by('-exchange_count')[:10]
+    popular_skills = top_skills(10)
     
     context = {
-        'total_exchanges': total_exchanges,
-        'completed_exchanges': completed_exchanges,
-        'pending_exchanges': pending_exchanges,
-        'avg_fairness': round(avg_fairness, 1),
+        'total_exchanges': summary['total'],
+        'completed_exchanges': summary['completed'],
+        'pending_exchanges': summary['pending'],
+        'avg_fairness': summary['avg_fairness'],
+        'median_fairness': summary['median_fairness'],
+        'p10_fairness': summary['p10_fairness'],
+        'fairness_histogram': summary['histogram'],
+        'recent_skills': skill_activity(days=30),
         'popular_skills': popular_skills,
         'total_users': User.objects.count(),
         'active_users': User.objects.filter(